@@ -0,0 +1,199 @@
+# Local stand-in for the Anthropic Messages API, for benchmarks. Never calls the real API.
+#
+# Returns schema-valid JSON for structured-output requests (ScholarshipAnalysis, StudentScholarshipMatch,
+# or anything else with an output_format schema) and lorem-style essay text otherwise, in both
+# non-streaming and SSE streaming form. Latency is configurable through env vars:
+#
+#   MOCK_TTFT_MS          median time to first token (lognormal), default 400
+#   MOCK_TTFT_SIGMA       lognormal sigma for time to first token, default 0.35
+#   MOCK_TOKENS_PER_SEC   mean output token rate (+/-20% jitter per request), default 80
+#   MOCK_ESSAY_TOKENS     output tokens for free-text (essay) responses, default 700
+#   MOCK_SMALL_SPEEDUP    how much faster "haiku" models are (both TTFT and token rate), default 2.5
+#   MOCK_MODELS           comma-separated model ids served by /v1/models; when set, /v1/messages answers
+#                         404 for any other model (aliases match their dated ids)
+#
+# Run: uvicorn mock_server:app --port 8787   (from backend/bench)
+
+import asyncio
+import json
+import os
+import random
+import re
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+TTFT_MS = float(os.getenv("MOCK_TTFT_MS", "400"))
+TTFT_SIGMA = float(os.getenv("MOCK_TTFT_SIGMA", "0.35"))
+TOKENS_PER_SEC = float(os.getenv("MOCK_TOKENS_PER_SEC", "80"))
+ESSAY_TOKENS = int(os.getenv("MOCK_ESSAY_TOKENS", "700"))
+SMALL_SPEEDUP = float(os.getenv("MOCK_SMALL_SPEEDUP", "2.5"))
+SERVED_MODELS = [m for m in os.getenv("MOCK_MODELS", "").split(",") if m]
+LISTED_MODELS = SERVED_MODELS or ["claude-sonnet-4-5-20250929", "claude-haiku-4-5-20251001", "claude-opus-4-1-20250805"]
+
+WORDS = (
+    "I learned that curiosity grows when it is shared and every project I built taught me "
+    "something about patience community and the quiet work behind visible results"
+).split()
+
+# anthropic.transform_schema folds unsupported keywords into the description, e.g. "{enum: ['a', 'b']}"
+FOLDED_ENUM = re.compile(r"\{enum: \[(.*?)\]\}")
+QUOTED = re.compile(r"'([^']*)'")
+
+CURRENT_ESSAY = re.compile(r"CURRENT_ESSAY:\n(.*?)\n\n[A-Z_]+ \(JSON\):", re.S)
+
+ID_PATTERNS = {
+    "scholarship_id": re.compile(r'"id":"(sch_[^"]+)"'),
+    "student_id": re.compile(r'"id":"(stu_[^"]+)"'),
+}
+
+app = FastAPI(title="Mock Anthropic API")
+
+
+def speedup(model: str) -> float:
+    return SMALL_SPEEDUP if "haiku" in model else 1.0
+
+
+def ttft_seconds(model: str) -> float:
+    return random.lognormvariate(0, TTFT_SIGMA) * TTFT_MS / 1000 / speedup(model)
+
+
+def token_rate(model: str) -> float:
+    return TOKENS_PER_SEC * random.uniform(0.8, 1.2) * speedup(model)
+
+
+def prompt_text(body: dict) -> str:
+    parts = []
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content or [])
+    return "\n".join(parts)
+
+
+def resolve(schema: dict, defs: dict) -> dict:
+    return defs[schema["$ref"].split("/")[-1]] if "$ref" in schema else schema
+
+
+def fake_value(schema: dict, defs: dict, key: str, prompt: str, ids: dict = None):
+    if "$ref" in schema:
+        return fake_value(resolve(schema, defs), defs, key, prompt, ids)
+    if "enum" in schema:
+        return random.choice(schema["enum"])
+    folded = FOLDED_ENUM.search(schema.get("description", ""))
+    if folded:
+        return random.choice(QUOTED.findall(folded.group(1)))
+    if "anyOf" in schema:
+        return fake_value(schema["anyOf"][0], defs, key, prompt)
+    kind = schema.get("type")
+    if kind == "object":
+        return {k: fake_value(v, defs, k, prompt, ids) for k, v in schema.get("properties", {}).items()}
+    if kind == "array":
+        items = schema.get("items", {})
+        if "scholarship_id" in resolve(items, defs).get("properties", {}):
+            # packed matching: one entry per scholarship in the prompt, in order
+            found = dict.fromkeys(ID_PATTERNS["scholarship_id"].findall(prompt))
+            return [fake_value(items, defs, key, prompt, {"scholarship_id": sid}) for sid in found]
+        return [fake_value(items, defs, key, prompt, ids) for _ in range(3)]
+    if kind == "integer":
+        return random.randint(0, 100)
+    if kind == "number":
+        return round(random.random(), 2)
+    if kind == "boolean":
+        return random.random() < 0.5
+    if ids and key in ids:
+        return ids[key]
+    if key == "find":
+        # essay revisions: quote a real passage so the edit applies
+        essay = CURRENT_ESSAY.search(prompt)
+        if essay:
+            words = essay.group(1).split()
+            start = random.randrange(max(1, len(words) - 8))
+            return " ".join(words[start:start + 8])
+    if key in ID_PATTERNS:
+        found = ID_PATTERNS[key].search(prompt)
+        if found:
+            return found.group(1)
+    return " ".join(random.choices(WORDS, k=8))
+
+
+def response_text(body: dict) -> str:
+    output_format = body.get("output_format")
+    if output_format:
+        schema = output_format["schema"]
+        return json.dumps(fake_value(schema, schema.get("$defs", {}), "", prompt_text(body)))
+    return " ".join(random.choices(WORDS, k=int(ESSAY_TOKENS * 0.75)))
+
+
+def usage(body: dict, output_tokens: int) -> dict:
+    input_tokens = (len(json.dumps(body.get("system", ""))) + len(prompt_text(body))) // 4
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+
+
+def message(body: dict, text: str, output_tokens: int) -> dict:
+    return {
+        "id": f"msg_mock_{uuid.uuid4().hex[:12]}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", "mock"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": usage(body, output_tokens),
+    }
+
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def served(model: str) -> bool:
+    return not SERVED_MODELS or any(m == model or m.startswith(model + "-") for m in SERVED_MODELS)
+
+
+@app.get("/v1/models")
+async def models():
+    data = [{"type": "model", "id": m, "display_name": m, "created_at": "2025-01-01T00:00:00Z"} for m in LISTED_MODELS]
+    return {"data": data, "has_more": False, "first_id": data[0]["id"], "last_id": data[-1]["id"]}
+
+
+@app.post("/v1/messages")
+async def messages(request: Request):
+    body = await request.json()
+    if not served(body.get("model", "")):
+        await asyncio.sleep(ttft_seconds(body.get("model", "")))
+        error = {"type": "not_found_error", "message": f"model: {body.get('model')}"}
+        return JSONResponse({"type": "error", "error": error}, status_code=404)
+    text = response_text(body)
+    output_tokens = max(1, len(text) // 4)
+    if output_tokens > body.get("max_tokens", output_tokens):
+        # cut off like the real API would (only tiny probes hit this; structured outputs fit)
+        output_tokens = body["max_tokens"]
+        text = text[:output_tokens * 4]
+    model = body.get("model", "")
+    rate = token_rate(model)
+
+    if not body.get("stream"):
+        await asyncio.sleep(ttft_seconds(model) + output_tokens / rate)
+        return JSONResponse(message(body, text, output_tokens))
+
+    async def stream():
+        start = message(body, "", 0)
+        start["content"] = []
+        yield sse("message_start", {"type": "message_start", "message": start})
+        await asyncio.sleep(ttft_seconds(model))
+        yield sse("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        # ~4 chars per token, emitted in small chunks at the sampled token rate
+        chunk = 16
+        for i in range(0, len(text), chunk):
+            yield sse("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text[i:i + chunk]}})
+            await asyncio.sleep((chunk / 4) / rate)
+        yield sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield sse("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": usage(body, output_tokens)})
+        yield sse("message_stop", {"type": "message_stop"})
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
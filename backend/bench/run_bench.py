@@ -0,0 +1,381 @@
+# Load benchmark for the FastAPI app against the local mock model server (no real API calls, no cost).
+#
+# Starts mock_server.py in a subprocess, points the app's Anthropic client at it via ANTHROPIC_BASE_URL,
+# serves api.app with uvicorn in a background thread (with an event-loop lag probe on that loop), then
+# drives each scenario at rising concurrency over real HTTP from a separate load-generator process.
+# Every request uses a fresh student / scholarship id so the result caches and single-flight never
+# short-circuit the upstream call.
+#
+# Loop lag is only meaningful with spare cores: on a single CPU the mock and the load generator
+# preempt the app process and that shows up as lag too.
+#
+# Run from backend/bench:
+#   python run_bench.py --levels 1,4,16,64 --out results.json
+#   python run_bench.py --baseline results.json     # exits 1 if p95 or throughput regressed
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+LIB_DIR = BENCH_DIR.parent / "lib"
+DATA_DIR = BENCH_DIR.parent / "data"
+
+SCENARIOS = ["analyze", "match", "pipeline", "essay_general", "essay_specific_stream", "essay_revise"]
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+# --- SERVERS ---
+
+def start_mock(port: int, args) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        MOCK_TTFT_MS=str(args.ttft_ms),
+        MOCK_TTFT_SIGMA=str(args.ttft_sigma),
+        MOCK_TOKENS_PER_SEC=str(args.tokens_per_sec),
+        MOCK_ESSAY_TOKENS=str(args.essay_tokens),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "mock_server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BENCH_DIR,
+        env=env,
+    )
+
+
+def wait_until_up(url: str, timeout: float = 15) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+class LoopLagProbe:
+    """Sleeps `interval` in a loop on the app's event loop; any overshoot is time the loop was blocked."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: list[float] = []
+
+    async def run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def reset(self) -> list[float]:
+        samples, self.samples = self.samples, []
+        return samples
+
+
+class AppServer(threading.Thread):
+    """Runs api.app under uvicorn on its own event loop, next to a LoopLagProbe."""
+
+    def __init__(self, app, port: int):
+        super().__init__(daemon=True)
+        import uvicorn
+
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.probe = LoopLagProbe()
+
+    def run(self) -> None:
+        async def main():
+            probe = asyncio.create_task(self.probe.run())
+            await self.server.serve()
+            probe.cancel()
+
+        asyncio.run(main())
+
+
+# --- WORKLOAD ---
+
+class Workload:
+    """Builds request bodies from the bundled dataset, with a unique id suffix per request."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.students = json.loads((DATA_DIR / "students.json").read_text())
+        self.scholarships = json.loads((DATA_DIR / "scholarships.json").read_text())
+        self.analyses: dict[str, dict] = {}
+        self.matches: dict[str, dict] = {}
+        self.counter = itertools.count()
+
+    async def prepare(self) -> None:
+        # One analysis + match per scholarship, reused as inputs for the match / essay scenarios
+        student = self.students[0]
+        for scholarship in self.scholarships:
+            r = await self.client.post("/api/analyze-scholarship", json=scholarship)
+            r.raise_for_status()
+            self.analyses[scholarship["id"]] = r.json()
+            r = await self.client.post("/api/match-student", json={"student": student, "scholarship": scholarship, "analysis": r.json()})
+            r.raise_for_status()
+            self.matches[scholarship["id"]] = r.json()
+
+    def fresh(self) -> tuple[dict, dict]:
+        n = next(self.counter)
+        student = dict(self.students[n % len(self.students)])
+        scholarship = dict(self.scholarships[n % len(self.scholarships)])
+        student["id"] = f"{student['id']}-bench{n}"
+        scholarship["id"] = f"{scholarship['id']}-bench{n}"
+        return student, scholarship
+
+    def base_id(self, scholarship: dict) -> str:
+        return scholarship["id"].split("-bench")[0]
+
+    async def request(self, scenario: str) -> tuple[float, float]:
+        """Runs one request. Returns (time to first body byte, total latency) in seconds."""
+        student, scholarship = self.fresh()
+        sid = self.base_id(scholarship)
+        if scenario == "analyze":
+            method, path, body = "POST", "/api/analyze-scholarship", scholarship
+        elif scenario == "match":
+            method, path, body = "POST", "/api/match-student", {"student": student, "scholarship": scholarship, "analysis": self.analyses[sid]}
+        elif scenario == "pipeline":
+            # Catalog ids only; the unique student keeps the match uncached (the analysis is cached after warm-up)
+            method, path, body = "POST", "/api/pipeline/match", {"student": student, "scholarship_id": sid}
+        elif scenario == "essay_general":
+            method, path, body = "POST", "/api/essay/general", student
+        elif scenario == "essay_specific_stream":
+            body = {"student": student, "scholarship": scholarship, "analysis": self.analyses[sid], "match": self.matches[sid]}
+            method, path = "POST", "/api/essay/specific/stream"
+        elif scenario == "essay_revise":
+            # Untimed: store a first version, then time folding a one-field profile edit into it
+            body = {"student": student, "scholarship": scholarship, "analysis": self.analyses[sid], "match": self.matches[sid]}
+            (await self.client.post("/api/essay/specific", json=body)).raise_for_status()
+            body["student"] = {**student, "gpa": round(min(4.0, student["gpa"] + 0.1), 2)}
+            method, path = "POST", "/api/essay/specific/revise"
+        else:
+            raise ValueError(f"unknown scenario {scenario}")
+
+        start = time.perf_counter()
+        first = None
+        async with self.client.stream(method, path, json=body) as response:
+            async for _ in response.aiter_bytes():
+                if first is None:
+                    first = time.perf_counter() - start
+            response.raise_for_status()
+        total = time.perf_counter() - start
+        return first if first is not None else total, total
+
+
+async def run_level(workload: Workload, scenario: str, concurrency: int, per_worker: int) -> dict:
+    latencies: list[float] = []
+    ttfbs: list[float] = []
+    errors: dict[str, int] = {}
+
+    async def worker():
+        for _ in range(per_worker):
+            try:
+                ttfb, total = await workload.request(scenario)
+                ttfbs.append(ttfb)
+                latencies.append(total)
+            except Exception as e:
+                name = f"http_{e.response.status_code}" if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+                errors[name] = errors.get(name, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": concurrency * per_worker,
+        "ok": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": summarize(latencies, ("p50", "p95", "p99", "max")),
+        "ttfb_ms": summarize(ttfbs, ("p50", "p95", "p99")),
+    }
+
+
+def summarize(seconds: list[float], stats: tuple[str, ...]) -> dict:
+    """Milliseconds for each of "pNN", "max" and "total"."""
+    out = {}
+    for stat in stats:
+        if stat == "max":
+            value = max(seconds, default=0.0)
+        elif stat == "total":
+            value = sum(seconds)
+        else:
+            value = percentile(seconds, float(stat[1:]))
+        out[stat] = round(value * 1000, 2)
+    return out
+
+
+def drive(conn, args) -> None:
+    """
+    Load generator, run in a child process so its own CPU work never shows up as app loop lag.
+    Sends ("start", scenario, concurrency) before each level and ("row", row) after it.
+    """
+
+    async def main():
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.app_port}", limits=limits, timeout=120) as client:
+            workload = Workload(client)
+            await workload.prepare()
+            for scenario in args.scenarios:
+                for concurrency in args.levels:
+                    conn.send(("start", scenario, concurrency))
+                    conn.send(("row", await run_level(workload, scenario, concurrency, args.requests_per_worker)))
+
+    try:
+        asyncio.run(main())
+    finally:
+        conn.send(("done",))
+
+
+# --- REPORTING ---
+
+def print_row(row: dict) -> None:
+    lat, lag = row["latency_ms"], row["loop_lag_ms"]
+    errors = sum(row["errors"].values())
+    print(
+        f"{row['scenario']:<22} {row['concurrency']:>5} {row['throughput_rps']:>9.2f} "
+        f"{lat['p50']:>9.1f} {lat['p95']:>9.1f} {lat['p99']:>9.1f} {row['ttfb_ms']['p50']:>9.1f} "
+        f"{lag['p99']:>8.2f} {lag['max']:>8.2f} {errors:>6}"
+    )
+
+
+def compare(results: list[dict], baseline_path: Path, tolerance: float) -> bool:
+    """Prints p95 / throughput deltas against a previous run. Returns False if anything regressed."""
+    baseline = json.loads(baseline_path.read_text())
+    before = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    ok = True
+    print(f"\nvs {baseline_path} ({baseline.get('commit') or 'unknown commit'}), tolerance {tolerance:.0%}")
+    for row in results:
+        old = before.get((row["scenario"], row["concurrency"]))
+        if old is None:
+            continue
+        p95 = row["latency_ms"]["p95"] / old["latency_ms"]["p95"] - 1 if old["latency_ms"]["p95"] else 0.0
+        rps = row["throughput_rps"] / old["throughput_rps"] - 1 if old["throughput_rps"] else 0.0
+        regressed = p95 > tolerance or rps < -tolerance
+        ok &= not regressed
+        flag = "REGRESSED" if regressed else ""
+        print(f"{row['scenario']:<22} {row['concurrency']:>5}  p95 {p95:+7.1%}  rps {rps:+7.1%}  {flag}")
+    return ok
+
+
+def collect(conn, probe: LoopLagProbe) -> list[dict]:
+    print(f"{'scenario':<22} {'conc':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ttfb ms':>9} {'lag p99':>8} {'lag max':>8} {'errors':>6}")
+    results = []
+    while True:
+        message = conn.recv()
+        if message[0] == "start":
+            probe.reset()
+        elif message[0] == "row":
+            row = message[1]
+            row["loop_lag_ms"] = summarize(probe.reset(), ("p50", "p99", "max", "total"))
+            print_row(row)
+            results.append(row)
+        else:
+            return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the API against a local mock model server.")
+    parser.add_argument("--levels", default="1,4,16,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {SCENARIOS}")
+    parser.add_argument("--requests-per-worker", type=int, default=5)
+    parser.add_argument("--ttft-ms", type=float, default=400, help="Mock median time to first token")
+    parser.add_argument("--ttft-sigma", type=float, default=0.35, help="Mock lognormal sigma for time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=80, help="Mock mean output token rate")
+    parser.add_argument("--essay-tokens", type=int, default=700, help="Mock output tokens per essay")
+    parser.add_argument("--rpm", type=float, default=0, help="Scheduler requests/min limit (0 = unlimited)")
+    parser.add_argument("--itpm", type=float, default=0, help="Scheduler input tokens/min limit (0 = unlimited)")
+    parser.add_argument("--otpm", type=float, default=0, help="Scheduler output tokens/min limit (0 = unlimited)")
+    parser.add_argument("--mock-port", type=int, default=8787)
+    parser.add_argument("--app-port", type=int, default=8788)
+    parser.add_argument("--out", type=Path, help="Write machine-readable results (JSON) here")
+    parser.add_argument("--baseline", type=Path, help="Previous --out file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p95 / throughput regression")
+    args = parser.parse_args()
+    args.levels = [int(x) for x in args.levels.split(",")]
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+
+    mock = start_mock(args.mock_port, args)
+    tmp = tempfile.TemporaryDirectory()
+    try:
+        wait_until_up(f"http://127.0.0.1:{args.mock_port}/docs")
+
+        # Must be set before api is imported: the caches are created at import time, the client on first use
+        os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{args.mock_port}"
+        os.environ["ANTHROPIC_API_KEY"] = "bench"
+        os.environ["ANTHROPIC_RPM"] = str(args.rpm)
+        os.environ["ANTHROPIC_ITPM"] = str(args.itpm)
+        os.environ["ANTHROPIC_OTPM"] = str(args.otpm)
+        os.environ["SCHOLARSHIP_CACHE_PATH"] = str(Path(tmp.name) / "cache.sqlite3")
+        os.environ["ESSAY_STORE_PATH"] = str(Path(tmp.name) / "essays.sqlite3")
+        os.environ["JOB_STORE_PATH"] = str(Path(tmp.name) / "jobs.sqlite3")
+        os.environ["AGENT_SESSION_PATH"] = str(Path(tmp.name) / "sessions.sqlite3")
+        os.environ["MODEL_MANIFEST_PATH"] = str(Path(tmp.name) / "models.json")
+        sys.path.insert(0, str(LIB_DIR))
+        import api
+
+        server = AppServer(api.app, args.app_port)
+        server.start()
+        wait_until_up(f"http://127.0.0.1:{args.app_port}/")
+
+        # spawn, not fork: this process already runs the server thread
+        ctx = multiprocessing.get_context("spawn")
+        parent, child = ctx.Pipe()
+        driver = ctx.Process(target=drive, args=(child, args))
+        driver.start()
+        results = collect(parent, server.probe)
+        driver.join()
+        if driver.exitcode:
+            raise RuntimeError(f"load generator exited with {driver.exitcode}")
+        server.server.should_exit = True
+        server.join(timeout=10)
+    finally:
+        mock.terminate()
+        mock.wait()
+        tmp.cleanup()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "config": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        "results": results,
+    }
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+        print(f"\nWrote {args.out}")
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# Cold-start benchmark: how long until a fresh process can make its first model call.
+#
+# Every scenario runs in a new interpreter, so nothing is shared between runs:
+#
+#   baseline        bare interpreter, for reference
+#   legacy_probe    the old testt.py startup: build a client, then send a test message to each known
+#                   model in turn until one answers (the mock serves only the last one)
+#   registry_cold   model_registry.resolve() with no manifest on disk: one models.list call
+#   registry_warm   model_registry.resolve() from the manifest the cold run wrote
+#   api_import      `import api`
+#   cli_import      `import testt` (the CLI)
+#
+# The mock is stopped before the last three scenarios, so any network access there would fail
+# loudly; each run also reports whether an Anthropic client was even created.
+#
+# Run from backend/bench:
+#   python startup_bench.py --runs 5 --ttft-ms 400
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from run_bench import BENCH_DIR, LIB_DIR, wait_until_up
+
+
+REPO_DIR = BENCH_DIR.parent.parent
+
+# The model list testt.py used to probe, oldest API names first
+LEGACY_MODELS = [
+    "claude-3-5-sonnet-20241022",
+    "claude-3-opus-20240229",
+    "claude-3-sonnet-20240229",
+    "claude-3-haiku-20240307",
+]
+
+PRELUDE = "import time; _t0 = time.perf_counter()\n"
+
+REPORT = (
+    "import json, sys\n"
+    "_registry = sys.modules.get('model_registry')\n"
+    "_client = bool(_registry and (_registry.model_registry._client or _registry.model_registry._async_client))\n"
+    "print(json.dumps({'ms': (time.perf_counter() - _t0) * 1000, 'client': _client}))\n"
+)
+
+SCENARIOS = {
+    "baseline": "",
+    "legacy_probe": (
+        "import anthropic\n"
+        "client = anthropic.Anthropic()\n"
+        f"for model in {LEGACY_MODELS!r}:\n"
+        "    try:\n"
+        "        client.messages.create(model=model, max_tokens=5, messages=[{'role': 'user', 'content': 'test'}])\n"
+        "        break\n"
+        "    except anthropic.NotFoundError:\n"
+        "        pass\n"
+        "_client = True\n"
+    ),
+    "registry_cold": (
+        "from model_registry import model_registry\n"
+        "model_registry.resolve(['claude-sonnet-4-5', 'claude-haiku-4-5'])\n"
+    ),
+    "registry_warm": (
+        "from model_registry import model_registry\n"
+        "model_registry.resolve(['claude-sonnet-4-5', 'claude-haiku-4-5'])\n"
+    ),
+    "api_import": "import api\n",
+    "cli_import": "import testt\n",
+}
+
+OFFLINE = ("registry_warm", "api_import", "cli_import")
+
+
+def run_once(name: str, env: dict) -> dict:
+    code = PRELUDE + SCENARIOS[name] + REPORT
+    start = time.perf_counter()
+    done = subprocess.run([sys.executable, "-c", code], env=env, cwd=LIB_DIR, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if done.returncode:
+        raise RuntimeError(f"{name} failed:\n{done.stderr}")
+    if "WARNING" in done.stdout:
+        raise RuntimeError(f"{name} tried the network:\n{done.stdout}")
+    result = json.loads(done.stdout.strip().splitlines()[-1])
+    return {"wall_ms": wall_ms, "in_process_ms": result["ms"], "client": result["client"] or name == "legacy_probe"}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure process cold start with and without live model probing.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per scenario")
+    parser.add_argument("--ttft-ms", type=float, default=400, help="Mock median time to first token")
+    parser.add_argument("--mock-port", type=int, default=8789)
+    parser.add_argument("--out", type=Path, help="Write machine-readable results (JSON) here")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([str(LIB_DIR), str(REPO_DIR)]),
+        ANTHROPIC_BASE_URL=f"http://127.0.0.1:{args.mock_port}",
+        ANTHROPIC_API_KEY="bench",
+        MODEL_MANIFEST_PATH=str(Path(tmp.name) / "models.json"),
+        AGENT_SESSION_PATH=str(Path(tmp.name) / "sessions.sqlite3"),
+        SCHOLARSHIP_CACHE_PATH=str(Path(tmp.name) / "cache.sqlite3"),
+        ESSAY_STORE_PATH=str(Path(tmp.name) / "essays.sqlite3"),
+        JOB_STORE_PATH=str(Path(tmp.name) / "jobs.sqlite3"),
+    )
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "mock_server:app", "--port", str(args.mock_port), "--log-level", "warning"],
+        cwd=BENCH_DIR,
+        env=dict(
+            os.environ,
+            MOCK_TTFT_MS=str(args.ttft_ms),
+            MOCK_MODELS="claude-3-haiku-20240307,claude-sonnet-4-5-20250929,claude-haiku-4-5-20251001",
+        ),
+    )
+
+    results = {}
+    try:
+        wait_until_up(f"http://127.0.0.1:{args.mock_port}/docs")
+        for name in SCENARIOS:
+            if name in OFFLINE and mock.poll() is None:
+                mock.terminate()
+                mock.wait()
+            if name == "registry_cold":
+                # every cold run starts without a manifest; the last one leaves it for registry_warm
+                runs = []
+                for _ in range(args.runs):
+                    Path(env["MODEL_MANIFEST_PATH"]).unlink(missing_ok=True)
+                    runs.append(run_once(name, env))
+            else:
+                runs = [run_once(name, env) for _ in range(args.runs)]
+            results[name] = {
+                "wall_ms": round(statistics.median(r["wall_ms"] for r in runs), 1),
+                "in_process_ms": round(statistics.median(r["in_process_ms"] for r in runs), 1),
+                "client_created": any(r["client"] for r in runs),
+            }
+            row = results[name]
+            print(f"{name:<14} wall {row['wall_ms']:>8.1f} ms   in-process {row['in_process_ms']:>8.1f} ms   client {'yes' if row['client_created'] else 'no'}")
+    finally:
+        if mock.poll() is None:
+            mock.terminate()
+            mock.wait()
+        tmp.cleanup()
+
+    if args.out:
+        args.out.write_text(json.dumps({"config": {"runs": args.runs, "ttft_ms": args.ttft_ms}, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,20 @@
 import os
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+import json
+import asyncio
+import base64
+import binascii
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Literal, Optional, Union
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from anthropic import Anthropic
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 
 # 1. IMPORT MODELS FROM YOUR EXISTING SCHEMAS FILE
 from schemas import (
+    AgentProfile,
+    ProfilePatchOp,
     Student, 
     Scholarship, 
     ScholarshipAnalysis, 
@@ -15,22 +23,80 @@ from schemas import (
 
 # 2. IMPORT LOGIC FROM YOUR EXISTING HELPERS FILE
 from helpers import (
-    analyze_scholarship, 
-    match_student_scholarship, 
-    generate_general_essay, 
-    generate_specific_essay
+    analyze_scholarship_async,
+    match_student_scholarship_async,
+    generate_general_essay_async,
+    analyze_and_match_async,
+    agent_session_turn_async,
+    revise_specific_essay_async,
+    stored_specific_essay_async,
+    stream_stored_specific_essay_async,
+    match_pack_async,
+    plan_match_packs,
+    stream_general_essay_async
 )
+from cache import AnalysisCache, MatchCache
+from essays import EssayStore
+from jobs import FINISHED, POLL_INTERVAL, IdempotencyConflict, JobKind, JobQueue, JobRunner
+from catalog import open_catalog
+from ingest import INGEST_BATCH_SIZE, drain_analysis_queue, ingest_ndjson
+from store import StoreCatalog
+from prescore import PreScorer
+from sessions import SessionStore
+from eligibility import EligibilityIndex, check_eligibility, ineligible_match
+from usage import usage_tracker
+from metrics import CASCADE_COMPARED, MetricsMiddleware, registry
+from scheduler import Backpressure, Priority, scheduler
+from model_registry import load_env, model_registry
 
 # 3. SETUP CLIENT
-load_dotenv()
-API_KEY = os.getenv("ANTHROPIC_API_KEY")
-if not API_KEY:
+# Nothing here touches the network: the shared async client (one connection pool, retries left to the
+# scheduler) is created by the registry on the first request that needs it.
+load_env()
+if not os.getenv("ANTHROPIC_API_KEY"):
     print("WARNING: ANTHROPIC_API_KEY missing.")
 
-# Global client instance to pass to helpers
-client = Anthropic(api_key=API_KEY)
+# Persistent analysis cache (SQLite), shared with any batch job pointing at the same file
+analysis_cache = AnalysisCache()
+match_cache = MatchCache()
 
-app = FastAPI(title="Scholarship Backend API")
+# Scholarship / student catalog: backend/data/*.json, or the on-disk store once migrated (see store.py)
+catalog = open_catalog()
+
+# Hard limits (GPA, degree level, year, citizenship, country) extracted from criteria_text when a
+# scholarship is written. The index is built on first use from those stored limits (no records are
+# parsed), and dropped whenever the catalog changes underneath us.
+eligibility_index: Optional[EligibilityIndex] = None
+
+def eligibility() -> EligibilityIndex:
+    global eligibility_index
+    if eligibility_index is None:
+        eligibility_index = EligibilityIndex(catalog.iter_constraints())
+    return eligibility_index
+
+def reset_eligibility(updated):
+    global eligibility_index
+    eligibility_index = None
+
+catalog.subscribe(reset_eligibility)
+
+# Profile-building chat sessions; turns on one session run one at a time
+session_store = SessionStore()
+session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+# Specific essays by input fingerprint, with a version history per student/scholarship
+essay_store = EssayStore()
+
+# Durable background jobs (essays, bulk matching), run by a worker pool that starts with the app
+job_runner = JobRunner(JobQueue())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_runner.start()
+    yield
+    await job_runner.stop()
+
+app = FastAPI(title="Scholarship Backend API", lifespan=lifespan)
 
 # 4. CORS SETUP
 app.add_middleware(
@@ -40,6 +106,48 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(Backpressure)
+async def backpressure_handler(request: Request, exc: Backpressure):
+    # Out of model capacity is a "try again later", not a server error
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+# Scrape-time collectors: read counters the caches and usage tracker already keep
+@registry.collector
+def collect_usage():
+    yield "# HELP model_tokens_total Tokens reported in response.usage per helper"
+    yield "# TYPE model_tokens_total counter"
+    for task, totals in usage_tracker.snapshot().items():
+        for kind in ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"):
+            yield f'model_tokens_total{{task="{task}",kind="{kind}"}} {totals[kind]}'
+
+@registry.collector
+def collect_cache_ratios():
+    stores = (("analysis", analysis_cache), ("match", match_cache))
+    yield "# HELP result_cache_lookups_total Analysis/match cache lookups by outcome"
+    yield "# TYPE result_cache_lookups_total counter"
+    for name, store in stores:
+        yield f'result_cache_lookups_total{{cache="{name}",outcome="hit"}} {store.hits}'
+        yield f'result_cache_lookups_total{{cache="{name}",outcome="miss"}} {store.misses}'
+    yield "# HELP result_cache_hit_ratio Hits / lookups since startup"
+    yield "# TYPE result_cache_hit_ratio gauge"
+    for name, store in stores:
+        lookups = store.hits + store.misses
+        yield f'result_cache_hit_ratio{{cache="{name}"}} {store.hits / lookups if lookups else 0.0}'
+
+@registry.collector
+def collect_cascade_agreement():
+    yield "# HELP match_cascade_agreement_ratio Share of pairs scored by both tiers whose scores agreed"
+    yield "# TYPE match_cascade_agreement_ratio gauge"
+    for outcome in ("escalated", "audited"):
+        agreed, disagreed = CASCADE_COMPARED.value(outcome, "true"), CASCADE_COMPARED.value(outcome, "false")
+        if agreed + disagreed:
+            yield f'match_cascade_agreement_ratio{{outcome="{outcome}"}} {agreed / (agreed + disagreed)}'
 
 # --- REQUEST BODY WRAPPERS ---
 # These are necessary to bundle multiple objects into one POST request
@@ -49,25 +157,215 @@ class MatchRequest(BaseModel):
     scholarship: Scholarship
     analysis: ScholarshipAnalysis
 
+class BatchMatchRequest(BaseModel):
+    student: Student
+    scholarship_ids: Union[Literal["all"], list[str]] = "all"
+    concurrency: int = Field(4, ge=1, le=16, description="Max analyze+match pipelines running at once")
+    format: Literal["ndjson", "sse"] = "ndjson"
+    top_k: Optional[int] = Field(None, ge=1, description="Only send the K best locally pre-scored scholarships to the model")
+    packed: bool = Field(False, description="Score many scholarships per model call (far fewer calls; results arrive a pack at a time)")
+
+class PipelineMatchRequest(BaseModel):
+    student: Student
+    scholarship_id: str
+    stream_essay: bool = Field(False, description="Also stream the tailored essay (SSE) after the analysis and match")
+
+class PipelineMatchResponse(BaseModel):
+    analysis: ScholarshipAnalysis
+    match: StudentScholarshipMatch
+
+class ScholarshipSearchHit(BaseModel):
+    scholarship: Scholarship
+    score: float
+
 class SpecificEssayRequest(BaseModel):
     student: Student
     scholarship: Scholarship
     analysis: ScholarshipAnalysis
     match: StudentScholarshipMatch
 
+class EssayRevisionRequest(SpecificEssayRequest):
+    base_version: Optional[int] = Field(None, description="Stored version to revise (latest if omitted)")
+
+class AgentSessionRequest(BaseModel):
+    profile: Optional[AgentProfile] = Field(None, description="Starting profile (empty if omitted)")
+
+class AgentMessageRequest(BaseModel):
+    message: str = Field(..., min_length=1)
+
+class AgentMessageResponse(BaseModel):
+    assistant_reply: str
+    action: str
+    patch: list[ProfilePatchOp] = Field(..., description="Operations the model returned for this turn")
+    rejected: list[dict] = Field(..., description="Operations that could not be applied, with the reason")
+    profile: AgentProfile
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def conditional_json(request: Request, content, headers: Optional[dict] = None) -> Response:
+    """
+    JSON response tagged with the catalog version; answers 304 without serializing when the client's copy is current.
+    """
+    etag = f'W/"{catalog.version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(content, headers={"ETag": etag, **(headers or {})})
+
+def encode_cursor(scholarship_id: str) -> str:
+    return base64.urlsafe_b64encode(scholarship_id.encode()).decode()
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def stream_essay_sse(request: Request, deltas):
+    """
+    Relays essay text deltas as SSE. Stops (and closes the upstream stream) as soon as the client disconnects.
+    """
+    try:
+        async for text in deltas:
+            if await request.is_disconnected():
+                break
+            yield sse_event("delta", {"text": text})
+        else:
+            yield sse_event("done", {})
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Essay generation failed: {str(e)}"})
+    finally:
+        await deltas.aclose()
+
 # --- ENDPOINTS ---
 
 @app.get("/")
 def health_check():
     return {"status": "API is running"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """
+    Prometheus text exposition: HTTP counts/latency/in-flight, model latency/errors/retries, tokens and cache hit ratios.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/scholarships")
+def api_list_scholarships(
+    request: Request,
+    tag: Optional[list[str]] = Query(None, description="Only scholarships carrying every given tag"),
+    deadline_after: Optional[str] = Query(None, description="Inclusive ISO date lower bound"),
+    deadline_before: Optional[str] = Query(None, description="Inclusive ISO date upper bound"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    """
+    Lists the catalog (ordered by id). With `limit`, the next page's cursor is in the X-Next-Cursor header.
+    """
+    catalog.refresh()
+    page, next_id = catalog.query_scholarships(
+        tags=tag,
+        deadline_after=deadline_after,
+        deadline_before=deadline_before,
+        after_id=decode_cursor(cursor) if cursor else None,
+        limit=limit,
+    )
+    headers = {"X-Next-Cursor": encode_cursor(next_id)} if next_id else None
+    return conditional_json(request, [s.model_dump() for s in page], headers)
+
+# Must be declared before /api/scholarships/{scholarship_id}, or "search" would be taken as an id
+@app.get("/api/scholarships/search", response_model=list[ScholarshipSearchHit])
+def api_search_scholarships(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Free-text query over name, description, criteria and tags"),
+    tag: Optional[list[str]] = Query(None, description="Only scholarships carrying every given tag"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    BM25-ranked full-text search over the catalog, best match first.
+    """
+    catalog.refresh()
+    hits = catalog.search_scholarships(q, tags=tag, limit=limit)
+    return conditional_json(request, [{"scholarship": s.model_dump(), "score": round(score, 4)} for s, score in hits])
+
+# Background analysis of ingested scholarships (the queue itself lives in the store)
+analysis_worker: Optional[asyncio.Task] = None
+
+def start_analysis_worker():
+    global analysis_worker
+    if analysis_worker is None or analysis_worker.done():
+        analysis_worker = asyncio.create_task(drain_analysis_queue(
+            catalog.store,
+            lambda s: analyze_scholarship_async(model_registry.async_client(), s, cache=analysis_cache, priority=Priority.BACKGROUND),
+        ))
+
+@app.post("/api/scholarships/ingest")
+async def api_ingest_scholarships(request: Request, batch_size: int = Query(INGEST_BATCH_SIZE, ge=1, le=10_000)):
+    """
+    Bulk upsert from an NDJSON body (one Scholarship per line), read and validated incrementally.
+    Returns one report per batch (accepted / rejected / inserted / updated / unchanged, first errors,
+    throughput) plus totals. New or changed scholarships are queued for analysis.
+    The reports come back in one body rather than streamed, because streaming a response while
+    the upload is still being read is not reliable under uvicorn.
+    """
+    if not isinstance(catalog, StoreCatalog):
+        raise HTTPException(status_code=409, detail="Ingestion needs the on-disk catalog store: run `python store.py migrate` first")
+    catalog.refresh()
+
+    def upsert(scholarships: list[Scholarship], content_hashes: list[str]) -> list[str]:
+        return catalog.upsert_scholarships(scholarships, content_hashes=content_hashes, queue_analysis=True)
+
+    def on_batch(scholarships: list[Scholarship], outcomes: list[str]):
+        # keep hard-limit screening current without a full rebuild (an index not built yet reads the store)
+        if eligibility_index is not None:
+            for scholarship, outcome in zip(scholarships, outcomes):
+                if outcome != "unchanged":
+                    eligibility_index.add_scholarship(scholarship)
+        start_analysis_worker()
+
+    batches = []
+    async for report in ingest_ndjson(request.stream(), upsert, batch_size=batch_size, on_batch=on_batch):
+        batches.append(report)
+    summary = batches.pop()
+    return {**summary, "analysis_backlog": catalog.store.analysis_backlog(), "batch_reports": batches}
+
+@app.get("/api/scholarships/{scholarship_id}")
+def api_get_scholarship(scholarship_id: str, request: Request):
+    catalog.refresh()
+    scholarship = catalog.get_scholarship(scholarship_id)
+    if scholarship is None:
+        raise HTTPException(status_code=404, detail=f"Scholarship {scholarship_id} not found")
+    return conditional_json(request, scholarship.model_dump())
+
+@app.get("/api/students")
+def api_list_students(request: Request):
+    catalog.refresh()
+    return conditional_json(request, [s.model_dump() for s in catalog.students.values()])
+
+@app.get("/api/students/{student_id}")
+def api_get_student(student_id: str, request: Request):
+    catalog.refresh()
+    student = catalog.get_student(student_id)
+    if student is None:
+        raise HTTPException(status_code=404, detail=f"Student {student_id} not found")
+    return conditional_json(request, student.model_dump())
+
+@app.get("/api/usage")
+def api_usage():
+    """
+    Per-task token totals, including prompt-cache writes/reads and the cache read ratio.
+    """
+    return usage_tracker.snapshot()
+
 @app.post("/api/analyze-scholarship", response_model=ScholarshipAnalysis)
 async def api_analyze(scholarship: Scholarship):
     """
     Step 1: Analyzes the scholarship text to extract weights and themes.
     """
     try:
-        return analyze_scholarship(client, scholarship)
+        return await analyze_scholarship_async(model_registry.async_client(), scholarship, cache=analysis_cache)
+    except Backpressure:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
@@ -76,37 +374,484 @@ async def api_match(data: MatchRequest):
     """
     Step 2: Matches a student to a scholarship using the analysis from Step 1.
     """
+    reasons = check_eligibility(data.student, data.scholarship)
+    if reasons:
+        return ineligible_match(data.student, data.scholarship.id, reasons)
     try:
-        return match_student_scholarship(client, data.student, data.scholarship, data.analysis)
+        return await match_student_scholarship_async(model_registry.async_client(), data.student, data.scholarship, data.analysis, cache=match_cache)
+    except Backpressure:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Matching failed: {str(e)}")
 
+@app.post("/api/pipeline/match")
+async def api_pipeline_match(data: PipelineMatchRequest, request: Request):
+    """
+    Steps 1+2 (+3b) in one round trip: resolves the analysis server-side (cached when possible),
+    matches the student, and optionally streams the tailored essay as SSE.
+    """
+    catalog.refresh()
+    scholarship = catalog.get_scholarship(data.scholarship_id)
+    if scholarship is None:
+        raise HTTPException(status_code=404, detail=f"Scholarship {data.scholarship_id} not found")
+
+    try:
+        analysis = await analyze_scholarship_async(model_registry.async_client(), scholarship, cache=analysis_cache)
+        reasons = check_eligibility(data.student, scholarship)
+        if reasons:
+            match = ineligible_match(data.student, scholarship.id, reasons)
+        else:
+            match = await match_student_scholarship_async(model_registry.async_client(), data.student, scholarship, analysis, cache=match_cache)
+    except Backpressure:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Pipeline failed: {str(e)}")
+
+    if not data.stream_essay:
+        return PipelineMatchResponse(analysis=analysis, match=match)
+    if not reasons:
+        scheduler.check_admission(Priority.ESSAY)
+
+    async def stream():
+        yield sse_event("analysis", analysis.model_dump(mode="json"))
+        yield sse_event("match", match.model_dump())
+        if reasons:
+            # No point writing an essay for a scholarship the student cannot apply to
+            yield sse_event("done", {})
+            return
+        deltas = stream_stored_specific_essay_async(model_registry.async_client(), essay_store, data.student, scholarship, analysis, match)
+        async for chunk in stream_essay_sse(request, deltas):
+            yield chunk
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+def batch_scholarships(data: BatchMatchRequest) -> list[str]:
+    """Ids of the scholarships a batch request asks for (nothing is parsed). Raises KeyError listing any unknown ids."""
+    catalog.refresh()
+    if data.scholarship_ids == "all":
+        return list(catalog.scholarships)
+    missing = [sid for sid in data.scholarship_ids if sid not in catalog.scholarships]
+    if missing:
+        raise KeyError(f"Unknown scholarship ids: {', '.join(missing)}")
+    return list(data.scholarship_ids)
+
+async def batch_match_items(data: BatchMatchRequest, scholarship_ids: list[str]) -> AsyncIterator[dict]:
+    """
+    Match dicts (or {"scholarship_id", "error"}) for one student in completion order. Shared by the
+    streaming endpoint and the match_batch job. Closing the generator cancels the outstanding work.
+    """
+    # Pairs that fail a hard limit get an instant, explained zero instead of a model call; only the
+    # scholarships that pass are loaded
+    index = eligibility()
+    eligible_ids = index.candidates(data.student)
+    rejected = [
+        ineligible_match(data.student, sid, index.reasons(data.student, sid))
+        for sid in scholarship_ids if sid in index.constraints and sid not in eligible_ids
+    ]
+    scholarships = [
+        s for s in (catalog.get_scholarship(sid) for sid in scholarship_ids if sid in eligible_ids or sid not in index.constraints)
+        if s is not None
+    ]
+
+    semaphore = asyncio.Semaphore(data.concurrency)
+
+    async def analyze_one(scholarship: Scholarship):
+        async with semaphore:
+            return await analyze_scholarship_async(model_registry.async_client(), scholarship, cache=analysis_cache, priority=Priority.BACKGROUND)
+
+    if data.top_k is not None and data.top_k < len(scholarships):
+        # Analyses are per-scholarship (and cached), so shortlisting only costs matches we skip
+        analyses = await asyncio.gather(*[analyze_one(s) for s in scholarships], return_exceptions=True)
+        prescorer = PreScorer((s.id, a) for s, a in zip(scholarships, analyses) if isinstance(a, ScholarshipAnalysis))
+        shortlist = {sid for sid, _ in prescorer.top_k(data.student, data.top_k)}
+        scholarships = [s for s in scholarships if s.id in shortlist]
+
+    async def run_one(scholarship: Scholarship) -> list[dict]:
+        async with semaphore:
+            try:
+                _, match = await analyze_and_match_async(
+                    model_registry.async_client(), data.student, scholarship,
+                    analysis_cache=analysis_cache, match_cache=match_cache, priority=Priority.BACKGROUND,
+                )
+                return [match.model_dump()]
+            except Exception as e:
+                return [{"scholarship_id": scholarship.id, "error": f"Matching failed: {str(e)}"}]
+
+    async def run_pack(pairs: list[tuple[Scholarship, ScholarshipAnalysis]]) -> list[dict]:
+        async with semaphore:
+            try:
+                results = await match_pack_async(model_registry.async_client(), data.student, pairs, cache=match_cache, priority=Priority.BACKGROUND)
+            except Exception as e:
+                results = {scholarship.id: e for scholarship, _ in pairs}
+        return [
+            result.model_dump() if isinstance(result, StudentScholarshipMatch)
+            else {"scholarship_id": sid, "error": f"Matching failed: {str(result)}"}
+            for sid, result in results.items()
+        ]
+
+    async def start_packs() -> tuple[list[asyncio.Task], list[dict]]:
+        # Packing needs every analysis up front (they size the packs); most are cache hits
+        analyses = await asyncio.gather(*[analyze_one(s) for s in scholarships], return_exceptions=True)
+        pairs, failed = [], []
+        for scholarship, analysis in zip(scholarships, analyses):
+            if isinstance(analysis, ScholarshipAnalysis):
+                pairs.append((scholarship, analysis))
+            else:
+                failed.append({"scholarship_id": scholarship.id, "error": f"Analysis failed: {str(analysis)}"})
+        return [asyncio.create_task(run_pack(pack)) for pack in plan_match_packs(data.student, pairs)], failed
+
+    tasks = []
+    try:
+        for match in rejected:
+            yield match.model_dump()
+        if data.packed:
+            tasks, failed = await start_packs()
+            for item in failed:
+                yield item
+        else:
+            tasks = [asyncio.create_task(run_one(scholarship)) for scholarship in scholarships]
+        for finished in asyncio.as_completed(tasks):
+            for item in await finished:
+                yield item
+    finally:
+        # Client went away (or we are done): don't keep paying for matches nobody will read
+        for task in tasks:
+            task.cancel()
+
+@app.post("/api/match-student/batch")
+async def api_match_batch(data: BatchMatchRequest):
+    """
+    Scores one student against many scholarships (or "all"), streaming each
+    StudentScholarshipMatch back as soon as it is ready (NDJSON or SSE).
+    """
+    try:
+        scholarship_ids = batch_scholarships(data)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+    def encode(item: dict) -> str:
+        if data.format == "sse":
+            return sse_event("error" if "error" in item else "match", item)
+        return json.dumps(item) + "\n"
+
+    async def stream():
+        items = batch_match_items(data, scholarship_ids)
+        try:
+            async for item in items:
+                yield encode(item)
+            if data.format == "sse":
+                yield sse_event("done", {})
+        finally:
+            await items.aclose()
+
+    media_type = "text/event-stream" if data.format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type)
+
+@app.post("/api/match-student/cached", response_model=list[StudentScholarshipMatch])
+async def api_cached_matches(student: Student):
+    """
+    Returns every already-scored match for this (exact) student profile in one lookup, best first.
+    """
+    return match_cache.for_student(student)
+
+@app.delete("/api/match-student/cached/{student_id}")
+async def api_invalidate_matches(student_id: str):
+    """
+    Drops cached matches for one student (e.g. after a profile edit).
+    """
+    return {"invalidated": match_cache.invalidate_student(student_id)}
+
 @app.post("/api/essay/general")
 async def api_general_essay(student: Student):
     """
     Step 3a: Generates a general Common App style essay.
     """
     try:
-        essay_text = generate_general_essay(client, student)
+        essay_text = await generate_general_essay_async(model_registry.async_client(), student)
         return {"essay": essay_text}
+    except Backpressure:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"General essay generation failed: {str(e)}")
 
 @app.post("/api/essay/specific")
-async def api_specific_essay(data: SpecificEssayRequest):
+async def api_specific_essay(data: SpecificEssayRequest, regenerate: bool = Query(False, description="Write a new version even if one is stored for these inputs")):
     """
     Step 3b: Generates a specific scholarship essay using all prior data.
+    Essays are stored by input fingerprint: unchanged inputs return the stored version ("cached": true)
+    without a model call.
     """
     try:
-        essay_text = generate_specific_essay(
-            client,
-            data.student, 
-            data.scholarship, 
-            data.analysis, 
-            data.match
+        return await stored_specific_essay_async(
+            model_registry.async_client(),
+            essay_store,
+            data.student,
+            data.scholarship,
+            data.analysis,
+            data.match,
+            regenerate=regenerate,
         )
-        return {"essay": essay_text}
+    except Backpressure:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Specific essay generation failed: {str(e)}")
 
-# To run: uvicorn api:app --reload
\ No newline at end of file
+@app.post("/api/essay/general/stream")
+async def api_general_essay_stream(student: Student, request: Request):
+    """
+    Step 3a (streaming): Same as /api/essay/general, but sends text deltas over SSE as they are generated.
+    """
+    scheduler.check_admission(Priority.ESSAY)
+    deltas = stream_general_essay_async(model_registry.async_client(), student)
+    return StreamingResponse(stream_essay_sse(request, deltas), media_type="text/event-stream")
+
+@app.post("/api/essay/specific/stream")
+async def api_specific_essay_stream(data: SpecificEssayRequest, request: Request):
+    """
+    Step 3b (streaming): Same as /api/essay/specific, but sends text deltas over SSE as they are generated.
+    """
+    scheduler.check_admission(Priority.ESSAY)
+    deltas = stream_stored_specific_essay_async(model_registry.async_client(), essay_store, data.student, data.scholarship, data.analysis, data.match)
+    return StreamingResponse(stream_essay_sse(request, deltas), media_type="text/event-stream")
+
+@app.post("/api/essay/specific/revise")
+async def api_revise_essay(data: EssayRevisionRequest):
+    """
+    Updates a stored essay for an edited profile (or re-scored match) instead of rewriting it: the model
+    gets the previous essay plus only the changed fields and returns targeted find/replace edits.
+    The result is stored as a new version; edits that did not apply are listed in `rejected`.
+    """
+    try:
+        return await revise_specific_essay_async(
+            model_registry.async_client(),
+            essay_store,
+            data.student,
+            data.scholarship,
+            data.analysis,
+            data.match,
+            base_version=data.base_version,
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Backpressure:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Essay revision failed: {str(e)}")
+
+@app.get("/api/essays/{student_id}")
+async def api_student_essays(student_id: str):
+    """
+    Latest stored essay version per scholarship for one student (metadata only), newest first.
+    """
+    return essay_store.for_student(student_id)
+
+@app.get("/api/essays/{student_id}/{scholarship_id}")
+async def api_essay_history(student_id: str, scholarship_id: str):
+    """
+    Version history for one student/scholarship pair, oldest first: how each version was made
+    (generated or revised from which version), the profile changes behind revisions, and word counts.
+    """
+    history = essay_store.history(student_id, scholarship_id)
+    if not history:
+        raise HTTPException(status_code=404, detail="No essays stored for this student and scholarship")
+    return history
+
+@app.get("/api/essays/{student_id}/{scholarship_id}/{version}")
+async def api_essay_version(student_id: str, scholarship_id: str, version: int):
+    """
+    One stored essay version, including its text.
+    """
+    record = essay_store.get(student_id, scholarship_id, version)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Essay version {version} not found")
+    return {key: value for key, value in record.items() if key not in ("student", "match", "inputs_fp")}
+
+
+# --- PROFILE AGENT SESSIONS ---
+
+@app.post("/api/agent/sessions", status_code=201)
+def api_create_agent_session(data: Optional[AgentSessionRequest] = None):
+    profile = data.profile if data and data.profile else AgentProfile()
+    return {"session_id": session_store.create(profile), "profile": profile}
+
+@app.get("/api/agent/sessions/{session_id}")
+def api_get_agent_session(session_id: str):
+    profile = session_store.profile(session_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return {"session_id": session_id, "profile": profile, "messages": session_store.history(session_id, limit=None)}
+
+@app.post("/api/agent/sessions/{session_id}/messages", response_model=AgentMessageResponse)
+async def api_agent_message(session_id: str, data: AgentMessageRequest):
+    """
+    One chat turn. The model sees the stored profile plus a short history window and answers with a
+    patch, which is applied here; the response carries the reply and the updated profile.
+    """
+    lock = session_locks.setdefault(session_id, asyncio.Lock())
+    async with lock:
+        try:
+            turn, profile, rejected = await agent_session_turn_async(model_registry.async_client(), session_store, session_id, data.message)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+        except Backpressure:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Agent turn failed: {str(e)}")
+    return AgentMessageResponse(
+        assistant_reply=turn.assistant_reply, action=turn.action, patch=turn.patch, rejected=rejected, profile=profile,
+    )
+
+@app.delete("/api/agent/sessions/{session_id}", status_code=204)
+def api_delete_agent_session(session_id: str):
+    if not session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return Response(status_code=204)
+
+# --- BACKGROUND JOBS ---
+# POST returns a job id straight away; the work runs in the job worker pool, so a dropped connection
+# or proxy timeout costs nothing and request handling no longer waits on model latency.
+# Results are fetched with GET /api/jobs/{id} (optionally long-polling) or followed over SSE.
+
+# Seconds of silence before the SSE job stream sends a keepalive comment
+JOB_KEEPALIVE_SECONDS = 15
+
+async def run_general_essay_job(student: Student, report) -> dict:
+    return {"essay": await generate_general_essay_async(model_registry.async_client(), student)}
+
+async def run_specific_essay_job(data: SpecificEssayRequest, report) -> dict:
+    return await stored_specific_essay_async(model_registry.async_client(), essay_store, data.student, data.scholarship, data.analysis, data.match)
+
+async def run_essay_revision_job(data: EssayRevisionRequest, report) -> dict:
+    return await revise_specific_essay_async(
+        model_registry.async_client(), essay_store, data.student, data.scholarship, data.analysis, data.match, base_version=data.base_version,
+    )
+
+async def run_match_batch_job(data: BatchMatchRequest, report) -> dict:
+    matches, errors = [], []
+    items = batch_match_items(data, batch_scholarships(data))
+    try:
+        async for item in items:
+            (errors if "error" in item else matches).append(item)
+            report({"matches": len(matches), "errors": len(errors)})
+    finally:
+        await items.aclose()
+    return {"matches": sorted(matches, key=lambda m: m["match_score"], reverse=True), "errors": errors}
+
+job_runner.register("essay_general", JobKind(Student, run_general_essay_job))
+job_runner.register("essay_specific", JobKind(SpecificEssayRequest, run_specific_essay_job))
+# a missing base version or a changed scholarship won't fix itself on retry
+job_runner.register("essay_revise", JobKind(EssayRevisionRequest, run_essay_revision_job, permanent=(KeyError, ValueError)))
+job_runner.register("match_batch", JobKind(BatchMatchRequest, run_match_batch_job, permanent=(KeyError,)))
+
+def submit_job(kind: str, payload: BaseModel, idempotency_key: Optional[str]) -> JSONResponse:
+    try:
+        job, created = job_runner.submit(kind, payload, idempotency_key)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # no-op once running; covers servers started without the lifespan hook
+    job_runner.start()
+    return JSONResponse(job, status_code=202 if created else 200, headers={"Location": f"/api/jobs/{job['id']}"})
+
+IDEMPOTENCY_KEY = Header(None, alias="Idempotency-Key", max_length=255, description="Resubmitting with the same key returns the original job")
+
+@app.post("/api/jobs/essay/general", status_code=202)
+async def api_job_general_essay(student: Student, idempotency_key: Optional[str] = IDEMPOTENCY_KEY):
+    """
+    Queues a general essay (same result as POST /api/essay/general). Returns the job (202), or the
+    existing job (200) when the Idempotency-Key was seen before.
+    """
+    return submit_job("essay_general", student, idempotency_key)
+
+@app.post("/api/jobs/essay/specific", status_code=202)
+async def api_job_specific_essay(data: SpecificEssayRequest, idempotency_key: Optional[str] = IDEMPOTENCY_KEY):
+    """
+    Queues a specific essay (same result as POST /api/essay/specific, stored essays included).
+    """
+    return submit_job("essay_specific", data, idempotency_key)
+
+@app.post("/api/jobs/essay/specific/revise", status_code=202)
+async def api_job_revise_essay(data: EssayRevisionRequest, idempotency_key: Optional[str] = IDEMPOTENCY_KEY):
+    """
+    Queues an essay revision (same result as POST /api/essay/specific/revise).
+    """
+    return submit_job("essay_revise", data, idempotency_key)
+
+@app.post("/api/jobs/match-student/batch", status_code=202)
+async def api_job_match_batch(data: BatchMatchRequest, idempotency_key: Optional[str] = IDEMPOTENCY_KEY):
+    """
+    Queues bulk matching. The result holds every match (best first) plus per-scholarship errors;
+    progress counts are updated while it runs. `format` is ignored.
+    """
+    try:
+        batch_scholarships(data)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return submit_job("match_batch", data, idempotency_key)
+
+@app.get("/api/jobs")
+async def api_job_counts():
+    """
+    Number of jobs per status (queued, running, succeeded, failed, cancelled).
+    """
+    return job_runner.queue.counts()
+
+@app.get("/api/jobs/{job_id}")
+async def api_get_job(job_id: str, wait: float = Query(0, ge=0, le=60, description="Long-poll: seconds to wait for the job to finish")):
+    """
+    Job status, progress, and the result (or error) once finished. With `wait`, answers as soon as
+    the job finishes or the wait runs out, whichever comes first.
+    """
+    job = await job_runner.wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/events")
+async def api_job_events(job_id: str):
+    """
+    SSE stream of a job: a `status` event whenever its status, attempt or progress changes, then one
+    `done` event with the finished job (result or error), after which the stream ends.
+    """
+    if job_runner.queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    async def stream():
+        last, idle = None, 0.0
+        while True:
+            changed = job_runner.changed()
+            job = job_runner.queue.get(job_id)
+            if job is None:
+                yield sse_event("error", {"detail": "job was deleted"})
+                return
+            state = (job["status"], job["attempts"], job["progress"])
+            if state != last:
+                last, idle = state, 0.0
+                yield sse_event("status", {key: job[key] for key in ("id", "kind", "status", "attempts", "progress", "error")})
+            if job["status"] in FINISHED:
+                yield sse_event("done", job)
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                idle += POLL_INTERVAL
+                if idle >= JOB_KEEPALIVE_SECONDS:
+                    idle = 0.0
+                    yield ": keepalive\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.delete("/api/jobs/{job_id}")
+async def api_cancel_job(job_id: str):
+    """
+    Cancels a queued or running job (a running one is stopped). 409 if it already finished.
+    """
+    status = job_runner.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if status != "cancelled":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} already {status}")
+    return job_runner.queue.get(job_id)
+
+# To run: uvicorn api:app --reload
@@ -0,0 +1,368 @@
+# Disk-backed caches for model results, shared by the API and any batch/CLI job.
+# Everything is keyed by a content fingerprint, so a changed input is simply a new key.
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel
+from schemas import Scholarship, ScholarshipAnalysis, Student, StudentScholarshipMatch
+
+
+DEFAULT_CACHE_PATH = Path(
+    os.getenv("SCHOLARSHIP_CACHE_PATH", Path(__file__).resolve().parent.parent / "data" / "cache.sqlite3")
+)
+
+# TTL / size-cap eviction runs once per this many puts rather than on every one; the table can
+# overshoot max_entries by at most this much, and expired rows are never served in between
+EVICT_EVERY = 256
+
+
+def fingerprint(*parts) -> str:
+    """
+    Stable sha256 over the canonical JSON of each part (pydantic models, dicts or plain values).
+    Key order and whitespace never change the result.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        payload = part.model_dump(mode="json") if isinstance(part, BaseModel) else part
+        digest.update(json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Opens a WAL-mode connection so the API and a batch job can share one cache file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class LRU:
+    """
+    Tiny in-process LRU used as the hot tier in front of SQLite. Entries can be tagged with owners
+    (e.g. a student id) so everything one owner's change invalidates is dropped without a full clear.
+    """
+
+    def __init__(self, max_items: int = 1024):
+        self.max_items = max_items
+        self._items: OrderedDict = OrderedDict()
+        self._owners: dict = {}  # owner -> keys
+        self._owned_by: dict = {}  # key -> owners
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key, value, owners=()):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if owners:
+            self._owned_by[key] = tuple(owners)
+            for owner in owners:
+                self._owners.setdefault(owner, set()).add(key)
+        while len(self._items) > self.max_items:
+            old, _ = self._items.popitem(last=False)
+            self._disown(old)
+
+    def _disown(self, key):
+        for owner in self._owned_by.pop(key, ()):
+            keys = self._owners.get(owner)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._owners[owner]
+
+    def pop(self, key):
+        self._items.pop(key, None)
+        self._disown(key)
+
+    def pop_owner(self, owner) -> int:
+        """Drops every entry tagged with this owner."""
+        keys = self._owners.pop(owner, set())
+        for key in keys:
+            self._items.pop(key, None)
+            self._disown(key)
+        return len(keys)
+
+    def clear(self):
+        self._items.clear()
+        self._owners.clear()
+        self._owned_by.clear()
+
+
+class AnalysisCache:
+    """
+    Content-addressed store for ScholarshipAnalysis results.
+
+    Key = fingerprint(scholarship JSON, model name, prompt version). Entries expire after
+    `ttl_seconds` and the oldest rows are evicted once the table grows past `max_entries`.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_entries: int = 10_000, ttl_seconds: Optional[int] = 30 * 24 * 3600, memory_items: int = 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory = LRU(memory_items)
+        self._puts = 0
+        self._conn = connect(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scholarship_analysis (
+                key TEXT PRIMARY KEY,
+                scholarship_id TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_scholarship ON scholarship_analysis (scholarship_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_created ON scholarship_analysis (created_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(scholarship: Scholarship, model: str, prompt_version: str) -> str:
+        return fingerprint(scholarship, model, prompt_version)
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def get(self, scholarship: Scholarship, model: str, prompt_version: str) -> Optional[ScholarshipAnalysis]:
+        analysis = self._lookup(self.key(scholarship, model, prompt_version))
+        with self._lock:
+            if analysis is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return analysis
+
+    def _lookup(self, key: str) -> Optional[ScholarshipAnalysis]:
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                analysis, created_at = hit
+                if not self._expired(created_at):
+                    return analysis
+                self._memory.pop(key)
+
+            row = self._conn.execute(
+                "SELECT scholarship_id, payload, created_at FROM scholarship_analysis WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            scholarship_id, payload, created_at = row
+            if self._expired(created_at):
+                self._conn.execute("DELETE FROM scholarship_analysis WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+            analysis = ScholarshipAnalysis.model_validate_json(payload)
+            self._memory.put(key, (analysis, created_at), owners=(scholarship_id,))
+            return analysis
+
+    def put(self, scholarship: Scholarship, model: str, prompt_version: str, analysis: ScholarshipAnalysis) -> None:
+        key = self.key(scholarship, model, prompt_version)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scholarship_analysis (key, scholarship_id, model, prompt_version, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, scholarship.id, model, prompt_version, analysis.model_dump_json(), now),
+            )
+            self._puts += 1
+            if self._puts % EVICT_EVERY == 0:
+                self._evict()
+            self._conn.commit()
+            self._memory.put(key, (analysis, now), owners=(scholarship.id,))
+
+    def invalidate(self, scholarship_id: Optional[str] = None) -> int:
+        """Drops cached analyses for one scholarship, or everything when no id is given."""
+        with self._lock:
+            if scholarship_id is None:
+                cur = self._conn.execute("DELETE FROM scholarship_analysis")
+            else:
+                cur = self._conn.execute("DELETE FROM scholarship_analysis WHERE scholarship_id = ?", (scholarship_id,))
+            self._conn.commit()
+            if scholarship_id is None:
+                self._memory.clear()
+            else:
+                self._memory.pop_owner(scholarship_id)
+            return cur.rowcount
+
+    def _evict(self) -> None:
+        # Caller holds the lock. TTL first, then trim the oldest rows past the size cap.
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM scholarship_analysis WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM scholarship_analysis").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM scholarship_analysis WHERE key IN "
+                "(SELECT key FROM scholarship_analysis ORDER BY created_at ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class MatchCache:
+    """
+    Two-tier (LRU + SQLite) store for StudentScholarshipMatch results.
+
+    Key = fingerprint(student, scholarship, analysis, model, prompt version). Rows also carry the
+    student id and student fingerprint, so editing a student only touches that student's rows and a
+    student's whole scored catalog comes back from a single query.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_entries: int = 100_000, ttl_seconds: Optional[int] = 30 * 24 * 3600, memory_items: int = 4096):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory = LRU(memory_items)
+        # (student id, student fingerprint) pairs this process has already written
+        self._seen_versions = LRU(memory_items)
+        self._puts = 0
+        self._conn = connect(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS student_match (
+                key TEXT PRIMARY KEY,
+                student_id TEXT NOT NULL,
+                student_fp TEXT NOT NULL,
+                scholarship_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_match_student ON student_match (student_id, student_fp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_match_created ON student_match (created_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(student: Student, scholarship: Scholarship, analysis: ScholarshipAnalysis, model: str, prompt_version: str) -> str:
+        return fingerprint(fingerprint(student), fingerprint(scholarship), fingerprint(analysis), model, prompt_version)
+
+    @staticmethod
+    def _owners(student_id: str, scholarship_id: str) -> tuple:
+        return ("student", student_id), ("scholarship", scholarship_id)
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def get(self, student: Student, scholarship: Scholarship, analysis: ScholarshipAnalysis, model: str, prompt_version: str) -> Optional[StudentScholarshipMatch]:
+        return self.get_many(student, [(scholarship, analysis)], model, prompt_version).get(scholarship.id)
+
+    def get_many(self, student: Student, pairs: list[tuple[Scholarship, ScholarshipAnalysis]], model: str, prompt_version: str) -> dict[str, StudentScholarshipMatch]:
+        """Looks up many (scholarship, analysis) pairs for one student in one query. Returns hits by scholarship id."""
+        keys = {self.key(student, scholarship, analysis, model, prompt_version): scholarship.id for scholarship, analysis in pairs}
+        found: dict[str, StudentScholarshipMatch] = {}
+        missing = []
+        with self._lock:
+            for key, scholarship_id in keys.items():
+                hit = self._memory.get(key)
+                if hit is not None and not self._expired(hit[1]):
+                    found[scholarship_id] = hit[0]
+                else:
+                    missing.append(key)
+
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, payload, created_at FROM student_match WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, payload, created_at in rows:
+                    if self._expired(created_at):
+                        continue
+                    match = StudentScholarshipMatch.model_validate_json(payload)
+                    self._memory.put(key, (match, created_at), owners=self._owners(student.id, keys[key]))
+                    found[keys[key]] = match
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def for_student(self, student: Student) -> list[StudentScholarshipMatch]:
+        """Every cached match for the current version of this student, best score first."""
+        cutoff = time.time() - self.ttl_seconds if self.ttl_seconds is not None else 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM student_match WHERE student_id = ? AND student_fp = ? AND created_at >= ?",
+                (student.id, fingerprint(student), cutoff),
+            ).fetchall()
+        matches = [StudentScholarshipMatch.model_validate_json(payload) for (payload,) in rows]
+        return sorted(matches, key=lambda m: m.match_score, reverse=True)
+
+    def put(self, student: Student, scholarship: Scholarship, analysis: ScholarshipAnalysis, model: str, prompt_version: str, match: StudentScholarshipMatch) -> None:
+        key = self.key(student, scholarship, analysis, model, prompt_version)
+        student_fp = fingerprint(student)
+        now = time.time()
+        with self._lock:
+            # The first write for a new fingerprint means the profile was edited, so the old version's
+            # rows go once. Later writes leave other versions alone (two live versions of a profile
+            # would otherwise keep wiping each other); leftovers age out with the TTL / size sweep.
+            if self._seen_versions.get((student.id, student_fp)) is None:
+                self._seen_versions.put((student.id, student_fp), True)
+                stale = self._conn.execute(
+                    "DELETE FROM student_match WHERE student_id = ? AND student_fp != ?", (student.id, student_fp)
+                ).rowcount
+                if stale:
+                    self._memory.pop_owner(("student", student.id))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO student_match (key, student_id, student_fp, scholarship_id, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, student.id, student_fp, scholarship.id, match.model_dump_json(), now),
+            )
+            self._puts += 1
+            if self._puts % EVICT_EVERY == 0:
+                self._evict()
+            self._conn.commit()
+            self._memory.put(key, (match, now), owners=self._owners(student.id, scholarship.id))
+
+    def invalidate_student(self, student_id: str) -> int:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM student_match WHERE student_id = ?", (student_id,))
+            self._conn.commit()
+            self._memory.pop_owner(("student", student_id))
+            return cur.rowcount
+
+    def invalidate_scholarship(self, scholarship_id: str) -> int:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM student_match WHERE scholarship_id = ?", (scholarship_id,))
+            self._conn.commit()
+            self._memory.pop_owner(("scholarship", scholarship_id))
+            return cur.rowcount
+
+    def _evict(self) -> None:
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM student_match WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM student_match").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM student_match WHERE key IN "
+                "(SELECT key FROM student_match ORDER BY created_at ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
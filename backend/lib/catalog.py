@@ -0,0 +1,194 @@
+# Scholarship / student catalog loaded from backend/data/*.json
+#
+# Built once at startup into in-memory indexes (id, tag, deadline, BM25 full text). refresh() re-reads
+# the files only when their mtime changes, and `version` (a hash of the file bytes) doubles as the HTTP
+# ETag. add_scholarship / remove_scholarship update every index incrementally instead of reloading.
+#
+# Large catalogs live in the on-disk store instead (store.py); open_catalog() picks whichever exists.
+
+import bisect
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from eligibility import extract_constraints
+from schemas import EligibilityConstraints, Scholarship, Student
+from search import SearchIndex
+
+
+DATA_DIR = Path(os.getenv("SCHOLARSHIP_DATA_DIR", Path(__file__).resolve().parent.parent / "data"))
+
+
+class Catalog:
+    """In-memory, indexed catalog with O(1) lookup by id, tag/deadline filters and id-ordered pagination."""
+
+    def __init__(self, data_dir: Path = DATA_DIR):
+        self.data_dir = Path(data_dir)
+        self.scholarships: dict[str, Scholarship] = {}
+        self.students: dict[str, Student] = {}
+        self.version = ""
+        self._lock = threading.Lock()
+        self._mtimes: dict[Path, int] = {}
+        self._sorted_ids: list[str] = []
+        self._by_tag: dict[str, set[str]] = {}
+        self._by_deadline: list[tuple[str, str]] = []
+        self._search = SearchIndex()
+        self._listeners: list[Callable[["Catalog"], None]] = []
+        self.load()
+
+    @property
+    def files(self) -> list[Path]:
+        return [self.data_dir / "scholarships.json", self.data_dir / "students.json"]
+
+    def subscribe(self, callback: Callable[["Catalog"], None]) -> None:
+        """Registers a callback run after every (re)load, e.g. to rebuild derived indexes."""
+        self._listeners.append(callback)
+
+    def load(self) -> None:
+        digest = hashlib.sha256()
+        raw = {}
+        mtimes = {}
+        for path in self.files:
+            mtimes[path] = path.stat().st_mtime_ns
+            raw[path.name] = path.read_bytes()
+            digest.update(raw[path.name])
+
+        scholarships = {d["id"]: Scholarship(**d) for d in json.loads(raw["scholarships.json"])}
+        students = {d["id"]: Student(**d) for d in json.loads(raw["students.json"])}
+
+        with self._lock:
+            self.scholarships = scholarships
+            self.students = students
+            self.version = digest.hexdigest()[:16]
+            self._mtimes = mtimes
+            self._build_indexes()
+
+        for callback in self._listeners:
+            callback(self)
+
+    def refresh(self) -> bool:
+        """Reloads from disk if any data file's mtime changed. Returns True when a reload happened."""
+        try:
+            changed = any(path.stat().st_mtime_ns != self._mtimes.get(path) for path in self.files)
+        except FileNotFoundError:
+            return False
+        if changed:
+            self.load()
+        return changed
+
+    def _build_indexes(self) -> None:
+        self._sorted_ids = sorted(self.scholarships)
+        self._by_tag = {}
+        for scholarship in self.scholarships.values():
+            for tag in scholarship.tags:
+                self._by_tag.setdefault(tag.lower(), set()).add(scholarship.id)
+        self._by_deadline = sorted((s.deadline, s.id) for s in self.scholarships.values())
+        self._search = SearchIndex(self.scholarships.values())
+
+    # --- incremental updates ---
+
+    def _bump_version(self, *parts: str) -> None:
+        self.version = hashlib.sha256("\x00".join((self.version,) + parts).encode()).hexdigest()[:16]
+
+    def _unindex(self, scholarship: Scholarship) -> None:
+        self._sorted_ids.pop(bisect.bisect_left(self._sorted_ids, scholarship.id))
+        for tag in scholarship.tags:
+            ids = self._by_tag.get(tag.lower())
+            if ids is not None:
+                ids.discard(scholarship.id)
+                if not ids:
+                    del self._by_tag[tag.lower()]
+        self._by_deadline.pop(bisect.bisect_left(self._by_deadline, (scholarship.deadline, scholarship.id)))
+        self._search.remove(scholarship.id)
+
+    def add_scholarship(self, scholarship: Scholarship) -> None:
+        """Adds (or replaces) one scholarship in memory and in every index, without touching the data files."""
+        with self._lock:
+            old = self.scholarships.get(scholarship.id)
+            if old is not None:
+                self._unindex(old)
+            self.scholarships[scholarship.id] = scholarship
+            bisect.insort(self._sorted_ids, scholarship.id)
+            for tag in scholarship.tags:
+                self._by_tag.setdefault(tag.lower(), set()).add(scholarship.id)
+            bisect.insort(self._by_deadline, (scholarship.deadline, scholarship.id))
+            self._search.add(scholarship)
+            self._bump_version("add", scholarship.model_dump_json())
+
+    def remove_scholarship(self, scholarship_id: str) -> bool:
+        with self._lock:
+            old = self.scholarships.pop(scholarship_id, None)
+            if old is None:
+                return False
+            self._unindex(old)
+            self._bump_version("remove", scholarship_id)
+            return True
+
+    # --- lookups ---
+
+    def get_scholarship(self, scholarship_id: str) -> Optional[Scholarship]:
+        return self.scholarships.get(scholarship_id)
+
+    def get_student(self, student_id: str) -> Optional[Student]:
+        return self.students.get(student_id)
+
+    def iter_scholarships(self) -> Iterator[Scholarship]:
+        return iter(self.all_scholarships())
+
+    def iter_constraints(self) -> Iterator[EligibilityConstraints]:
+        return (extract_constraints(s) for s in self.all_scholarships())
+
+    def all_scholarships(self) -> list[Scholarship]:
+        return list(self.scholarships.values())
+
+    def search_scholarships(self, query: str, tags: Optional[Iterable[str]] = None, limit: int = 20) -> list[tuple[Scholarship, float]]:
+        """BM25-ranked (scholarship, score) pairs for a free-text query, optionally restricted to tags (all must match)."""
+        with self._lock:
+            allowed: Optional[set[str]] = None
+            for tag in tags or []:
+                ids = self._by_tag.get(tag.lower(), set())
+                allowed = set(ids) if allowed is None else allowed & ids
+            hits = self._search.search(query, limit=limit, allowed=allowed)
+            return [(self.scholarships[sid], score) for sid, score in hits]
+
+    def query_scholarships(
+        self,
+        tags: Optional[Iterable[str]] = None,
+        deadline_after: Optional[str] = None,
+        deadline_before: Optional[str] = None,
+        after_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[list[Scholarship], Optional[str]]:
+        """
+        Filters by tags (all must match) and an inclusive ISO deadline range, ordered by id.
+        Returns the page and the id to pass as `after_id` for the next page (None on the last page).
+        """
+        with self._lock:
+            candidates: Optional[set[str]] = None
+            for tag in tags or []:
+                ids = self._by_tag.get(tag.lower(), set())
+                candidates = set(ids) if candidates is None else candidates & ids
+            if deadline_after is not None or deadline_before is not None:
+                lo = bisect.bisect_left(self._by_deadline, (deadline_after,)) if deadline_after else 0
+                hi = bisect.bisect_right(self._by_deadline, (deadline_before, "\uffff")) if deadline_before else len(self._by_deadline)
+                in_range = {sid for _, sid in self._by_deadline[lo:hi]}
+                candidates = in_range if candidates is None else candidates & in_range
+
+            ordered = self._sorted_ids if candidates is None else sorted(candidates)
+            start = bisect.bisect_right(ordered, after_id) if after_id is not None else 0
+            end = len(ordered) if limit is None else start + limit
+            page = [self.scholarships[sid] for sid in ordered[start:end]]
+            next_id = page[-1].id if page and end < len(ordered) else None
+        return page, next_id
+
+
+def open_catalog():
+    """The on-disk store when SCHOLARSHIP_STORE_PATH (or the default store file) exists, else the JSON files."""
+    from store import DEFAULT_STORE_PATH, StoreCatalog
+
+    if DEFAULT_STORE_PATH.exists():
+        return StoreCatalog(DEFAULT_STORE_PATH)
+    return Catalog()
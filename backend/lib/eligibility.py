@@ -0,0 +1,284 @@
+# Hard-eligibility screening: extract structured limits from Scholarship.criteria_text at ingest time,
+# index them, and reject clearly ineligible (student, scholarship) pairs without a model call.
+
+import bisect
+import re
+from typing import Iterable, Optional
+
+from schemas import EligibilityConstraints, Scholarship, Student, StudentScholarshipMatch
+
+
+ANY = "*"
+
+DEGREE_ALIASES = {
+    "high_school": "high_school", "high school": "high_school", "secondary": "high_school",
+    "bachelor": "undergraduate", "bachelors": "undergraduate", "bachelor's": "undergraduate",
+    "undergraduate": "undergraduate", "undergrad": "undergraduate", "associate": "undergraduate",
+    "master": "graduate", "masters": "graduate", "master's": "graduate", "phd": "graduate",
+    "doctorate": "graduate", "doctoral": "graduate", "graduate": "graduate", "grad": "graduate", "mba": "graduate",
+}
+
+YEAR_WORDS = {
+    "first": 1, "1st": 1, "freshman": 1, "freshmen": 1,
+    "second": 2, "2nd": 2, "sophomore": 2, "sophomores": 2,
+    "third": 3, "3rd": 3, "junior": 3, "juniors": 3,
+    "fourth": 4, "4th": 4, "senior": 4, "seniors": 4, "final": 4,
+}
+
+# Only these places ever become a citizenship or country limit; anything else ("California",
+# "Computer Science", "STEM") is left for the model to judge.
+COUNTRY_ALIASES = {
+    "u.s.": "united states", "u.s": "united states", "us": "united states", "usa": "united states", "american": "united states",
+    "america": "united states", "united states of america": "united states", "canadian": "canada",
+    "uk": "united kingdom", "u.k.": "united kingdom", "british": "united kingdom", "great britain": "united kingdom",
+    "mexican": "mexico", "australian": "australia", "indian": "india", "chinese": "china", "japanese": "japan",
+    "korean": "south korea", "korea": "south korea", "german": "germany", "french": "france", "irish": "ireland",
+    "italian": "italy", "spanish": "spain", "brazilian": "brazil", "nigerian": "nigeria", "kenyan": "kenya",
+    "ghanaian": "ghana", "filipino": "philippines", "pakistani": "pakistan", "new zealander": "new zealand",
+    "south african": "south africa", "dutch": "netherlands", "the netherlands": "netherlands",
+}
+KNOWN_COUNTRIES = set(COUNTRY_ALIASES.values()) | {
+    "argentina", "austria", "bangladesh", "belgium", "chile", "colombia", "denmark", "egypt", "ethiopia", "finland",
+    "greece", "indonesia", "israel", "jamaica", "malaysia", "norway", "peru", "poland", "portugal", "singapore",
+    "sweden", "switzerland", "taiwan", "thailand", "turkey", "uganda", "ukraine", "vietnam",
+}
+
+# Sentences saying this are wishes, not requirements
+NON_LIMITING_PATTERN = re.compile(r"\b(prefer\w*|priority|encouraged|strongly considered|favou?red)\b", re.I)
+PERMANENT_RESIDENT_PATTERN = re.compile(r"\bpermanent\s+residen(?:ts?|cy|ce)\b", re.I)
+SENTENCE_SPLIT = re.compile(r"(?<![A-Z])[.!?]\s+|;\s*|\n+")
+
+GPA_PATTERNS = [
+    re.compile(r"(?:minimum|min\.?)\s+(?:cumulative\s+)?gpa\s+(?:of\s+)?(\d(?:\.\d+)?)", re.I),
+    re.compile(r"gpa\s+(?:of\s+)?(?:at least|minimum(?: of)?|>=)\s*(\d(?:\.\d+)?)", re.I),
+    re.compile(r"(\d(?:\.\d+)?)\s+(?:cumulative\s+)?gpa\s+(?:minimum|or (?:higher|above|better))", re.I),
+]
+# One capitalized place, and an "A, B or/and the C" list of them
+PLACE = r"(?:the\s+)?[A-Z][\w.]*(?:\s[A-Z][\w.]*)*"
+PLACE_LIST = rf"{PLACE}(?:(?i:\s*,\s*(?:(?:or|and)\s+)?|\s+(?:or|and)\s+){PLACE})*"
+PLACE_SEPARATOR = re.compile(r"\s*,\s*(?:(?:or|and)\s+)?|\s+(?:or|and)\s+", re.I)
+# A list that carries on with something we didn't capture ("Canada or elsewhere", "the U.S. and its
+# territories", "dual or Canadian citizens") can't be turned into a complete allow-list
+LIST_CONTINUES = re.compile(r"\s*,?\s*(?:or\b|and\s+(?:its\s+|other\s+|the\s+)?(?:territor|countr|province|region|possession|commonwealth|nation))", re.I)
+LIST_PRECEDED = re.compile(r"(?:\bor|\band|,)\s*$", re.I)
+CITIZEN_PATTERN = re.compile(rf"\b({PLACE_LIST})\s+(?i:citizens?(?:hip)?)\b|\b(?i:citizens?(?:hip)?\s+of\s+)({PLACE_LIST})")
+RESIDENT_PATTERN = re.compile(rf"\b(?i:(?<!permanent )(?:residents?\s+of|(?:studying|enrolled|located)\s+in)\s+)({PLACE_LIST})")
+# "high school seniors", "senior citizens" and "junior college" say nothing about year of study
+YEAR_PATTERN = re.compile(
+    r"\b(first|1st|second|2nd|third|3rd|fourth|4th|final)[- ]year\b"
+    r"|(?<!high school )\b(freshm[ae]n|sophomores?|juniors?|seniors?)\b(?!\s+(?:citizens?|colleges?|high))",
+    re.I,
+)
+# "graduate"/"grad" is also a verb ("must graduate by May"), so it only names a degree level when a noun follows
+GRADUATE_PATTERN = re.compile(
+    r"\b(?:(?:graduate|grad)(?:[- ]level)?\s+(?:students?|programs?|degrees?|studies|study|level|school|research|candidates?|applicants?)"
+    r"|master'?s|phd|ph\.d|doctoral|doctorate)\b",
+    re.I,
+)
+YEAR_MIN_PATTERN = re.compile(r"\b(?:at least|minimum of)\s+(?:a\s+)?(first|1st|second|2nd|third|3rd|fourth|4th)[- ]year\b|\b(first|1st|second|2nd|third|3rd|fourth|4th)[- ]year\s+(?:or above|and above|or higher|and up)\b", re.I)
+
+
+def normalize_degree(value: str) -> Optional[str]:
+    return DEGREE_ALIASES.get(value.strip().lower())
+
+
+def normalize_place(value: str) -> str:
+    value = value.strip().lower().rstrip(".")
+    return COUNTRY_ALIASES.get(value, value)
+
+
+def known_places(phrases: Iterable[str]) -> set[str]:
+    """
+    Normalized countries for the captured phrases, or an empty set (no limit) if any of them isn't a
+    known country, since "residents of Ontario or Canada" is not something a rule should decide.
+    """
+    places = {normalize_place(p) for p in phrases}
+    return places if places <= KNOWN_COUNTRIES else set()
+
+
+def place_lists(pattern: re.Pattern, sentences: Iterable[str]) -> Optional[list[str]]:
+    """
+    Every place named in the pattern's place lists, split on commas and or/and. None when a list
+    runs on past what was captured, since a partial allow-list would reject the places left out.
+    Matched per sentence: a place may contain dots ("U.S."), so across a joined text "Canada. Open"
+    would read as one place.
+    """
+    places = []
+    for text in sentences:
+        for match in pattern.finditer(text):
+            group = next(i for i in range(1, pattern.groups + 1) if match.group(i) is not None)
+            if LIST_CONTINUES.match(text, match.end(group)) or LIST_PRECEDED.search(text, 0, match.start(group)):
+                return None
+            places += [re.sub(r"^the\s+", "", p, flags=re.I) for p in PLACE_SEPARATOR.split(match.group(group))]
+    return places
+
+
+def extract_constraints(scholarship: Scholarship) -> EligibilityConstraints:
+    """
+    Rule-based extraction of the limits a human reviewer would treat as hard requirements. Only
+    unambiguous wording counts: preferences, permanent-resident alternatives and unknown places
+    leave the dimension open so the model decides. Tags never become limits.
+    """
+    sentences = [
+        s for s in SENTENCE_SPLIT.split(scholarship.criteria_text)
+        if s.strip() and not NON_LIMITING_PATTERN.search(s)
+    ]
+    text = ". ".join(sentences)
+    lowered = text.lower()
+
+    min_gpa = None
+    for pattern in GPA_PATTERNS:
+        found = pattern.search(text)
+        if found:
+            min_gpa = float(found.group(1))
+            break
+
+    degree_levels: set[str] = set()
+    if re.search(r"\b(undergraduates?|undergrads?)\b", lowered):
+        degree_levels.add("undergraduate")
+    if GRADUATE_PATTERN.search(lowered.replace("undergraduate", "").replace("undergrad", "")):
+        degree_levels.add("graduate")
+    if "incoming freshm" in lowered or "high school senior" in lowered:
+        degree_levels.add("high_school")
+
+    # Year words only mean something within one degree level ("undergraduate seniors, and graduate
+    # students" says nothing about a graduate student's year), and high school years aren't year_of_study
+    min_year = max_year = None
+    explicit_min = YEAR_MIN_PATTERN.search(text)
+    scoped = len(degree_levels) <= 1 and "high school" not in lowered
+    if scoped and explicit_min:
+        min_year = YEAR_WORDS[(explicit_min.group(1) or explicit_min.group(2)).lower()]
+    elif scoped and "incoming freshm" not in lowered:
+        years = [YEAR_WORDS[(m.group(1) or m.group(2)).lower()] for m in YEAR_PATTERN.finditer(text)]
+        if years:
+            min_year, max_year = min(years), max(years)
+
+    # "citizens or permanent residents" admits people of any citizenship, which a rule can't check
+    citizenships = set()
+    if not PERMANENT_RESIDENT_PATTERN.search(text):
+        citizenships = known_places(place_lists(CITIZEN_PATTERN, sentences) or [])
+    countries = known_places(place_lists(RESIDENT_PATTERN, sentences) or [])
+
+    return EligibilityConstraints(
+        scholarship_id=scholarship.id,
+        countries=sorted(countries),
+        citizenships=sorted(citizenships),
+        degree_levels=sorted(degree_levels),
+        min_year=min_year,
+        max_year=max_year,
+        min_gpa=min_gpa,
+    )
+
+
+def explain_ineligibility(student: Student, constraints: EligibilityConstraints) -> list[str]:
+    """Human-readable reasons this student fails the hard limits; empty list means eligible."""
+    reasons = []
+    if constraints.min_gpa is not None and student.gpa < constraints.min_gpa:
+        reasons.append(f"GPA {student.gpa} is below the stated minimum of {constraints.min_gpa}.")
+    level = normalize_degree(student.degree_level)
+    if constraints.degree_levels and level is not None and level not in constraints.degree_levels:
+        reasons.append(f"Degree level '{student.degree_level}' is not eligible (open to: {', '.join(constraints.degree_levels)}).")
+    if constraints.min_year is not None and student.year_of_study < constraints.min_year:
+        reasons.append(f"Year of study {student.year_of_study} is below the required year {constraints.min_year}.")
+    if constraints.max_year is not None and student.year_of_study > constraints.max_year:
+        reasons.append(f"Year of study {student.year_of_study} is above the eligible range (up to year {constraints.max_year}).")
+    if constraints.citizenships and normalize_place(student.citizenship) not in constraints.citizenships:
+        reasons.append(f"Citizenship '{student.citizenship}' is not eligible (requires: {', '.join(constraints.citizenships)}).")
+    if constraints.countries and normalize_place(student.country) not in constraints.countries:
+        reasons.append(f"Country '{student.country}' is not eligible (requires: {', '.join(constraints.countries)}).")
+    return reasons
+
+
+def check_eligibility(student: Student, scholarship: Scholarship) -> list[str]:
+    """Ineligibility reasons for one pair, from the scholarship as given (it may not be indexed, or may have changed)."""
+    return explain_ineligibility(student, extract_constraints(scholarship))
+
+
+def ineligible_match(student: Student, scholarship_id: str, reasons: list[str]) -> StudentScholarshipMatch:
+    return StudentScholarshipMatch(
+        student_id=student.id,
+        scholarship_id=scholarship_id,
+        match_score=0,
+        top_reasons=["Ineligible based on the scholarship's stated requirements."] + reasons,
+    )
+
+
+class EligibilityIndex:
+    """
+    Inverted index from (dimension, value) -> scholarship ids, plus a sorted min-GPA list.
+    Scholarships with no limit on a dimension are stored under ANY, so candidate filtering is
+    a union per dimension and an intersection across dimensions. Year bounds can be open-ended,
+    so they're range-checked on the survivors instead of posted. Built from constraints only
+    (the store keeps them next to each record), so no Scholarship has to be parsed or held.
+    """
+
+    def __init__(self, constraints: Iterable[EligibilityConstraints] = ()):
+        self.constraints: dict[str, EligibilityConstraints] = {}
+        self._postings: dict[tuple[str, str], set[str]] = {}
+        self._gpa_sorted: list[tuple[float, str]] = []
+        for c in constraints:
+            self.add(c)
+
+    def _post(self, dimension: str, value: str, scholarship_id: str) -> None:
+        self._postings.setdefault((dimension, value), set()).add(scholarship_id)
+
+    def add(self, c: EligibilityConstraints) -> None:
+        sid = c.scholarship_id
+        if sid in self.constraints:
+            self.remove(sid)
+        self.constraints[sid] = c
+
+        for value in c.degree_levels or [ANY]:
+            self._post("degree", value, sid)
+        for value in c.citizenships or [ANY]:
+            self._post("citizenship", value, sid)
+        for value in c.countries or [ANY]:
+            self._post("country", value, sid)
+        bisect.insort(self._gpa_sorted, (c.min_gpa if c.min_gpa is not None else 0.0, sid))
+
+    def add_scholarship(self, scholarship: Scholarship) -> EligibilityConstraints:
+        c = extract_constraints(scholarship)
+        self.add(c)
+        return c
+
+    def remove(self, scholarship_id: str) -> None:
+        c = self.constraints.pop(scholarship_id, None)
+        if c is None:
+            return
+        for ids in self._postings.values():
+            ids.discard(scholarship_id)
+        # bisect to the entry instead of rebuilding the list, so streaming upserts stay cheap
+        key = (c.min_gpa if c.min_gpa is not None else 0.0, scholarship_id)
+        i = bisect.bisect_left(self._gpa_sorted, key)
+        if i < len(self._gpa_sorted) and self._gpa_sorted[i] == key:
+            del self._gpa_sorted[i]
+
+    def _lookup(self, dimension: str, value: Optional[str]) -> set[str]:
+        ids = set(self._postings.get((dimension, ANY), ()))
+        if value is not None:
+            ids |= self._postings.get((dimension, value), set())
+        return ids
+
+    def candidates(self, student: Student) -> set[str]:
+        """Ids of every indexed scholarship the student passes all hard limits for."""
+        level = normalize_degree(student.degree_level)
+        degree_ids = set(self.constraints) if level is None else self._lookup("degree", level)
+        ids = (
+            degree_ids
+            & self._lookup("citizenship", normalize_place(student.citizenship))
+            & self._lookup("country", normalize_place(student.country))
+        )
+        cutoff = bisect.bisect_right(self._gpa_sorted, (student.gpa, "\uffff"))
+        ids &= {sid for _, sid in self._gpa_sorted[:cutoff]}
+        # same comparisons as explain_ineligibility, None meaning no bound on that side
+        year = student.year_of_study
+        bounds = ((sid, self.constraints[sid]) for sid in ids)
+        return {
+            sid for sid, c in bounds
+            if (c.min_year is None or year >= c.min_year) and (c.max_year is None or year <= c.max_year)
+        }
+
+    def reasons(self, student: Student, scholarship_id: str) -> list[str]:
+        """Ineligibility reasons from the indexed constraints; empty for eligible or unindexed ids."""
+        c = self.constraints.get(scholarship_id)
+        return explain_ineligibility(student, c) if c is not None else []
@@ -0,0 +1,182 @@
+# Persistent, versioned scholarship essays (POST /api/essay/specific and .../revise).
+#
+# Every essay is stored under the fingerprint of its inputs (student, scholarship, analysis, match),
+# the model and the prompt version, so asking again with unchanged inputs returns the stored text
+# without a model call. Each (student, scholarship) pair keeps a numbered version history; a revision
+# records the version it was derived from and the profile changes that prompted it.
+#
+#   ESSAY_STORE_PATH   essay database (default backend/data/essays.sqlite3)
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from cache import connect, fingerprint
+from schemas import EssayEdit, Scholarship, ScholarshipAnalysis, Student, StudentScholarshipMatch
+
+
+DEFAULT_ESSAY_PATH = Path(
+    os.getenv("ESSAY_STORE_PATH", Path(__file__).resolve().parent.parent / "data" / "essays.sqlite3")
+)
+
+# Columns returned by history(); the stored essay text and input snapshots are left out
+SUMMARY_COLUMNS = "version, kind, parent_version, model, prompt_version, changes, words, created_at"
+
+
+# --- DIFFS AND EDITS ---
+
+def profile_changes(student_before: dict, student_after: dict, match_before: dict, match_after: dict) -> dict:
+    """Top-level student / match fields that differ, as {"field" or "match.field": {"before", "after"}}."""
+    changes = {}
+    for prefix, before, after in (("", student_before, student_after), ("match.", match_before, match_after)):
+        for field in sorted(set(before) | set(after)):
+            if field in ("id", "student_id", "scholarship_id"):
+                continue
+            if before.get(field) != after.get(field):
+                changes[prefix + field] = {"before": before.get(field), "after": after.get(field)}
+    return changes
+
+
+def apply_essay_edits(essay: str, edits: Iterable[EssayEdit]) -> tuple[str, list[dict]]:
+    """
+    Applies find/replace edits in order. An edit whose passage is missing or ambiguous is skipped
+    (and reported) without affecting the others.
+    """
+    rejected = []
+    for edit in edits:
+        count = essay.count(edit.find) if edit.find else 0
+        if count != 1:
+            rejected.append({**edit.model_dump(), "error": "passage not found" if count == 0 else f"passage occurs {count} times"})
+            continue
+        essay = essay.replace(edit.find, edit.replace, 1)
+    return essay, rejected
+
+
+# --- ESSAY STORE ---
+
+class EssayStore:
+    """Essays by input fingerprint, with a version history per (student, scholarship). Thread-safe."""
+
+    def __init__(self, path: Path = DEFAULT_ESSAY_PATH):
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS essays (
+                student_id TEXT NOT NULL,
+                scholarship_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                parent_version INTEGER,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                changes TEXT,
+                words INTEGER NOT NULL,
+                essay TEXT NOT NULL,
+                student TEXT NOT NULL,
+                match TEXT NOT NULL,
+                inputs_fp TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (student_id, scholarship_id, version)
+            );
+            CREATE INDEX IF NOT EXISTS idx_essays_key ON essays (key);
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key(student: Student, scholarship: Scholarship, analysis: ScholarshipAnalysis, match: StudentScholarshipMatch, model: str, prompt_version: str) -> str:
+        return fingerprint(fingerprint(student), fingerprint(scholarship), fingerprint(analysis), fingerprint(match), model, prompt_version)
+
+    @staticmethod
+    def inputs_fp(scholarship: Scholarship, analysis: ScholarshipAnalysis) -> str:
+        """What a revision can't account for: if this differs, the essay has to be regenerated."""
+        return fingerprint(scholarship, analysis)
+
+    @staticmethod
+    def _row(row, columns: str) -> dict:
+        record = dict(zip([c.strip() for c in columns.split(",")], row))
+        for field in ("changes", "student", "match"):
+            if record.get(field) is not None:
+                record[field] = json.loads(record[field])
+        return record
+
+    def lookup(self, key: str) -> Optional[dict]:
+        """Newest stored essay for exactly these inputs, or None."""
+        columns = f"{SUMMARY_COLUMNS}, essay"
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {columns} FROM essays WHERE key = ? ORDER BY created_at DESC LIMIT 1", (key,)
+            ).fetchone()
+        return self._row(row, columns) if row else None
+
+    def get(self, student_id: str, scholarship_id: str, version: Optional[int] = None) -> Optional[dict]:
+        """One version (the latest for None) including its text and input snapshots."""
+        columns = f"{SUMMARY_COLUMNS}, essay, student, match, inputs_fp"
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {columns} FROM essays WHERE student_id = ? AND scholarship_id = ? "
+                f"{'AND version = ?' if version is not None else ''} ORDER BY version DESC LIMIT 1",
+                (student_id, scholarship_id) + ((version,) if version is not None else ()),
+            ).fetchone()
+        return self._row(row, columns) if row else None
+
+    def put(
+        self,
+        key: str,
+        student: Student,
+        scholarship: Scholarship,
+        analysis: ScholarshipAnalysis,
+        match: StudentScholarshipMatch,
+        essay: str,
+        model: str,
+        prompt_version: str,
+        kind: str = "generated",
+        parent_version: Optional[int] = None,
+        changes: Optional[dict] = None,
+    ) -> int:
+        """Stores a new version and returns its number."""
+        with self._lock, self._conn:
+            # numbering and insert in one statement, so two writers can't claim the same version
+            (version,) = self._conn.execute(
+                "INSERT INTO essays (student_id, scholarship_id, version, key, kind, parent_version, model, prompt_version, "
+                "changes, words, essay, student, match, inputs_fp, created_at) "
+                "SELECT ?, ?, COALESCE(MAX(version), 0) + 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ? "
+                "FROM essays WHERE student_id = ? AND scholarship_id = ? RETURNING version",
+                (
+                    student.id, scholarship.id, key, kind, parent_version, model, prompt_version,
+                    json.dumps(changes) if changes is not None else None, len(essay.split()), essay,
+                    student.model_dump_json(), match.model_dump_json(), self.inputs_fp(scholarship, analysis), time.time(),
+                    student.id, scholarship.id,
+                ),
+            ).fetchone()
+        return version
+
+    def history(self, student_id: str, scholarship_id: str) -> list[dict]:
+        """Every version for the pair, oldest first, without the essay text."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM essays WHERE student_id = ? AND scholarship_id = ? ORDER BY version",
+                (student_id, scholarship_id),
+            ).fetchall()
+        return [self._row(row, SUMMARY_COLUMNS) for row in rows]
+
+    def for_student(self, student_id: str) -> list[dict]:
+        """Latest version per scholarship for one student, newest first, without the essay text."""
+        columns = f"scholarship_id, {SUMMARY_COLUMNS}"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM essays AS e WHERE student_id = ? AND version = "
+                "(SELECT MAX(version) FROM essays WHERE student_id = e.student_id AND scholarship_id = e.scholarship_id) "
+                "ORDER BY created_at DESC",
+                (student_id,),
+            ).fetchall()
+        return [self._row(row, columns) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -7,64 +7,179 @@
 
 
 import os
-from anthropic import Anthropic
-from dotenv import load_dotenv
+import asyncio
+from anthropic import Anthropic, AsyncAnthropic
 from pydantic import BaseModel
-from schemas import Scholarship, ScholarshipAnalysis, Student, StudentScholarshipMatch, MATCHING_SYSTEM_PROMPT, GENERAL_UNI_ESSAY_SYSTEM_PROMPT, SPECIFIC_SCHOLARSHIP_ESSAY_SYSTEM_PROMPT
+from schemas import AgentProfile, AgentTurn, EssayRevision, PackedMatchResult, Scholarship, ScholarshipAnalysis, Student, StudentScholarshipMatch, MATCHING_SYSTEM_PROMPT, ESSAY_REVISION_SYSTEM_PROMPT, GENERAL_UNI_ESSAY_SYSTEM_PROMPT, PROFILE_AGENT_SYSTEM_PROMPT, SPECIFIC_SCHOLARSHIP_ESSAY_SYSTEM_PROMPT
 import json
 from pathlib import Path
+from typing import AsyncIterator, Optional, Union
+from cache import AnalysisCache, MatchCache, fingerprint
+from singleflight import SingleFlight
+from usage import usage_tracker
+from metrics import MATCH_PACK_PAIRS, track_model_call
+from scheduler import Priority, scheduler
+from routing import DEFAULT_MODEL, MATCH_CASCADE, model_for
+from prompting import estimate_tokens, student_payload, scholarship_payload, analysis_payload, match_payload
+from sessions import SessionStore, apply_profile_patch
+from essays import EssayStore, apply_essay_edits, profile_changes
+from model_registry import model_registry
 
 
-def analyze_scholarship(client, scholarship_data: Scholarship) -> ScholarshipAnalysis:
-    
-    response = client.beta.messages.parse(
+# Fallback model; per-task models come from routing.model_for (MODEL_<TASK> env vars)
+MODEL = DEFAULT_MODEL
+
+# Bump whenever the analysis prompt changes so cached analyses are not reused across prompts
+ANALYSIS_PROMPT_VERSION = "v2"
+MATCH_PROMPT_VERSION = "v3"
+# Part of every stored essay's key, so bumping it stops old essays being served for the new prompt
+SPECIFIC_ESSAY_PROMPT_VERSION = "v1"
+ESSAY_REVISION_PROMPT_VERSION = "v1"
+
+# Marks the end of a static prompt prefix the API may cache and reuse across calls
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Packed matching: estimated prompt tokens allowed per call, and output tokens reserved per match
+PACK_INPUT_BUDGET = 16_000
+PACK_OUTPUT_PER_MATCH = 300
+PACK_MAX_OUTPUT = 8_192
+
+# A profile agent turn only returns a reply and a small patch, so this stays flat as the profile grows
+AGENT_MAX_TOKENS = 800
+
+# A revision returns a few find/replace edits, not the essay, so it needs a fraction of a full essay's output
+ESSAY_REVISION_MAX_TOKENS = 1200
+
+
+# --- REQUEST BUILDERS ---
+# Shared by the sync helpers (scripts) and the async helpers (API) so both send identical requests.
+# Static content comes first and is marked cacheable (system prompt -> scholarship -> analysis);
+# the per-student part always comes last so the prefix is identical across students.
+
+def cached_system(prompt: str) -> list[dict]:
+    return [{"type": "text", "text": prompt, "cache_control": CACHE_CONTROL}]
+
+
+def analysis_request(scholarship_data: Scholarship, model: Optional[str] = None) -> dict:
+    return dict(
         max_tokens=1024,
-        model="claude-sonnet-4-5",
+        model=model or model_for("analysis"),
         betas=["structured-outputs-2025-11-13"],
         messages=[
             {
                 "role": "user",
-                "content": f"Analyze the following scholarship:\n{scholarship_data.model_dump_json()}"
+                "content": f"Analyze the following scholarship:\n{scholarship_payload(scholarship_data, 'analysis')}"
             }
         ],
         output_format=ScholarshipAnalysis
-
     )
-    return response.parsed_output
 
 
-def match_student_scholarship(client, student: Student, scholarship: Scholarship, scholarship_analysis: ScholarshipAnalysis) -> StudentScholarshipMatch:
-    
-    response = client.beta.messages.parse(
+def match_request(student: Student, scholarship: Scholarship, scholarship_analysis: ScholarshipAnalysis, model: Optional[str] = None) -> dict:
+    return dict(
         max_tokens=1024,
-        model="claude-sonnet-4-5",
+        model=model or model_for("match"),
         betas=["structured-outputs-2025-11-13"],
-        system=MATCHING_SYSTEM_PROMPT,
+        system=cached_system(MATCHING_SYSTEM_PROMPT),
         messages=[
             {
                 "role": "user",
-                "content": (
-                    "Evaluate the match between the following STUDENT and SCHOLARSHIP, using the "
-                    "SCHOLARSHIP_ANALYSIS to guide what matters most.\n\n"
-                    "Return only the structured match result.\n\n"
-                    f"SCHOLARSHIP (raw):\n{scholarship.model_dump_json()}\n\n"
-                    f"SCHOLARSHIP_ANALYSIS:\n{scholarship_analysis.model_dump_json()}\n\n"
-                    f"STUDENT:\n{student.model_dump_json()}\n"
-                ),
+                "content": [
+                    {
+                        "type": "text",
+                        "text": (
+                            "Evaluate the match between the following STUDENT and SCHOLARSHIP, using the "
+                            "SCHOLARSHIP_ANALYSIS to guide what matters most.\n\n"
+                            "Return only the structured match result.\n\n"
+                            f"SCHOLARSHIP (raw):\n{scholarship_payload(scholarship, 'match')}\n\n"
+                            f"SCHOLARSHIP_ANALYSIS:\n{analysis_payload(scholarship_analysis, 'match')}\n\n"
+                        ),
+                        "cache_control": CACHE_CONTROL,
+                    },
+                    {"type": "text", "text": f"STUDENT:\n{student_payload(student, 'match')}\n"},
+                ],
             },
         ],
         output_format=StudentScholarshipMatch,
     )
 
-    return response.parsed_output
 
+def pair_block(scholarship: Scholarship, scholarship_analysis: ScholarshipAnalysis) -> str:
+    return (
+        f"SCHOLARSHIP (raw):\n{scholarship_payload(scholarship, 'match')}\n"
+        f"SCHOLARSHIP_ANALYSIS:\n{analysis_payload(scholarship_analysis, 'match')}\n"
+    )
 
-def generate_general_essay(client, student: Student) -> str:
-    response = client.beta.messages.parse(
-        model="claude-sonnet-4-5",
+
+def plan_match_packs(
+    student: Student,
+    pairs: list[tuple[Scholarship, ScholarshipAnalysis]],
+    input_budget: int = PACK_INPUT_BUDGET,
+    max_output: int = PACK_MAX_OUTPUT,
+) -> list[list[tuple[Scholarship, ScholarshipAnalysis]]]:
+    """Splits pairs into packs that each fit one call's prompt budget and output limit (K adapts to pair size)."""
+    base = estimate_tokens(MATCHING_SYSTEM_PROMPT) + estimate_tokens(student_payload(student, "match")) + 200
+    max_pairs = max(1, (max_output - 256) // PACK_OUTPUT_PER_MATCH)
+    packs, current, used = [], [], base
+    for pair in pairs:
+        cost = estimate_tokens(pair_block(*pair))
+        if current and (used + cost > input_budget or len(current) >= max_pairs):
+            packs.append(current)
+            current, used = [], base
+        current.append(pair)
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+
+def packed_match_request(student: Student, pairs: list[tuple[Scholarship, ScholarshipAnalysis]], model: Optional[str] = None) -> dict:
+    # Unlike match_request, the student is the shared part here, so it goes first and is the cached prefix
+    scholarships = "\n".join(f"[{i}] {pair_block(s, a)}" for i, (s, a) in enumerate(pairs, 1))
+    return dict(
+        max_tokens=min(PACK_MAX_OUTPUT, 256 + PACK_OUTPUT_PER_MATCH * len(pairs)),
+        model=model or model_for("match"),
+        betas=["structured-outputs-2025-11-13"],
+        system=cached_system(MATCHING_SYSTEM_PROMPT),
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": (
+                            "Evaluate the match between the following STUDENT and EACH of the numbered SCHOLARSHIPS, "
+                            "using each SCHOLARSHIP_ANALYSIS to guide what matters most. Score every scholarship "
+                            "independently, exactly as if it were the only one.\n\n"
+                            "Return one match per scholarship, in the same order.\n\n"
+                            f"STUDENT:\n{student_payload(student, 'match')}\n\n"
+                        ),
+                        "cache_control": CACHE_CONTROL,
+                    },
+                    {"type": "text", "text": f"SCHOLARSHIPS ({len(pairs)}):\n\n{scholarships}"},
+                ],
+            },
+        ],
+        output_format=PackedMatchResult,
+    )
+
+
+def unpack_matches(student: Student, pairs: list[tuple[Scholarship, ScholarshipAnalysis]], result: Optional[PackedMatchResult]) -> dict[str, StudentScholarshipMatch]:
+    """Well-formed matches for requested scholarships, by id (first wins). Anything missing needs a per-pair call."""
+    wanted = {scholarship.id for scholarship, _ in pairs}
+    found = {}
+    for match in result.matches if result is not None else []:
+        if match.scholarship_id in wanted and match.scholarship_id not in found and 0 <= match.match_score <= 100 and match.top_reasons:
+            found[match.scholarship_id] = match.model_copy(update={"student_id": student.id})
+    return found
+
+
+def general_essay_request(student: Student) -> dict:
+    return dict(
+        model=model_for("general_essay"),
         max_tokens=1800,
         betas=["structured-outputs-2025-11-13"],
-        system=GENERAL_UNI_ESSAY_SYSTEM_PROMPT,
+        system=cached_system(GENERAL_UNI_ESSAY_SYSTEM_PROMPT),
         messages=[
             {
                 "role": "user",
@@ -72,54 +187,544 @@ def generate_general_essay(client, student: Student) -> str:
                     "Using the STUDENT profile below, write a general-purpose university "
                     "application essay suitable for a Common App-style personal statement.\n\n"
                     "Return ONLY the final essay text, with no explanation or commentary.\n\n"
-                    f"STUDENT PROFILE (JSON):\n{student.model_dump_json()}"
+                    f"STUDENT PROFILE (JSON):\n{student_payload(student, 'general_essay')}"
                 ),
             },
         ]
     )
 
-    return response.content[0].text
-
 
-def generate_specific_essay(
-    client,
+def specific_essay_request(
     student: Student,
     scholarship: Scholarship,
     scholarship_analysis: ScholarshipAnalysis,
     match_analysis: StudentScholarshipMatch,
-) -> str:
-    response = client.beta.messages.parse(
-        model="claude-sonnet-4-5",
+) -> dict:
+    return dict(
+        model=model_for("specific_essay"),
         max_tokens=1800,
         betas=["structured-outputs-2025-11-13"],
-        system=SPECIFIC_SCHOLARSHIP_ESSAY_SYSTEM_PROMPT,
+        system=cached_system(SPECIFIC_SCHOLARSHIP_ESSAY_SYSTEM_PROMPT),
         messages=[
             {
                 "role": "user",
-                "content": (
-                    "Using the provided STUDENT, SCHOLARSHIP, SCHOLARSHIP_ANALYSIS, and "
-                    "MATCH_ANALYSIS, write a scholarship application essay from the student's "
-                    "perspective that is tailored to this specific scholarship.\n\n"
-                    "Return ONLY the final essay text, with no explanation or commentary.\n\n"
-                    f"STUDENT (JSON):\n{student.model_dump_json()}\n\n"
-                    f"SCHOLARSHIP (JSON):\n{scholarship.model_dump_json()}\n\n"
-                    f"SCHOLARSHIP_ANALYSIS (JSON):\n{scholarship_analysis.model_dump_json()}\n\n"
-                    f"MATCH_ANALYSIS (JSON):\n{match_analysis.model_dump_json()}\n"
-                ),
+                "content": [
+                    {
+                        "type": "text",
+                        "text": (
+                            "Using the provided SCHOLARSHIP, SCHOLARSHIP_ANALYSIS, STUDENT, and "
+                            "MATCH_ANALYSIS, write a scholarship application essay from the student's "
+                            "perspective that is tailored to this specific scholarship.\n\n"
+                            "Return ONLY the final essay text, with no explanation or commentary.\n\n"
+                            f"SCHOLARSHIP (JSON):\n{scholarship_payload(scholarship, 'specific_essay')}\n\n"
+                            f"SCHOLARSHIP_ANALYSIS (JSON):\n{analysis_payload(scholarship_analysis, 'specific_essay')}\n\n"
+                        ),
+                        "cache_control": CACHE_CONTROL,
+                    },
+                    {
+                        "type": "text",
+                        "text": (
+                            f"STUDENT (JSON):\n{student_payload(student, 'specific_essay')}\n\n"
+                            f"MATCH_ANALYSIS (JSON):\n{match_payload(match_analysis, 'specific_essay')}\n"
+                        ),
+                    },
+                ],
             },
         ],
     )
 
+
+def agent_request(profile: AgentProfile, history: list[dict], message: str, model: Optional[str] = None) -> dict:
+    # The system prompt is the only stable prefix; the history window slides, so it is not marked
+    return dict(
+        max_tokens=AGENT_MAX_TOKENS,
+        model=model or model_for("agent"),
+        betas=["structured-outputs-2025-11-13"],
+        system=cached_system(PROFILE_AGENT_SYSTEM_PROMPT),
+        messages=history + [
+            {"role": "user", "content": f"USER_PROFILE:\n{profile.model_dump_json()}\n\nUSER_MESSAGE:\n{message}"},
+        ],
+        output_format=AgentTurn,
+    )
+
+
+def essay_revision_request(
+    scholarship: Scholarship,
+    scholarship_analysis: ScholarshipAnalysis,
+    essay: str,
+    changes: dict,
+    model: Optional[str] = None,
+) -> dict:
+    return dict(
+        model=model or model_for("specific_essay"),
+        max_tokens=ESSAY_REVISION_MAX_TOKENS,
+        betas=["structured-outputs-2025-11-13"],
+        system=cached_system(ESSAY_REVISION_SYSTEM_PROMPT),
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": (
+                            f"SCHOLARSHIP (JSON):\n{scholarship_payload(scholarship, 'specific_essay')}\n\n"
+                            f"SCHOLARSHIP_ANALYSIS (JSON):\n{analysis_payload(scholarship_analysis, 'specific_essay')}\n\n"
+                        ),
+                        "cache_control": CACHE_CONTROL,
+                    },
+                    {
+                        "type": "text",
+                        "text": (
+                            f"CURRENT_ESSAY:\n{essay}\n\n"
+                            f"PROFILE_CHANGES (JSON):\n{json.dumps(changes, separators=(',', ':'), ensure_ascii=False)}\n"
+                        ),
+                    },
+                ],
+            },
+        ],
+        output_format=EssayRevision,
+    )
+
+
+def match_cache_model() -> str:
+    """Model key match results are cached under: the cascade setup when it is on, else the match model."""
+    return MATCH_CASCADE.cache_model if MATCH_CASCADE is not None else model_for("match")
+
+
+# --- SYNC HELPERS (scripts / CLI) ---
+
+def analyze_scholarship(client, scholarship_data: Scholarship, cache: Optional[AnalysisCache] = None) -> ScholarshipAnalysis:
+
+    if cache is not None:
+        cached = cache.get(scholarship_data, model_for("analysis"), ANALYSIS_PROMPT_VERSION)
+        if cached is not None:
+            return cached
+
+    with track_model_call("analysis"):
+        response = client.beta.messages.parse(**analysis_request(scholarship_data))
+    usage_tracker.record("analysis", response.usage)
+
+    analysis = response.parsed_output
+    if cache is not None and analysis is not None:
+        cache.put(scholarship_data, model_for("analysis"), ANALYSIS_PROMPT_VERSION, analysis)
+    return analysis
+
+
+def match_student_scholarship(client, student: Student, scholarship: Scholarship, scholarship_analysis: ScholarshipAnalysis, cache: Optional[MatchCache] = None) -> StudentScholarshipMatch:
+
+    if cache is not None:
+        cached = cache.get(student, scholarship, scholarship_analysis, match_cache_model(), MATCH_PROMPT_VERSION)
+        if cached is not None:
+            return cached
+
+    def score(task: str, model: str) -> StudentScholarshipMatch:
+        with track_model_call(task):
+            response = client.beta.messages.parse(**match_request(student, scholarship, scholarship_analysis, model=model))
+        usage_tracker.record(task, response.usage)
+        return response.parsed_output
+
+    if MATCH_CASCADE is None:
+        match = score("match", model_for("match"))
+    else:
+        match = score("match_screen", MATCH_CASCADE.screen_model)
+        outcome = MATCH_CASCADE.escalation(match.match_score if match is not None else None)
+        if outcome:
+            strong = score("match", MATCH_CASCADE.strong_model)
+            if strong is None:
+                raise ValueError("Match returned no structured output")
+            if match is not None:
+                MATCH_CASCADE.compare(outcome, match.match_score, strong.match_score)
+            match = strong
+
+    if cache is not None and match is not None:
+        cache.put(student, scholarship, scholarship_analysis, match_cache_model(), MATCH_PROMPT_VERSION, match)
+    return match
+
+
+def generate_general_essay(client, student: Student) -> str:
+    with track_model_call("general_essay"):
+        response = client.beta.messages.parse(**general_essay_request(student))
+    usage_tracker.record("general_essay", response.usage)
+
     return response.content[0].text
 
 
+def generate_specific_essay(
+    client,
+    student: Student,
+    scholarship: Scholarship,
+    scholarship_analysis: ScholarshipAnalysis,
+    match_analysis: StudentScholarshipMatch,
+) -> str:
+    with track_model_call("specific_essay"):
+        response = client.beta.messages.parse(
+            **specific_essay_request(student, scholarship, scholarship_analysis, match_analysis)
+        )
+    usage_tracker.record("specific_essay", response.usage)
+
+    return response.content[0].text
+
+
+# --- ASYNC HELPERS (FastAPI) ---
+# Same behaviour as above, but awaiting an AsyncAnthropic client so model calls don't block the event loop.
+# Identical concurrent calls (same input fingerprint) are coalesced into one upstream request, and every
+# upstream request goes through the shared rate-limit scheduler at the caller's priority.
+
+inflight = SingleFlight()
+
+
+async def analyze_scholarship_async(client: AsyncAnthropic, scholarship_data: Scholarship, cache: Optional[AnalysisCache] = None, priority: Priority = Priority.MATCH) -> ScholarshipAnalysis:
+
+    if cache is not None:
+        cached = cache.get(scholarship_data, model_for("analysis"), ANALYSIS_PROMPT_VERSION)
+        if cached is not None:
+            return cached
+
+    async def call() -> ScholarshipAnalysis:
+        request = analysis_request(scholarship_data)
+        with track_model_call("analysis") as timer:
+            response = await scheduler.submit("analysis", priority, request, timer.granted(lambda: client.beta.messages.parse(**request)))
+        usage_tracker.record("analysis", response.usage)
+
+        analysis = response.parsed_output
+        if cache is not None and analysis is not None:
+            cache.put(scholarship_data, model_for("analysis"), ANALYSIS_PROMPT_VERSION, analysis)
+        return analysis
+
+    return await inflight.do(fingerprint("analysis", scholarship_data, model_for("analysis"), ANALYSIS_PROMPT_VERSION), call)
+
+
+async def match_student_scholarship_async(client: AsyncAnthropic, student: Student, scholarship: Scholarship, scholarship_analysis: ScholarshipAnalysis, cache: Optional[MatchCache] = None, priority: Priority = Priority.MATCH) -> StudentScholarshipMatch:
+
+    if cache is not None:
+        cached = cache.get(student, scholarship, scholarship_analysis, match_cache_model(), MATCH_PROMPT_VERSION)
+        if cached is not None:
+            return cached
+
+    async def score(task: str, model: str) -> StudentScholarshipMatch:
+        request = match_request(student, scholarship, scholarship_analysis, model=model)
+        with track_model_call(task) as timer:
+            response = await scheduler.submit(task, priority, request, timer.granted(lambda: client.beta.messages.parse(**request)))
+        usage_tracker.record(task, response.usage)
+        return response.parsed_output
+
+    async def call() -> StudentScholarshipMatch:
+        if MATCH_CASCADE is None:
+            match = await score("match", model_for("match"))
+        else:
+            # Cheap screening pass; only borderline (or audited) scores pay for the strong model
+            match = await score("match_screen", MATCH_CASCADE.screen_model)
+            outcome = MATCH_CASCADE.escalation(match.match_score if match is not None else None)
+            if outcome:
+                strong = await score("match", MATCH_CASCADE.strong_model)
+                if strong is None:
+                    raise ValueError("Match returned no structured output")
+                if match is not None:
+                    MATCH_CASCADE.compare(outcome, match.match_score, strong.match_score)
+                match = strong
+
+        if cache is not None and match is not None:
+            cache.put(student, scholarship, scholarship_analysis, match_cache_model(), MATCH_PROMPT_VERSION, match)
+        return match
+
+    key = fingerprint("match", student, scholarship, scholarship_analysis, match_cache_model(), MATCH_PROMPT_VERSION)
+    return await inflight.do(key, call)
+
+
+async def generate_general_essay_async(client: AsyncAnthropic, student: Student) -> str:
+
+    async def call() -> str:
+        request = general_essay_request(student)
+        with track_model_call("general_essay") as timer:
+            response = await scheduler.submit("general_essay", Priority.ESSAY, request, timer.granted(lambda: client.beta.messages.parse(**request)))
+        usage_tracker.record("general_essay", response.usage)
+
+        return response.content[0].text
+
+    return await inflight.do(fingerprint("general_essay", student, model_for("general_essay")), call)
+
+
+async def generate_specific_essay_async(
+    client: AsyncAnthropic,
+    student: Student,
+    scholarship: Scholarship,
+    scholarship_analysis: ScholarshipAnalysis,
+    match_analysis: StudentScholarshipMatch,
+) -> str:
+
+    async def call() -> str:
+        request = specific_essay_request(student, scholarship, scholarship_analysis, match_analysis)
+        with track_model_call("specific_essay") as timer:
+            response = await scheduler.submit("specific_essay", Priority.ESSAY, request, timer.granted(lambda: client.beta.messages.parse(**request)))
+        usage_tracker.record("specific_essay", response.usage)
+
+        return response.content[0].text
+
+    key = fingerprint("specific_essay", student, scholarship, scholarship_analysis, match_analysis, model_for("specific_essay"))
+    return await inflight.do(key, call)
+
+
+# --- STREAMING ESSAYS ---
+# Yield text deltas as the model produces them. Closing the generator (e.g. client disconnect)
+# exits the stream context, which closes the upstream connection and stops generation.
+
+async def stream_general_essay_async(client: AsyncAnthropic, student: Student) -> AsyncIterator[str]:
+    request = general_essay_request(student)
+    with track_model_call("general_essay_stream") as timer:
+        async with scheduler.stream("general_essay", Priority.ESSAY, request, timer.granted(lambda: client.beta.messages.stream(**request))) as stream:
+            async for text in stream.text_stream:
+                yield text
+            usage_tracker.record("general_essay", (await stream.get_final_message()).usage)
+
+
+async def stream_specific_essay_async(
+    client: AsyncAnthropic,
+    student: Student,
+    scholarship: Scholarship,
+    scholarship_analysis: ScholarshipAnalysis,
+    match_analysis: StudentScholarshipMatch,
+) -> AsyncIterator[str]:
+    request = specific_essay_request(student, scholarship, scholarship_analysis, match_analysis)
+    with track_model_call("specific_essay_stream") as timer:
+        async with scheduler.stream("specific_essay", Priority.ESSAY, request, timer.granted(lambda: client.beta.messages.stream(**request))) as stream:
+            async for text in stream.text_stream:
+                yield text
+            usage_tracker.record("specific_essay", (await stream.get_final_message()).usage)
+
+
+# --- STORED ESSAYS ---
+# Specific essays are kept in an EssayStore keyed by their inputs: unchanged inputs return the stored
+# text, and a profile edit can be folded into the latest version with a few targeted edits.
+
+def stored_essay_key(student: Student, scholarship: Scholarship, scholarship_analysis: ScholarshipAnalysis, match_analysis: StudentScholarshipMatch) -> str:
+    return EssayStore.key(student, scholarship, scholarship_analysis, match_analysis, model_for("specific_essay"), SPECIFIC_ESSAY_PROMPT_VERSION)
+
+
+async def stored_specific_essay_async(
+    client: AsyncAnthropic,
+    store: EssayStore,
+    student: Student,
+    scholarship: Scholarship,
+    scholarship_analysis: ScholarshipAnalysis,
+    match_analysis: StudentScholarshipMatch,
+    regenerate: bool = False,
+) -> dict:
+    """{"essay", "version", "cached"}: the stored essay for these inputs, or a new one (stored as the next version)."""
+    key = stored_essay_key(student, scholarship, scholarship_analysis, match_analysis)
+    if not regenerate:
+        hit = store.lookup(key)
+        if hit is not None:
+            return {"essay": hit["essay"], "version": hit["version"], "cached": True}
+
+    async def call() -> dict:
+        essay = await generate_specific_essay_async(client, student, scholarship, scholarship_analysis, match_analysis)
+        version = store.put(key, student, scholarship, scholarship_analysis, match_analysis, essay, model_for("specific_essay"), SPECIFIC_ESSAY_PROMPT_VERSION)
+        return {"essay": essay, "version": version, "cached": False}
+
+    return await inflight.do(fingerprint("stored_essay", key, regenerate), call)
+
+
+async def stream_stored_specific_essay_async(
+    client: AsyncAnthropic,
+    store: EssayStore,
+    student: Student,
+    scholarship: Scholarship,
+    scholarship_analysis: ScholarshipAnalysis,
+    match_analysis: StudentScholarshipMatch,
+) -> AsyncIterator[str]:
+    """Streams the stored essay in one piece, or a new one as it is generated (stored only if it completes)."""
+    key = stored_essay_key(student, scholarship, scholarship_analysis, match_analysis)
+    hit = store.lookup(key)
+    if hit is not None:
+        yield hit["essay"]
+        return
+    parts = []
+    async for text in stream_specific_essay_async(client, student, scholarship, scholarship_analysis, match_analysis):
+        parts.append(text)
+        yield text
+    store.put(key, student, scholarship, scholarship_analysis, match_analysis, "".join(parts), model_for("specific_essay"), SPECIFIC_ESSAY_PROMPT_VERSION)
+
+
+async def revise_specific_essay_async(
+    client: AsyncAnthropic,
+    store: EssayStore,
+    student: Student,
+    scholarship: Scholarship,
+    scholarship_analysis: ScholarshipAnalysis,
+    match_analysis: StudentScholarshipMatch,
+    base_version: Optional[int] = None,
+    priority: Priority = Priority.ESSAY,
+) -> dict:
+    """
+    Updates a stored essay (the latest version unless `base_version` is given) for the changed profile
+    and match. The model only returns find/replace edits; they are applied here and the result is stored
+    as a new version. Returns {"essay", "version", "base_version", "changes", "rejected", "cached"}.
+
+    Raises KeyError when there is no essay to revise, and ValueError when the scholarship or its
+    analysis changed since (a revision can't cover that; generate a new essay instead).
+    """
+    key = stored_essay_key(student, scholarship, scholarship_analysis, match_analysis)
+    hit = store.lookup(key)
+    if hit is not None:
+        return {"essay": hit["essay"], "version": hit["version"], "base_version": hit["parent_version"], "changes": hit["changes"] or {}, "rejected": [], "cached": True}
+
+    base = store.get(student.id, scholarship.id, base_version)
+    if base is None:
+        which = f"essay version {base_version}" if base_version is not None else "essay"
+        raise KeyError(f"no stored {which} for {student.id} / {scholarship.id}")
+    if base["inputs_fp"] != EssayStore.inputs_fp(scholarship, scholarship_analysis):
+        raise ValueError(f"the scholarship or its analysis changed since version {base['version']}; generate a new essay instead")
+    changes = profile_changes(base["student"], student.model_dump(mode="json"), base["match"], match_analysis.model_dump(mode="json"))
+
+    async def call() -> dict:
+        request = essay_revision_request(scholarship, scholarship_analysis, base["essay"], changes)
+        with track_model_call("essay_revision") as timer:
+            response = await scheduler.submit("essay_revision", priority, request, timer.granted(lambda: client.beta.messages.parse(**request)))
+        usage_tracker.record("essay_revision", response.usage)
+
+        revision = response.parsed_output
+        if revision is None:
+            raise ValueError("Essay revision returned no structured output")
+        essay, rejected = apply_essay_edits(base["essay"], revision.edits)
+        result = {"essay": essay, "version": None, "base_version": base["version"], "changes": changes, "rejected": rejected, "cached": False}
+        # if every proposed edit failed, the text is still the old essay: don't file it under the new inputs
+        if not revision.edits or len(rejected) < len(revision.edits):
+            result["version"] = store.put(
+                key, student, scholarship, scholarship_analysis, match_analysis, essay, request["model"],
+                f"{SPECIFIC_ESSAY_PROMPT_VERSION}+revision-{ESSAY_REVISION_PROMPT_VERSION}", "revised", base["version"], changes,
+            )
+        return result
+
+    return await inflight.do(fingerprint("essay_revision", key, base["version"]), call)
+
+
+async def analyze_and_match_async(
+    client: AsyncAnthropic,
+    student: Student,
+    scholarship: Scholarship,
+    analysis_cache: Optional[AnalysisCache] = None,
+    match_cache: Optional[MatchCache] = None,
+    priority: Priority = Priority.MATCH,
+) -> tuple[ScholarshipAnalysis, StudentScholarshipMatch]:
+    """Resolves the scholarship analysis (cached when possible) and then scores the student against it."""
+    analysis = await analyze_scholarship_async(client, scholarship, cache=analysis_cache, priority=priority)
+    match = await match_student_scholarship_async(client, student, scholarship, analysis, cache=match_cache, priority=priority)
+    return analysis, match
+
+
+# --- PACKED MATCHING ---
+# One call scores a student against a whole pack of scholarships, so the system prompt and student profile
+# are sent once per pack instead of once per pair. Pairs the packed answer misses (or gets wrong) fall
+# back to the per-pair helpers above.
+
+def _store_packed(cache: Optional[MatchCache], student: Student, todo: list, packed: dict) -> None:
+    MATCH_PACK_PAIRS.inc("packed", amount=len(packed))
+    MATCH_PACK_PAIRS.inc("fallback", amount=len(todo) - len(packed))
+    if cache is not None:
+        for scholarship, scholarship_analysis in todo:
+            if scholarship.id in packed:
+                cache.put(student, scholarship, scholarship_analysis, match_cache_model(), MATCH_PROMPT_VERSION, packed[scholarship.id])
+
+
+def match_pack(client, student: Student, pairs: list[tuple[Scholarship, ScholarshipAnalysis]], cache: Optional[MatchCache] = None) -> dict[str, StudentScholarshipMatch]:
+    found = cache.get_many(student, pairs, match_cache_model(), MATCH_PROMPT_VERSION) if cache is not None else {}
+    todo = [(s, a) for s, a in pairs if s.id not in found]
+
+    if len(todo) > 1:
+        request = packed_match_request(student, todo)
+        try:
+            with track_model_call("match_packed"):
+                response = client.beta.messages.parse(**request)
+            usage_tracker.record("match_packed", response.usage)
+            packed = unpack_matches(student, todo, response.parsed_output)
+        except ValueError:  # includes pydantic's ValidationError
+            packed = {}
+        _store_packed(cache, student, todo, packed)
+        found.update(packed)
+        todo = [(s, a) for s, a in todo if s.id not in packed]
+
+    for scholarship, scholarship_analysis in todo:
+        found[scholarship.id] = match_student_scholarship(client, student, scholarship, scholarship_analysis, cache=cache)
+    return found
+
+
+async def match_pack_async(
+    client: AsyncAnthropic,
+    student: Student,
+    pairs: list[tuple[Scholarship, ScholarshipAnalysis]],
+    cache: Optional[MatchCache] = None,
+    priority: Priority = Priority.BACKGROUND,
+) -> dict[str, Union[StudentScholarshipMatch, Exception]]:
+    """
+    Scores one pack (see plan_match_packs) in a single call. Returns results by scholarship id; a pair
+    whose per-pair fallback also failed maps to the exception instead.
+    """
+    found: dict = cache.get_many(student, pairs, match_cache_model(), MATCH_PROMPT_VERSION) if cache is not None else {}
+    todo = [(s, a) for s, a in pairs if s.id not in found]
+
+    if len(todo) > 1:
+        request = packed_match_request(student, todo)
+        try:
+            with track_model_call("match_packed") as timer:
+                response = await scheduler.submit("match_packed", priority, request, timer.granted(lambda: client.beta.messages.parse(**request)))
+            usage_tracker.record("match_packed", response.usage)
+            packed = unpack_matches(student, todo, response.parsed_output)
+        except ValueError:  # includes pydantic's ValidationError
+            packed = {}
+        _store_packed(cache, student, todo, packed)
+        found.update(packed)
+        todo = [(s, a) for s, a in todo if s.id not in packed]
+
+    results = await asyncio.gather(
+        *(match_student_scholarship_async(client, student, s, a, cache=cache, priority=priority) for s, a in todo),
+        return_exceptions=True,
+    )
+    for (scholarship, _), result in zip(todo, results):
+        found[scholarship.id] = result
+    return found
+
+
+# --- PROFILE AGENT ---
+# One chat turn: send the stored profile and a short history window, apply the returned patch, persist.
+# Callers serialize turns per session (the API holds a per-session lock).
+
+def _agent_turn_request(store: SessionStore, session_id: str, message: str, model: Optional[str] = None) -> tuple[AgentProfile, dict]:
+    profile = store.profile(session_id)
+    if profile is None:
+        raise KeyError(session_id)
+    return profile, agent_request(profile, store.history(session_id), message, model=model)
+
+
+def _apply_agent_turn(store: SessionStore, session_id: str, message: str, profile: AgentProfile, response) -> tuple[AgentTurn, AgentProfile, list[dict]]:
+    usage_tracker.record("agent", response.usage)
+    turn = response.parsed_output
+    if turn is None:
+        raise ValueError("Agent returned no structured turn")
+    profile, rejected = apply_profile_patch(profile, turn.patch)
+    store.record_turn(session_id, message, turn.assistant_reply, profile)
+    return turn, profile, rejected
+
+
+def agent_session_turn(client, store: SessionStore, session_id: str, message: str, model: Optional[str] = None) -> tuple[AgentTurn, AgentProfile, list[dict]]:
+    """Returns the model's turn, the updated profile and any patch operations that were rejected."""
+    profile, request = _agent_turn_request(store, session_id, message, model=model)
+    with track_model_call("agent"):
+        response = client.beta.messages.parse(**request)
+    return _apply_agent_turn(store, session_id, message, profile, response)
+
+
+async def agent_session_turn_async(client: AsyncAnthropic, store: SessionStore, session_id: str, message: str, priority: Priority = Priority.ESSAY) -> tuple[AgentTurn, AgentProfile, list[dict]]:
+    profile, request = _agent_turn_request(store, session_id, message)
+    with track_model_call("agent") as timer:
+        response = await scheduler.submit("agent", priority, request, timer.granted(lambda: client.beta.messages.parse(**request)))
+    return _apply_agent_turn(store, session_id, message, profile, response)
+
 
 if __name__ == '__main__':
 
     # Testing Stuff Below
 
-    load_dotenv()
-    client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+    client = model_registry.client()
 
     script_dir = os.path.dirname(os.path.abspath(__file__))
     scholarship_file_path = os.path.join(script_dir, '..', 'data', 'scholarships.json')
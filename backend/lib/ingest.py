@@ -0,0 +1,188 @@
+# Streaming NDJSON ingestion for partner scholarship feeds (POST /api/scholarships/ingest).
+#
+# The upload is cut into batches of lines as it arrives. Batches are validated against Scholarship
+# (and content-hashed) in a process pool, with at most INGEST_WORKERS + 1 batches in flight, then
+# upserted in upload order. Memory therefore depends on the batch size, never on the upload size.
+# Records that are new or changed go onto the store's analysis queue, drained in the background.
+#
+#   INGEST_WORKERS      validation processes (default: CPU count)
+#   INGEST_BATCH_SIZE   lines per batch unless the request says otherwise (default 1000)
+
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from pydantic import ValidationError
+
+from cache import fingerprint
+from metrics import INGEST_ANALYSES, INGEST_RECORDS
+from scheduler import Backpressure
+from schemas import Scholarship
+
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+
+# Longer lines are rejected without being buffered
+MAX_LINE_BYTES = 1 << 20
+
+# Rejections listed per batch report (the counts are always complete)
+MAX_REPORTED_ERRORS = 20
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def validation_pool() -> ProcessPoolExecutor:
+    """Shared pool, started on first use. spawn, because the API process has threads and open sockets."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(INGEST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def describe(error: ValidationError) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    more = f" (+{error.error_count() - 1} more)" if error.error_count() > 1 else ""
+    return f"{location + ': ' if location else ''}{first['msg']}{more}"
+
+
+def validate_batch(lines: list[tuple[int, bytes]]) -> tuple[list[tuple[dict, str]], list[dict]]:
+    """Runs in a pool worker: (validated record, content hash) pairs and {line, error} rejections."""
+    accepted, rejected = [], []
+    for number, line in lines:
+        try:
+            scholarship = Scholarship.model_validate_json(line)
+        except ValidationError as e:
+            rejected.append({"line": number, "error": describe(e)})
+            continue
+        accepted.append((scholarship.model_dump(), fingerprint(scholarship)))
+    return accepted, rejected
+
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Optional[bytes]]]:
+    """(line number, line) for each non-blank line; the line is None when it exceeded MAX_LINE_BYTES."""
+    buffer = bytearray()
+    number = 0
+    overlong = False
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            end = buffer.find(b"\n")
+            if end < 0:
+                if len(buffer) > MAX_LINE_BYTES:
+                    overlong = True
+                    buffer.clear()
+                break
+            line = bytes(buffer[:end]).strip()
+            del buffer[:end + 1]
+            number += 1
+            # a line can arrive whole (newline included) in one big chunk, so check it here too
+            if overlong or len(line) > MAX_LINE_BYTES:
+                overlong = False
+                yield number, None
+            elif line:
+                yield number, line
+    if overlong:
+        yield number + 1, None
+    elif buffer.strip():
+        yield number + 1, bytes(buffer).strip()
+
+
+async def ingest_ndjson(
+    chunks: AsyncIterator[bytes],
+    upsert: Callable[[list[Scholarship], list[str]], list[str]],
+    batch_size: int = INGEST_BATCH_SIZE,
+    pool: Optional[ProcessPoolExecutor] = None,
+    on_batch: Optional[Callable[[list[Scholarship], list[str]], None]] = None,
+) -> AsyncIterator[dict]:
+    """
+    Validates and upserts an NDJSON upload batch by batch, yielding one report per batch and a final
+    summary. `upsert(scholarships, content_hashes)` is a blocking store write returning an
+    "inserted" / "updated" / "unchanged" outcome per record; it runs in a thread. `on_batch` gets the
+    same records and outcomes back on the event loop, e.g. to update in-memory indexes.
+    """
+    pool = pool or validation_pool()
+    loop = asyncio.get_running_loop()
+    in_flight: deque = deque()
+    totals = {"lines": 0, "accepted": 0, "rejected": 0, "inserted": 0, "updated": 0, "unchanged": 0}
+    started = time.perf_counter()
+
+    def submit(number: int, lines: list[tuple[int, bytes]], oversized: list[dict]) -> None:
+        future = loop.run_in_executor(pool, validate_batch, lines)
+        in_flight.append((number, len(lines) + len(oversized), oversized, time.perf_counter(), future))
+
+    async def finish() -> dict:
+        number, line_count, oversized, batch_started, future = in_flight.popleft()
+        accepted, rejected = await future
+        rejected = sorted(oversized + rejected, key=lambda r: r["line"])
+        # already validated in the worker, so skip a second validation pass here
+        scholarships = [Scholarship.model_construct(**record) for record, _ in accepted]
+        outcomes = await asyncio.to_thread(upsert, scholarships, [h for _, h in accepted]) if accepted else []
+        if on_batch is not None:
+            on_batch(scholarships, outcomes)
+
+        report = {"batch": number, "lines": line_count, "accepted": len(accepted), "rejected": len(rejected)}
+        for outcome in ("inserted", "updated", "unchanged"):
+            report[outcome] = outcomes.count(outcome)
+            INGEST_RECORDS.inc(outcome, amount=report[outcome])
+        INGEST_RECORDS.inc("rejected", amount=len(rejected))
+        for key in totals:
+            totals[key] += report[key]
+        report["records_per_sec"] = round(line_count / max(time.perf_counter() - batch_started, 1e-9), 1)
+        report["errors"] = rejected[:MAX_REPORTED_ERRORS]
+        return report
+
+    number, lines, oversized = 0, [], []
+    async for line_number, line in read_lines(chunks):
+        if line is None:
+            oversized.append({"line": line_number, "error": f"line longer than {MAX_LINE_BYTES} bytes"})
+        else:
+            lines.append((line_number, line))
+        if len(lines) + len(oversized) >= batch_size:
+            number += 1
+            submit(number, lines, oversized)
+            lines, oversized = [], []
+            # bounded pipeline: wait for the oldest batch before reading further ahead
+            if len(in_flight) > INGEST_WORKERS:
+                yield await finish()
+    if lines or oversized:
+        number += 1
+        submit(number, lines, oversized)
+    while in_flight:
+        yield await finish()
+
+    elapsed = time.perf_counter() - started
+    yield {"done": True, "batches": number, **totals, "seconds": round(elapsed, 3), "records_per_sec": round(totals["lines"] / max(elapsed, 1e-9), 1)}
+
+
+async def drain_analysis_queue(store, analyze: Callable[[Scholarship], Awaitable[object]], concurrency: int = 4) -> None:
+    """Analyzes queued scholarships until the store's analysis queue is empty."""
+    while True:
+        pending = await asyncio.to_thread(store.pending_analysis, concurrency)
+        if not pending:
+            return
+
+        async def run(scholarship_id: str, content_hash: str) -> None:
+            scholarship = await asyncio.to_thread(store.scholarships.get, scholarship_id)
+            if scholarship is None:
+                await asyncio.to_thread(store.finish_analysis, scholarship_id, content_hash)
+                return
+            try:
+                await analyze(scholarship)
+            except Backpressure as e:
+                INGEST_ANALYSES.inc("deferred")
+                await asyncio.sleep(e.retry_after)
+                return
+            except Exception:
+                INGEST_ANALYSES.inc("failed")
+                await asyncio.to_thread(store.fail_analysis, scholarship_id)
+                return
+            INGEST_ANALYSES.inc("analyzed")
+            await asyncio.to_thread(store.finish_analysis, scholarship_id, content_hash)
+
+        await asyncio.gather(*(run(sid, content_hash) for sid, content_hash in pending))
@@ -0,0 +1,404 @@
+# Durable background jobs (POST /api/jobs/...): long model work runs outside the HTTP request.
+#
+# Jobs live in SQLite, so they survive restarts and can be shared by several API processes. A worker
+# claims a job by taking a lease on it and renews the lease while the job runs. If the process dies,
+# the lease runs out and any worker picks the job up again. Failures are retried with backoff up to
+# JOB_MAX_ATTEMPTS; rate-limit backpressure re-queues a job without using up an attempt. Submissions
+# may carry an idempotency key, so a client retrying a POST gets the original job back.
+#
+#   JOB_STORE_PATH       job database (default backend/data/jobs.sqlite3)
+#   JOB_WORKERS          jobs run concurrently per process (default 4)
+#   JOB_MAX_ATTEMPTS     tries before a job is marked failed (default 3)
+#   JOB_LEASE_SECONDS    how long a silent worker keeps its jobs before they are re-run (default 60)
+#   JOB_RETENTION_DAYS   finished jobs are deleted after this long (default 7)
+
+import asyncio
+import json
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+from cache import connect, fingerprint
+from metrics import JOB_DURATION, JOB_OUTCOMES
+from scheduler import Backpressure
+
+
+DEFAULT_JOB_PATH = Path(
+    os.getenv("JOB_STORE_PATH", Path(__file__).resolve().parent.parent / "data" / "jobs.sqlite3")
+)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+# Idle workers and waiters re-check the database this often (jobs from other processes, delayed retries)
+POLL_INTERVAL = 1.0
+
+# Retry backoff after a failed attempt: base * 2^(attempt - 1), capped, with jitter
+RETRY_BASE = 2.0
+RETRY_CAP = 60.0
+
+# Progress updates are written at most this often per job
+PROGRESS_INTERVAL = 0.5
+
+COLUMNS = "id, kind, status, attempts, max_attempts, progress, result, error, created_at, started_at, finished_at"
+
+
+class IdempotencyConflict(Exception):
+    """The idempotency key was already used for a different request."""
+
+
+# --- JOB QUEUE ---
+
+class JobQueue:
+    """The SQLite side: submit, claim (with a lease), finish, inspect. Thread-safe."""
+
+    def __init__(self, path: Path = DEFAULT_JOB_PATH, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                payload_fp TEXT NOT NULL,
+                idempotency_key TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_after REAL NOT NULL,
+                lease_owner TEXT,
+                lease_until REAL,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_idempotency ON jobs (kind, idempotency_key) WHERE idempotency_key IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, run_after);
+            CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at);
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _row(row) -> dict:
+        job = dict(zip([c.strip() for c in COLUMNS.split(",")], row))
+        for field in ("progress", "result"):
+            if job[field] is not None:
+                job[field] = json.loads(job[field])
+        return job
+
+    def submit(self, kind: str, payload: BaseModel, idempotency_key: Optional[str] = None) -> tuple[dict, bool]:
+        """(job, created). With a key already used for this kind, the original job comes back instead."""
+        payload_json = payload.model_dump_json()
+        payload_fp = fingerprint(kind, payload)
+        now = time.time()
+        with self._lock, self._conn:
+            if idempotency_key is not None:
+                row = self._conn.execute(
+                    f"SELECT payload_fp, {COLUMNS} FROM jobs WHERE kind = ? AND idempotency_key = ?", (kind, idempotency_key)
+                ).fetchone()
+                if row is not None:
+                    if row[0] != payload_fp:
+                        raise IdempotencyConflict(f"Idempotency key {idempotency_key!r} was used for a different {kind} request")
+                    return self._row(row[1:]), False
+            job_id = uuid.uuid4().hex
+            row = self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, payload_fp, idempotency_key, status, max_attempts, run_after, created_at) "
+                f"VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?) RETURNING {COLUMNS}",
+                (job_id, kind, payload_json, payload_fp, idempotency_key, self.max_attempts, now, now),
+            ).fetchone()
+        return self._row(row), True
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def claim(self, owner: str, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[dict]:
+        """
+        Leases the next runnable job to `owner`: a queued one that is due, or a running one whose
+        worker stopped renewing its lease (crashed or restarted). Returns {id, kind, payload, attempts}.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            # a job whose workers keep dying is not retried forever
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'worker stopped while running the job', finished_at = ?, "
+                "lease_owner = NULL WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            row = self._conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?, lease_until = ?, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ("
+                "  SELECT id FROM jobs WHERE (status = 'queued' AND run_after <= ?) OR (status = 'running' AND lease_until < ?)"
+                "  ORDER BY run_after LIMIT 1"
+                ") RETURNING id, kind, payload, attempts",
+                (owner, now + lease_seconds, now, now, now),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "kind": row[1], "payload": row[2], "attempts": row[3]}
+
+    def _update(self, job_id: str, owner: str, assignments: str, params: tuple) -> bool:
+        """Applies an update only while `owner` still holds the lease (a cancelled or lost job is left alone)."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                params + (job_id, owner),
+            ).rowcount > 0
+
+    def renew(self, job_id: str, owner: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        return self._update(job_id, owner, "lease_until = ?", (time.time() + lease_seconds,))
+
+    def report(self, job_id: str, owner: str, progress: dict) -> bool:
+        return self._update(job_id, owner, "progress = ?", (json.dumps(progress),))
+
+    def complete(self, job_id: str, owner: str, result) -> bool:
+        return self._update(
+            job_id, owner, "status = 'succeeded', result = ?, error = NULL, finished_at = ?, lease_owner = NULL",
+            (json.dumps(result), time.time()),
+        )
+
+    def fail(self, job_id: str, owner: str, error: str, retry: bool = True) -> str:
+        """Re-queues the job with backoff while attempts remain (and `retry`), else marks it failed. Returns the new status."""
+        with self._lock:
+            row = self._conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        attempts, max_attempts = row if row else (0, 0)
+        if retry and attempts < max_attempts:
+            delay = min(RETRY_CAP, RETRY_BASE * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+            updated = self._update(
+                job_id, owner, "status = 'queued', error = ?, run_after = ?, lease_owner = NULL", (error, time.time() + delay)
+            )
+            return "queued" if updated else "lost"
+        updated = self._update(
+            job_id, owner, "status = 'failed', error = ?, finished_at = ?, lease_owner = NULL", (error, time.time())
+        )
+        return "failed" if updated else "lost"
+
+    def release(self, job_id: str, owner: str, delay: float = 0.0) -> bool:
+        """Puts a job back without using up an attempt (backpressure, or this process shutting down)."""
+        return self._update(
+            job_id, owner, "status = 'queued', attempts = attempts - 1, run_after = ?, lease_owner = NULL", (time.time() + delay,)
+        )
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancels a queued or running job. Returns the job's status afterwards, None if it doesn't exist."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, lease_owner = NULL WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id),
+            )
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def purge(self, older_than_days: float = JOB_RETENTION_DAYS) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (time.time() - older_than_days * 86400,)
+            ).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# --- WORKER POOL ---
+
+JobHandler = Callable[[BaseModel, Callable[[dict], None]], Awaitable[object]]
+
+
+class JobKind:
+    """How to run one kind of job: the payload model, the handler, and which errors are not worth retrying."""
+
+    def __init__(self, payload: type[BaseModel], handler: JobHandler, permanent: tuple[type[BaseException], ...] = ()):
+        self.payload = payload
+        self.handler = handler
+        self.permanent = permanent
+
+
+class JobRunner:
+    """
+    Runs jobs from a JobQueue on the event loop, `workers` at a time. The handler gets the validated
+    payload and a `report(progress)` callback; its (JSON-serializable) return value is the job result.
+    """
+
+    def __init__(self, queue: JobQueue, workers: int = JOB_WORKERS, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.queue = queue
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.kinds: dict[str, JobKind] = {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: list[asyncio.Task] = []
+        self._running: dict[str, asyncio.Task] = {}
+        self._stopping = False
+        self._changed: Optional[asyncio.Event] = None
+
+    def register(self, kind: str, job_kind: JobKind) -> None:
+        self.kinds[kind] = job_kind
+
+    # --- change notification ---
+    # One event per "generation": whoever wants to wait grabs the current event before reading the
+    # database, so a change made in between can't be missed.
+
+    def changed(self) -> asyncio.Event:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed
+
+    def notify(self) -> None:
+        event = self.changed()
+        self._changed = asyncio.Event()
+        event.set()
+
+    async def _sleep(self, event: asyncio.Event, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    # --- lifecycle ---
+
+    def start(self) -> None:
+        """Starts the workers (once). Jobs left over from a previous run are picked up as their leases expire."""
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        self._stopping = False
+        self.queue.purge()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stops taking jobs; running ones are put back on the queue for the next start."""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # --- running jobs ---
+
+    def submit(self, kind: str, payload: BaseModel, idempotency_key: Optional[str] = None) -> tuple[dict, bool]:
+        job, created = self.queue.submit(kind, payload, idempotency_key)
+        if created:
+            self.notify()
+        return job, created
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        status = self.queue.cancel(job_id)
+        task = self._running.get(job_id)
+        if status == "cancelled" and task is not None:
+            task.cancel()
+        self.notify()
+        return status
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[dict]:
+        """The job once it has finished, or as it is when `timeout` runs out (long polling)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            event = self.changed()
+            job = self.queue.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in FINISHED or remaining <= 0:
+                return job
+            await self._sleep(event, min(remaining, POLL_INTERVAL))
+
+    async def _work(self) -> None:
+        while not self._stopping:
+            event = self.changed()
+            claimed = await asyncio.to_thread(self.queue.claim, self.owner, self.lease_seconds)
+            if claimed is None:
+                await self._sleep(event, POLL_INTERVAL)
+                continue
+            task = asyncio.create_task(self._run(claimed))
+            self._running[claimed["id"]] = task
+            try:
+                await asyncio.shield(task)
+            except Exception as e:
+                print(f"WARNING: job {claimed['id']} crashed its worker: {type(e).__name__}: {e}")
+            except asyncio.CancelledError:
+                # shutting down: give the job back so the next start runs it straight away
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                self.queue.release(claimed["id"], self.owner)
+                raise
+            finally:
+                self._running.pop(claimed["id"], None)
+                self.notify()
+
+    async def _heartbeat(self, job_id: str, task: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(self.queue.renew, job_id, self.owner, self.lease_seconds):
+                # cancelled, or the lease was lost to another worker: stop paying for this run
+                task.cancel()
+                return
+
+    async def _run(self, claimed: dict) -> None:
+        job_id, kind = claimed["id"], claimed["kind"]
+        job_kind = self.kinds.get(kind)
+        if job_kind is None:
+            self.queue.fail(job_id, self.owner, f"unknown job kind {kind!r}", retry=False)
+            JOB_OUTCOMES.inc(kind, "failed")
+            return
+
+        last_report = 0.0
+        unwritten: Optional[dict] = None
+
+        def report(progress: dict) -> None:
+            nonlocal last_report, unwritten
+            unwritten = progress
+            if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                unwritten = None
+                self.queue.report(job_id, self.owner, progress)
+                self.notify()
+
+        started = time.perf_counter()
+        handler = asyncio.create_task(job_kind.handler(job_kind.payload.model_validate_json(claimed["payload"]), report))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, handler))
+        try:
+            result = await handler
+        except Backpressure as e:
+            self.queue.release(job_id, self.owner, delay=e.retry_after)
+            outcome = "deferred"
+        except asyncio.CancelledError:
+            if not handler.cancelled():
+                raise
+            # cancelled through the API, lost its lease, or this process is stopping (then _work re-queues it)
+            outcome = "cancelled"
+        except job_kind.permanent as e:
+            self.queue.fail(job_id, self.owner, f"{type(e).__name__}: {e}", retry=False)
+            outcome = "failed"
+        except Exception as e:
+            outcome = "retried" if self.queue.fail(job_id, self.owner, f"{type(e).__name__}: {e}") == "queued" else "failed"
+        else:
+            if unwritten is not None:
+                self.queue.report(job_id, self.owner, unwritten)
+            try:
+                outcome = "succeeded" if self.queue.complete(job_id, self.owner, result) else "lost"
+            except (TypeError, ValueError) as e:
+                self.queue.fail(job_id, self.owner, f"result is not JSON-serializable: {e}", retry=False)
+                outcome = "failed"
+        finally:
+            heartbeat.cancel()
+        JOB_OUTCOMES.inc(kind, outcome)
+        JOB_DURATION.observe(kind, value=time.perf_counter() - started)
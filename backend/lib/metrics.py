@@ -0,0 +1,194 @@
+# Minimal Prometheus text-format metrics (no extra dependency).
+#
+# Hot-path updates are a dict lookup plus an integer add. Anything that already has its own
+# counters (token usage, cache hits) is read by collectors at scrape time instead of on every call.
+
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0, 120.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+class Gauge(Counter):
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float) -> None:
+        self._values[labels] = value
+
+    def render(self) -> Iterable[str]:
+        lines = list(super().render())
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names, self.buckets = name, help, labels, buckets
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, *labels, value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            # per-bucket counts (+Inf last), sum, count
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total, count) in list(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_labels(self.label_names + ('le',), labels + (le,))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {total}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: list[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], Iterable[str]]) -> None:
+        """Registers a function producing exposition lines at scrape time."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for fn in self._collectors:
+            lines.extend(fn())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+HTTP_LATENCY = registry.register(Histogram("http_request_duration_seconds", "HTTP request latency (until the last body byte)", ("method", "route")))
+HTTP_IN_FLIGHT = registry.register(Gauge("http_requests_in_flight", "HTTP requests currently being served", ("method",)))
+
+MODEL_LATENCY = registry.register(Histogram("model_call_duration_seconds", "Upstream model call latency per helper, excluding scheduler queue wait", ("task",)))
+MODEL_ERRORS = registry.register(Counter("model_call_errors_total", "Upstream model calls that raised, per helper", ("task", "error")))
+MODEL_RETRIES = registry.register(Counter("model_retries_total", "Upstream model calls retried by the scheduler", ("task", "reason")))
+
+SCHEDULER_QUEUED = registry.register(Gauge("model_scheduler_queued", "Model calls waiting for rate-limit capacity", ("priority",)))
+SCHEDULER_WAIT = registry.register(Histogram("model_scheduler_wait_seconds", "Time spent queued for rate-limit capacity", ("priority",)))
+SCHEDULER_SHED = registry.register(Counter("model_scheduler_shed_total", "Model calls rejected with 429/503 instead of queued", ("priority", "reason")))
+
+MATCH_PACK_PAIRS = registry.register(Counter("match_pack_pairs_total", "Pairs sent in packed match calls, by whether the packed answer was used", ("outcome",)))
+
+INGEST_RECORDS = registry.register(Counter("scholarship_ingest_records_total", "Ingested NDJSON records by outcome", ("outcome",)))
+INGEST_ANALYSES = registry.register(Counter("scholarship_ingest_analyses_total", "Queued analyses of ingested scholarships, by outcome", ("outcome",)))
+
+JOB_OUTCOMES = registry.register(Counter("background_job_runs_total", "Background job runs by kind and outcome", ("kind", "outcome")))
+JOB_DURATION = registry.register(Histogram("background_job_run_seconds", "Duration of one background job run", ("kind",)))
+
+CASCADE_ROUTED = registry.register(Counter("match_cascade_routed_total", "Match cascade decisions after the screening model", ("outcome",)))
+CASCADE_COMPARED = registry.register(Counter("match_cascade_compared_total", "Pairs scored by both tiers, by whether the scores agreed", ("outcome", "agreed")))
+CASCADE_SCORE_DELTA = registry.register(Histogram(
+    "match_cascade_score_delta", "Absolute screening vs strong model score difference", ("outcome",),
+    buckets=(0, 5, 10, 15, 20, 30, 50, 100),
+))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware overhead, works with streaming responses)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec(method)
+            # Route template (e.g. /api/scholarships/{scholarship_id}) keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.inc(method, route, status)
+            HTTP_LATENCY.observe(method, route, value=time.perf_counter() - start)
+
+
+class ModelCallTimer:
+    def __init__(self):
+        self.start = time.perf_counter()
+
+    def granted(self, call: Callable):
+        """
+        Wraps a scheduler call factory so the clock restarts when the scheduler actually runs it:
+        queue wait is already in model_scheduler_wait_seconds, and a retry times only its own attempt.
+        """
+        def run():
+            self.start = time.perf_counter()
+            return call()
+        return run
+
+
+@contextmanager
+def track_model_call(task: str):
+    """Times one upstream model call and counts failures by exception type."""
+    timer = ModelCallTimer()
+    try:
+        yield timer
+    except Exception as e:
+        MODEL_ERRORS.inc(task, type(e).__name__)
+        raise
+    finally:
+        MODEL_LATENCY.observe(task, value=time.perf_counter() - timer.start)
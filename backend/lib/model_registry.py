@@ -0,0 +1,140 @@
+# Lazily created Anthropic clients and cached model discovery, shared by the API, CLI and batch jobs.
+#
+# Importing this module (or anything that uses it) never touches the network: clients are built on
+# first use, and the list of models the key can use comes from a manifest on disk. Only when the
+# manifest is missing or older than its TTL is the models endpoint asked, once, and the answer saved.
+#
+#   MODEL_MANIFEST_PATH   cached model list (default backend/data/models.json)
+#   MODEL_MANIFEST_TTL    seconds before the manifest is refreshed (default 86400)
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from dotenv import load_dotenv
+
+
+DEFAULT_MANIFEST_PATH = Path(
+    os.getenv("MODEL_MANIFEST_PATH", Path(__file__).resolve().parent.parent / "data" / "models.json")
+)
+
+MANIFEST_TTL = float(os.getenv("MODEL_MANIFEST_TTL", "86400"))
+
+_env_loaded = False
+
+
+def load_env() -> None:
+    """Reads .env into os.environ once per process (a local file read, nothing more)."""
+    global _env_loaded
+    if not _env_loaded:
+        load_dotenv()
+        _env_loaded = True
+
+
+class ModelRegistry:
+    """One sync and one async client per process (each with its own connection pool), plus the model list."""
+
+    def __init__(self, manifest_path: Path = DEFAULT_MANIFEST_PATH, ttl: float = MANIFEST_TTL):
+        self.manifest_path = Path(manifest_path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._client = None
+        self._async_client = None
+        self._models: Optional[list[str]] = None
+
+    # --- clients ---
+
+    def _api_key(self) -> str:
+        load_env()
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not api_key:
+            raise RuntimeError("ANTHROPIC_API_KEY is missing. Put it in a .env file or env var.")
+        return api_key
+
+    def client(self):
+        """Blocking client for scripts and batch jobs."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from anthropic import Anthropic
+                    self._client = Anthropic(api_key=self._api_key())
+        return self._client
+
+    def async_client(self):
+        """
+        Async client for the API. Retries are off: the scheduler does them, since it knows about
+        priorities and shared rate limits.
+        """
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    from anthropic import AsyncAnthropic
+                    self._async_client = AsyncAnthropic(api_key=self._api_key(), max_retries=0)
+        return self._async_client
+
+    # --- model discovery ---
+
+    def _base_url(self) -> str:
+        load_env()
+        return os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            manifest = json.loads(self.manifest_path.read_text())
+        except (OSError, ValueError):
+            return None
+        # a manifest written against another endpoint (e.g. the benchmark mock) says nothing about this one
+        return manifest if manifest.get("base_url") == self._base_url() else None
+
+    def _write_manifest(self, models: list[str]) -> None:
+        manifest = {"base_url": self._base_url(), "fetched_at": time.time(), "models": models}
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp, self.manifest_path)
+
+    def available_models(self, refresh: bool = False) -> list[str]:
+        """
+        Model ids the key can use: from memory, else from a fresh manifest, else one models.list call.
+        If that call fails, a stale manifest is used; with no manifest at all the list is empty.
+        """
+        if self._models is not None and not refresh:
+            return self._models
+        with self._lock:
+            if self._models is not None and not refresh:
+                return self._models
+            manifest = self._read_manifest()
+            if manifest and not refresh and time.time() - manifest.get("fetched_at", 0) < self.ttl:
+                self._models = manifest["models"]
+                return self._models
+        try:
+            models = [m.id for m in self.client().models.list(limit=1000)]
+        except Exception as e:
+            print(f"WARNING: could not list models ({type(e).__name__}); using {'stale manifest' if manifest else 'configured names'}.")
+            models = manifest["models"] if manifest else []
+        else:
+            self._write_manifest(models)
+        with self._lock:
+            self._models = models
+        return models
+
+    def resolve(self, preferred: Iterable[str]) -> str:
+        """
+        First preferred model the key can use. An alias such as "claude-sonnet-4-5" matches its dated
+        ids. When nothing is known about availability, the first preference is returned untried.
+        """
+        preferred = list(preferred)
+        available = self.available_models()
+        for model in preferred:
+            if any(m == model or m.startswith(model + "-") for m in available):
+                return model
+        if available:
+            raise RuntimeError(f"None of {preferred} is available for this API key.")
+        return preferred[0]
+
+
+# Shared by everything in the process
+model_registry = ModelRegistry()
@@ -0,0 +1,275 @@
+# Offline precompute: analyze the whole catalog (and optionally every student/scholarship match)
+# through the Message Batches API and write the results into the shared analysis/match caches.
+#
+# Usage (from backend/lib):
+#   python precompute.py                 # analyses only
+#   python precompute.py --matches       # analyses, then all eligible student x scholarship matches
+#
+# Safe to interrupt: submitted batch ids are recorded in the cache database, and a rerun resumes
+# polling them instead of resubmitting. Items whose inputs already have a cached result are skipped.
+# Every item is recorded with the inputs it was submitted with; a result whose scholarship or student
+# changed (or was deleted) in the meantime is dropped, and the next run asks for it again.
+
+import argparse
+import json
+import time
+from typing import Optional
+
+from anthropic import Anthropic, transform_schema
+from pydantic import TypeAdapter, ValidationError
+
+from cache import DEFAULT_CACHE_PATH, AnalysisCache, MatchCache, connect, fingerprint
+from catalog import Catalog, open_catalog
+from eligibility import EligibilityIndex
+from model_registry import model_registry
+from helpers import ANALYSIS_PROMPT_VERSION, MATCH_PROMPT_VERSION, analysis_request, match_cache_model, match_request
+from routing import model_for
+from schemas import Scholarship, ScholarshipAnalysis, Student, StudentScholarshipMatch
+
+
+BATCH_BETAS = ["structured-outputs-2025-11-13"]
+
+# Message Batches limits are 100,000 requests and 256 MB per batch; stay under both
+MAX_BATCH_REQUESTS = 50_000
+MAX_BATCH_BYTES = 128 * 2**20
+
+# custom_id -> (scholarship id, student id or None, input fingerprint, submitted inputs as JSON)
+Items = dict[str, tuple[str, Optional[str], str, str]]
+
+
+def custom_id(phase: str, *ids: str) -> str:
+    """Batch custom_ids must match [a-zA-Z0-9_-]{1,64}; raw ids may not, so hash them (state maps them back)."""
+    return f"{phase}-{fingerprint(*ids)[:40]}"
+
+
+def chunk_requests(requests: list[dict]) -> list[list[dict]]:
+    chunks, size = [[]], 0
+    for request in requests:
+        request_bytes = len(json.dumps(request))
+        if chunks[-1] and (len(chunks[-1]) >= MAX_BATCH_REQUESTS or size + request_bytes > MAX_BATCH_BYTES):
+            chunks.append([])
+            size = 0
+        chunks[-1].append(request)
+        size += request_bytes
+    return chunks
+
+
+def to_batch_params(request: dict) -> dict:
+    """Turns a helpers.*_request() dict (parse-style) into plain Messages params for a batch entry."""
+    params = {k: v for k, v in request.items() if k != "betas"}
+    output_format = params.pop("output_format", None)
+    if output_format is not None:
+        params["output_format"] = {
+            "type": "json_schema",
+            "schema": transform_schema(TypeAdapter(output_format).json_schema()),
+        }
+    return params
+
+
+class BatchState:
+    """Records submitted batches and their items so an interrupted run can resume."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self._conn = connect(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS precompute_batch (
+                batch_id TEXT PRIMARY KEY,
+                phase TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS precompute_item (
+                custom_id TEXT NOT NULL,
+                batch_id TEXT NOT NULL,
+                scholarship_id TEXT NOT NULL,
+                student_id TEXT,
+                input_fp TEXT,
+                payload TEXT,
+                PRIMARY KEY (batch_id, custom_id)
+            )
+            """
+        )
+        # state written before items carried their inputs; such items are treated as stale
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(precompute_item)")}
+        for column in ("input_fp", "payload"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE precompute_item ADD COLUMN {column} TEXT")
+        self._conn.commit()
+
+    def pending(self, phase: str) -> list[str]:
+        rows = self._conn.execute(
+            "SELECT batch_id FROM precompute_batch WHERE phase = ? AND status = 'submitted' ORDER BY created_at", (phase,)
+        ).fetchall()
+        return [batch_id for (batch_id,) in rows]
+
+    def add(self, batch_id: str, phase: str, items: Items) -> None:
+        self._conn.execute(
+            "INSERT INTO precompute_batch (batch_id, phase, status, created_at) VALUES (?, ?, 'submitted', ?)",
+            (batch_id, phase, time.time()),
+        )
+        self._conn.executemany(
+            "INSERT INTO precompute_item (custom_id, batch_id, scholarship_id, student_id, input_fp, payload) VALUES (?, ?, ?, ?, ?, ?)",
+            [(cid, batch_id, *item) for cid, item in items.items()],
+        )
+        self._conn.commit()
+
+    def items(self, batch_id: str) -> Items:
+        rows = self._conn.execute(
+            "SELECT custom_id, scholarship_id, student_id, input_fp, payload FROM precompute_item WHERE batch_id = ?", (batch_id,)
+        ).fetchall()
+        return {cid: tuple(item) for cid, *item in rows}
+
+    def finish(self, batch_id: str) -> None:
+        self._conn.execute("UPDATE precompute_batch SET status = 'done' WHERE batch_id = ?", (batch_id,))
+        self._conn.execute("DELETE FROM precompute_item WHERE batch_id = ?", (batch_id,))
+        self._conn.commit()
+
+
+class Precompute:
+    def __init__(self, client: Anthropic, catalog: Catalog, analysis_cache: AnalysisCache, match_cache: MatchCache, state: BatchState, poll_interval: float = 30.0):
+        self.client = client
+        self.catalog = catalog
+        self.analysis_cache = analysis_cache
+        self.match_cache = match_cache
+        self.state = state
+        self.poll_interval = poll_interval
+
+    # --- building requests (only for inputs without a cached result) ---
+
+    def analysis_requests(self) -> tuple[list[dict], Items]:
+        requests, items = [], {}
+        for scholarship in self.catalog.iter_scholarships():
+            if self.analysis_cache.get(scholarship, model_for("analysis"), ANALYSIS_PROMPT_VERSION) is not None:
+                continue
+            cid = custom_id("analysis", scholarship.id)
+            requests.append({"custom_id": cid, "params": to_batch_params(analysis_request(scholarship))})
+            items[cid] = (scholarship.id, None, fingerprint(scholarship), json.dumps({"scholarship": scholarship.model_dump()}))
+        return requests, items
+
+    def match_requests(self) -> tuple[list[dict], Items]:
+        eligibility = EligibilityIndex(self.catalog.iter_constraints())
+        requests, items = [], {}
+        for student in self.catalog.students.values():
+            pairs = []
+            for scholarship_id in sorted(eligibility.candidates(student)):
+                scholarship = self.catalog.get_scholarship(scholarship_id)
+                if scholarship is None:
+                    continue
+                analysis = self.analysis_cache.get(scholarship, model_for("analysis"), ANALYSIS_PROMPT_VERSION)
+                if analysis is not None:
+                    pairs.append((scholarship, analysis))
+            # Batch matches always use the strong match model, which is also a valid answer under a cascade key
+            cached = self.match_cache.get_many(student, pairs, match_cache_model(), MATCH_PROMPT_VERSION)
+            for scholarship, analysis in pairs:
+                if scholarship.id in cached:
+                    continue
+                cid = custom_id("match", student.id, scholarship.id)
+                requests.append({"custom_id": cid, "params": to_batch_params(match_request(student, scholarship, analysis))})
+                payload = {"student": student.model_dump(), "scholarship": scholarship.model_dump(), "analysis": analysis.model_dump()}
+                items[cid] = (scholarship.id, student.id, fingerprint(student, scholarship), json.dumps(payload))
+        return requests, items
+
+    # --- submit / poll / collect ---
+
+    def submit(self, phase: str, requests: list[dict], items: Items) -> list[str]:
+        if not requests:
+            print(f"[{phase}] nothing to do, every item is already cached")
+            return []
+        batch_ids = []
+        for chunk in chunk_requests(requests):
+            batch = self.client.beta.messages.batches.create(requests=chunk, betas=BATCH_BETAS)
+            self.state.add(batch.id, phase, {r["custom_id"]: items[r["custom_id"]] for r in chunk})
+            print(f"[{phase}] submitted batch {batch.id} with {len(chunk)} requests")
+            batch_ids.append(batch.id)
+        return batch_ids
+
+    def wait(self, batch_id: str) -> None:
+        while True:
+            batch = self.client.beta.messages.batches.retrieve(batch_id, betas=BATCH_BETAS)
+            counts = batch.request_counts
+            print(f"  {batch_id}: {batch.processing_status} (processing={counts.processing}, succeeded={counts.succeeded}, errored={counts.errored})")
+            if batch.processing_status == "ended":
+                return
+            time.sleep(self.poll_interval)
+
+    def is_current(self, scholarship_id: str, student_id: Optional[str], input_fp: Optional[str]) -> bool:
+        """Whether the catalog still holds exactly the inputs an item was submitted with."""
+        scholarship = self.catalog.get_scholarship(scholarship_id)
+        if input_fp is None or scholarship is None:
+            return False
+        if student_id is None:
+            return fingerprint(scholarship) == input_fp
+        student = self.catalog.get_student(student_id)
+        return student is not None and fingerprint(student, scholarship) == input_fp
+
+    def collect(self, phase: str, batch_id: str) -> tuple[int, int]:
+        items = self.state.items(batch_id)
+        stored = failed = stale = 0
+        for entry in self.client.beta.messages.batches.results(batch_id, betas=BATCH_BETAS):
+            target = items.get(entry.custom_id)
+            if target is None:
+                continue
+            if entry.result.type != "succeeded":
+                failed += 1
+                continue
+            scholarship_id, student_id, input_fp, payload = target
+            # Edited or deleted since submission: filing this under the new inputs would be wrong,
+            # and the next run requests it again anyway
+            if not self.is_current(scholarship_id, student_id, input_fp):
+                stale += 1
+                continue
+            inputs = json.loads(payload)
+            scholarship = Scholarship.model_validate(inputs["scholarship"])
+            text = "".join(block.text for block in entry.result.message.content if block.type == "text")
+            try:
+                if phase == "analysis":
+                    analysis = ScholarshipAnalysis.model_validate_json(text)
+                    self.analysis_cache.put(scholarship, model_for("analysis"), ANALYSIS_PROMPT_VERSION, analysis)
+                else:
+                    student = Student.model_validate(inputs["student"])
+                    analysis = ScholarshipAnalysis.model_validate(inputs["analysis"])
+                    match = StudentScholarshipMatch.model_validate_json(text)
+                    self.match_cache.put(student, scholarship, analysis, match_cache_model(), MATCH_PROMPT_VERSION, match)
+                stored += 1
+            except ValidationError:
+                failed += 1
+        self.state.finish(batch_id)
+        print(f"[{phase}] batch {batch_id}: stored {stored}, failed {failed}, stale {stale}")
+        return stored, failed
+
+    def run_phase(self, phase: str) -> None:
+        # Resume anything left over from an interrupted run before submitting new work
+        for batch_id in self.state.pending(phase):
+            print(f"[{phase}] resuming batch {batch_id}")
+            self.wait(batch_id)
+            self.collect(phase, batch_id)
+
+        requests, items = self.analysis_requests() if phase == "analysis" else self.match_requests()
+        batch_ids = self.submit(phase, requests, items)
+        for batch_id in batch_ids:
+            self.wait(batch_id)
+            self.collect(phase, batch_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute scholarship analyses (and optionally matches) via the Message Batches API.")
+    parser.add_argument("--matches", action="store_true", help="Also precompute every eligible student x scholarship match")
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="Seconds between batch status checks")
+    args = parser.parse_args()
+
+    job = Precompute(
+        model_registry.client(),
+        open_catalog(),
+        AnalysisCache(),
+        MatchCache(),
+        BatchState(),
+        poll_interval=args.poll_interval,
+    )
+    job.run_phase("analysis")
+    if args.matches:
+        job.run_phase("match")
@@ -0,0 +1,92 @@
+# Local, model-free pre-scoring: rank scholarships for a student with one matrix product,
+# so only the top-K candidates are sent to match_student_scholarship.
+
+import re
+from typing import Iterable
+
+import numpy as np
+from schemas import ScholarshipAnalysis, Student
+
+
+# Feature order matches ScholarshipWeights
+DIMENSIONS = ("academics", "leadership", "community_service", "financial_need", "innovation")
+
+LEADERSHIP_KEYWORDS = re.compile(r"\b(president|founder|co-founder|captain|lead|leader|led|chair|director|head|organi[sz]ed|coordinat\w*|manag\w*)\b", re.I)
+SERVICE_KEYWORDS = re.compile(r"\b(volunteer\w*|community|service|nonprofit|non-profit|tutor\w*|mentor\w*|outreach|underserved|charity|food bank)\b", re.I)
+INNOVATION_KEYWORDS = re.compile(r"\b(research\w*|prototype\w*|hackathon\w*|startup|invent\w*|patent\w*|robot\w*|built|build|design\w*|engineer\w*|app|software|develop\w*)\b", re.I)
+ACADEMIC_KEYWORDS = re.compile(r"\b(dean'?s list|honou?rs?|scholar|olympiad|valedictorian|publication|published|award\w*|gpa)\b", re.I)
+
+
+def _saturate(count: float, scale: float) -> float:
+    # 0 -> 0, grows quickly then flattens towards 1 so one very busy profile can't dominate
+    return 1.0 - float(np.exp(-count / scale))
+
+
+def _student_text(student: Student) -> Iterable[str]:
+    for item in student.extracurriculars:
+        yield item.role
+        yield from item.details
+    for item in student.work_experience:
+        yield item.role
+        yield from item.details
+    yield from student.activities
+    yield from student.achievements
+    yield from student.stories
+
+
+def student_features(student: Student) -> np.ndarray:
+    """Maps a Student to a [0, 1] vector over DIMENSIONS."""
+    text = list(_student_text(student))
+
+    def hits(pattern: re.Pattern) -> int:
+        return sum(len(pattern.findall(chunk)) for chunk in text)
+
+    gpa = min(max(student.gpa / 4.0, 0.0), 1.0)
+    academics = 0.8 * gpa + 0.2 * _saturate(hits(ACADEMIC_KEYWORDS) + len(student.achievements), 4)
+    leadership = _saturate(sum(bool(LEADERSHIP_KEYWORDS.search(e.role)) for e in student.extracurriculars) * 2 + hits(LEADERSHIP_KEYWORDS), 6)
+    service = _saturate(hits(SERVICE_KEYWORDS), 4)
+    need = 1.0 if student.financial_need else 0.0
+    innovation = _saturate(hits(INNOVATION_KEYWORDS) + len(student.work_experience), 6)
+
+    return np.array([academics, leadership, service, need, innovation], dtype=np.float32)
+
+
+class PreScorer:
+    """
+    Holds a (n_scholarships x 5) weight matrix built from ScholarshipAnalysis.weights.
+    Rows are normalised to sum to 1, so a score is a weighted average of the student's features in [0, 1].
+    Rows are keyed by the id of the scholarship that was analyzed, not the id the model echoed back.
+    """
+
+    def __init__(self, analyses: Iterable[tuple[str, ScholarshipAnalysis]]):
+        pairs = list(analyses)
+        self.scholarship_ids = np.array([scholarship_id for scholarship_id, _ in pairs])
+        analyses = [a for _, a in pairs]
+        weights = np.array(
+            [[getattr(a.weights, dim) for dim in DIMENSIONS] for a in analyses], dtype=np.float32
+        ).reshape(len(analyses), len(DIMENSIONS))
+        weights = np.clip(weights, 0.0, None)
+        totals = weights.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        self.weights = weights / totals
+
+    def __len__(self) -> int:
+        return len(self.scholarship_ids)
+
+    def score(self, student: Student) -> np.ndarray:
+        return self.weights @ student_features(student)
+
+    def score_many(self, students: list[Student]) -> np.ndarray:
+        """(n_students x n_scholarships) score matrix in one pass."""
+        features = np.stack([student_features(s) for s in students]) if students else np.zeros((0, len(DIMENSIONS)), dtype=np.float32)
+        return features @ self.weights.T
+
+    def top_k(self, student: Student, k: int) -> list[tuple[str, float]]:
+        """Best k (scholarship_id, score) pairs, highest first."""
+        if k <= 0 or len(self) == 0:
+            return []
+        scores = self.score(student)
+        k = min(k, len(scores))
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx])]
+        return [(str(self.scholarship_ids[i]), float(scores[i])) for i in idx]
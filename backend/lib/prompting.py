@@ -0,0 +1,158 @@
+# Token-lean prompt payloads: per-task field projections of Student / Scholarship / analysis objects,
+# with empty values dropped and the Student's duplicated fields collapsed.
+#
+# Run `python prompting.py` (from backend/lib) for an old-vs-new student and scholarship payload size
+# report over backend/data,
+# or `python prompting.py --exact` to count tokens with the API's count_tokens endpoint.
+
+import json
+import re
+from typing import Any
+
+from pydantic import BaseModel
+from schemas import Scholarship, ScholarshipAnalysis, Student, StudentScholarshipMatch
+
+
+# Student fields each task actually reads. `major`, `year` and `activities` are handled by _dedupe_student.
+STUDENT_FIELDS = {
+    "match": [
+        "id", "country", "citizenship", "degree_level", "year_of_study", "field_of_study", "major",
+        "target_countries", "gpa", "financial_need", "work_experience", "extracurriculars", "activities",
+        "achievements", "background", "stories", "goals",
+    ],
+    "general_essay": [
+        "name", "field_of_study", "major", "year_of_study", "gpa", "work_experience", "extracurriculars",
+        "activities", "achievements", "background", "stories", "goals",
+    ],
+    "specific_essay": [
+        "name", "field_of_study", "major", "degree_level", "year_of_study", "gpa", "financial_need",
+        "work_experience", "extracurriculars", "activities", "achievements", "background", "stories", "goals",
+    ],
+}
+
+SCHOLARSHIP_FIELDS = {
+    # the deadline doesn't change what a scholarship values; id stays so the analysis can echo it
+    "analysis": ["id", "name", "amount", "description", "criteria_text", "tags"],
+    "match": list(Scholarship.model_fields),
+    "specific_essay": list(Scholarship.model_fields),
+}
+
+ANALYSIS_FIELDS = {
+    # tone only matters for writing, not scoring
+    "match": ["weights", "priority_summary", "evidence_snippets"],
+    "specific_essay": ["weights", "tone", "priority_summary", "evidence_snippets"],
+}
+
+MATCH_FIELDS = {
+    "specific_essay": ["match_score", "top_reasons"],
+}
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def strip_empty(value: Any) -> Any:
+    """Recursively drops None, empty strings and empty containers."""
+    if isinstance(value, dict):
+        cleaned = {k: strip_empty(v) for k, v in value.items()}
+        return {k: v for k, v in cleaned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        cleaned = [strip_empty(v) for v in value]
+        return [v for v in cleaned if v not in (None, "", [], {})]
+    return value
+
+
+def compact_json(value: Any) -> str:
+    if isinstance(value, BaseModel):
+        value = value.model_dump(mode="json")
+    return json.dumps(strip_empty(value), separators=(",", ":"), ensure_ascii=False)
+
+
+def _dedupe_student(data: dict) -> dict:
+    # year_of_study is the canonical year; `year` only restates it
+    data.pop("year", None)
+    if "major" in data and data.get("field_of_study", "").strip().lower() == data["major"].strip().lower():
+        data.pop("major")
+    # activities mostly restate extracurricular/work roles; keep only the ones that add something
+    if "activities" in data:
+        covered = set()
+        for item in data.get("extracurriculars", []) + data.get("work_experience", []):
+            covered |= set(WORD.findall(f"{item.get('role', '')} {item.get('organization', '')} {item.get('company', '')}".lower()))
+        kept = []
+        for activity in data["activities"]:
+            words = set(WORD.findall(activity.lower()))
+            if not words or len(words & covered) / len(words) < 0.75:
+                kept.append(activity)
+        data["activities"] = kept
+    return data
+
+
+def _project(model: BaseModel, fields: list[str]) -> dict:
+    return model.model_dump(mode="json", include=set(fields))
+
+
+def student_payload(student: Student, task: str) -> str:
+    data = _project(student, STUDENT_FIELDS[task] + ["year"])
+    return compact_json(_dedupe_student(data))
+
+
+def scholarship_payload(scholarship: Scholarship, task: str) -> str:
+    return compact_json(_project(scholarship, SCHOLARSHIP_FIELDS[task]))
+
+
+def analysis_payload(analysis: ScholarshipAnalysis, task: str) -> str:
+    return compact_json(_project(analysis, ANALYSIS_FIELDS[task]))
+
+
+def match_payload(match: StudentScholarshipMatch, task: str) -> str:
+    return compact_json(_project(match, MATCH_FIELDS[task]))
+
+
+# --- REPORT ---
+
+def estimate_tokens(text: str) -> int:
+    # Rough heuristic for JSON-heavy English text; use --exact for real counts
+    return max(1, len(text) // 4)
+
+
+if __name__ == "__main__":
+    import argparse
+    from catalog import open_catalog
+
+    parser = argparse.ArgumentParser(description="Compare full vs compact prompt payload sizes for the bundled dataset.")
+    parser.add_argument("--exact", action="store_true", help="Count tokens with the Anthropic count_tokens endpoint")
+    args = parser.parse_args()
+
+    count = estimate_tokens
+    if args.exact:
+        from model_registry import model_registry
+        from routing import model_for
+
+        client = model_registry.client()
+
+        def count(text: str) -> int:
+            return client.messages.count_tokens(model=model_for("match"), messages=[{"role": "user", "content": text}]).input_tokens
+
+    catalog = open_catalog()
+    print(f"{'student':<10} {'task':<16} {'old':>7} {'new':>7} {'saved':>7}")
+    totals = {}
+    for student in catalog.students.values():
+        old = count(student.model_dump_json())
+        for task in STUDENT_FIELDS:
+            new = count(student_payload(student, task))
+            print(f"{student.id:<10} {task:<16} {old:>7} {new:>7} {1 - new / old:>7.1%}")
+            t = totals.setdefault(task, [0, 0])
+            t[0] += old
+            t[1] += new
+    print()
+    print(f"{'scholarship':<12} {'task':<14} {'old':>7} {'new':>7} {'saved':>7}")
+    for scholarship in catalog.all_scholarships():
+        old = count(scholarship.model_dump_json())
+        for task in SCHOLARSHIP_FIELDS:
+            new = count(scholarship_payload(scholarship, task))
+            print(f"{scholarship.id:<12} {task:<14} {old:>7} {new:>7} {1 - new / old:>7.1%}")
+            t = totals.setdefault(f"scholarship {task}", [0, 0])
+            t[0] += old
+            t[1] += new
+    print()
+    for task, (old, new) in totals.items():
+        print(f"{'TOTAL':<10} {task:<26} {old:>7} {new:>7} {1 - new / old:>7.1%}")
@@ -0,0 +1,81 @@
+# Per-task model routing, plus an optional small -> large cascade for match scoring.
+#
+#   MODEL_ANALYSIS, MODEL_MATCH, MODEL_GENERAL_ESSAY, MODEL_SPECIFIC_ESSAY, MODEL_AGENT   model per task (default DEFAULT_MODEL)
+#   MATCH_CASCADE_MODEL   screening model for matches; empty (default) disables the cascade
+#   MATCH_CASCADE_BAND    "lo,hi": screening scores in this inclusive range are re-scored by MODEL_MATCH (default 40,70)
+#   MATCH_CASCADE_AUDIT   fraction of confident screening scores also re-scored, to measure agreement (default 0)
+
+import os
+import random
+from typing import Optional
+
+from metrics import CASCADE_COMPARED, CASCADE_ROUTED, CASCADE_SCORE_DELTA
+from model_registry import load_env
+
+
+DEFAULT_MODEL = "claude-sonnet-4-5"
+
+TASKS = ("analysis", "match", "general_essay", "specific_essay", "agent")
+
+# .env must be read before the routes are, whoever imports this first
+load_env()
+
+MODEL_ROUTES = {task: os.getenv(f"MODEL_{task.upper()}", DEFAULT_MODEL) for task in TASKS}
+
+# Escalated/audited pairs whose scores differ by at most this much count as agreeing
+AGREEMENT_TOLERANCE = 10
+
+
+def model_for(task: str) -> str:
+    return MODEL_ROUTES.get(task, DEFAULT_MODEL)
+
+
+class MatchCascade:
+    """
+    Scores a pair with `screen_model` first and only re-scores it with `strong_model` when the
+    screening score falls inside the uncertainty band (or the pair is picked for an audit).
+    """
+
+    def __init__(self, screen_model: str, strong_model: str, band: tuple[int, int] = (40, 70), audit_rate: float = 0.0):
+        self.screen_model = screen_model
+        self.strong_model = strong_model
+        self.band = band
+        self.audit_rate = audit_rate
+
+    @classmethod
+    def from_env(cls) -> Optional["MatchCascade"]:
+        screen_model = os.getenv("MATCH_CASCADE_MODEL", "")
+        if not screen_model:
+            return None
+        lo, hi = (int(x) for x in os.getenv("MATCH_CASCADE_BAND", "40,70").split(","))
+        return cls(screen_model, model_for("match"), (lo, hi), float(os.getenv("MATCH_CASCADE_AUDIT", "0")))
+
+    @property
+    def cache_model(self) -> str:
+        """Cache/fingerprint key for cascade results, so changing the setup never reuses old scores."""
+        return f"{self.screen_model}>{self.strong_model}@{self.band[0]}-{self.band[1]}"
+
+    def escalation(self, screen_score: Optional[int]) -> Optional[str]:
+        """
+        "escalated" / "audited" when the strong model should re-score, None to keep the screening score.
+        No score (a refused or unparseable screening answer) is "unparsed", which always escalates.
+        """
+        lo, hi = self.band
+        if screen_score is None:
+            outcome = "unparsed"
+        elif lo <= screen_score <= hi:
+            outcome = "escalated"
+        elif self.audit_rate and random.random() < self.audit_rate:
+            outcome = "audited"
+        else:
+            outcome = None
+        CASCADE_ROUTED.inc(outcome or "screened")
+        return outcome
+
+    def compare(self, outcome: str, screen_score: int, strong_score: int) -> None:
+        delta = abs(screen_score - strong_score)
+        CASCADE_COMPARED.inc(outcome, str(delta <= AGREEMENT_TOLERANCE).lower())
+        CASCADE_SCORE_DELTA.observe(outcome, value=delta)
+
+
+MATCH_CASCADE = MatchCascade.from_env()
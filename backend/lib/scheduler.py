@@ -0,0 +1,325 @@
+# Central scheduler for upstream model calls: token-bucket limits (RPM / input TPM / output TPM),
+# priority classes, jittered retries that honour retry-after, and load shedding with 429/503.
+#
+# Limits come from ANTHROPIC_RPM / ANTHROPIC_ITPM / ANTHROPIC_OTPM (0 = unlimited; defaults are
+# the tier-1 Sonnet limits). The scheduler owns retries, so the async client runs with max_retries=0.
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+import anthropic
+
+from metrics import MODEL_RETRIES, SCHEDULER_QUEUED, SCHEDULER_SHED, SCHEDULER_WAIT
+from model_registry import load_env
+
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+    ESSAY = 0        # interactive essay generation
+    MATCH = 1        # interactive analyze / match
+    BACKGROUND = 2   # bulk matching and precompute-style work
+
+
+class Backpressure(Exception):
+    """Raised instead of a generic failure when we are (or upstream is) out of capacity."""
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFull(Backpressure):
+    pass
+
+
+class UpstreamRateLimited(Backpressure):
+    status_code = 429
+
+
+class UpstreamOverloaded(Backpressure):
+    pass
+
+
+class TokenBucket:
+    """Continuous-refill bucket holding up to `per_minute` units. per_minute <= 0 means unlimited."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)."""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        # a single request bigger than the whole bucket only has to wait for a full bucket
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60 / self.capacity)
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float) -> None:
+        """Corrects an earlier estimate (negative amounts charge the difference)."""
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+
+def estimate_input_tokens(request: dict) -> int:
+    # ~4 chars per token over everything that is sent as prompt text
+    return max(1, len(json.dumps([request.get("system", ""), request.get("messages", [])])) // 4)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    for header, scale in (("retry-after-ms", 1000), ("retry-after", 1)):
+        value = response.headers.get(header)
+        if value:
+            try:
+                return float(value) / scale
+            except ValueError:
+                pass
+    return None
+
+
+def classify(error: Exception) -> Optional[str]:
+    """Retry reason for errors worth retrying, None otherwise."""
+    if isinstance(error, anthropic.RateLimitError):
+        return "rate_limited"
+    if isinstance(error, anthropic.APIStatusError) and (error.status_code == 529 or error.status_code >= 500):
+        return "overloaded"
+    if isinstance(error, (anthropic.APIConnectionError, anthropic.APITimeoutError)):
+        return "connection"
+    return None
+
+
+class Reservation:
+    def __init__(self, input_tokens: int, output_tokens: int):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+
+class ModelScheduler:
+    """
+    Callers reserve capacity before each upstream attempt. Waiters are served strictly by priority
+    (then arrival), so a backlog of background matches never delays an essay. Input/output token
+    reservations are estimates (prompt size, max_tokens) and are corrected from response.usage.
+    """
+
+    def __init__(
+        self,
+        rpm: float = 50,
+        itpm: float = 30_000,
+        otpm: float = 8_000,
+        max_queue: int = 256,
+        max_wait: dict[Priority, Optional[float]] = None,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.input_tokens = TokenBucket(itpm)
+        self.output_tokens = TokenBucket(otpm)
+        self.max_queue = max_queue
+        # seconds an interactive caller may queue before we shed it; background work waits indefinitely
+        self.max_wait = max_wait or {Priority.ESSAY: 30.0, Priority.MATCH: 30.0, Priority.BACKGROUND: None}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._queue: list[tuple[int, int, asyncio.Future, int, int]] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @classmethod
+    def from_env(cls) -> "ModelScheduler":
+        load_env()
+        return cls(
+            rpm=float(os.getenv("ANTHROPIC_RPM", "50")),
+            itpm=float(os.getenv("ANTHROPIC_ITPM", "30000")),
+            otpm=float(os.getenv("ANTHROPIC_OTPM", "8000")),
+            max_queue=int(os.getenv("MODEL_MAX_QUEUE", "256")),
+        )
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self._queue if not entry[2].done())
+
+    # --- admission ---
+
+    def check_admission(self, priority: Priority) -> None:
+        """Cheap up-front check so endpoints can answer 503 before they start a streaming response."""
+        if priority != Priority.BACKGROUND and len(self) >= self.max_queue:
+            SCHEDULER_SHED.inc(priority.name.lower(), "queue_full")
+            raise QueueFull("Model request queue is full, try again shortly", retry_after=self._estimated_drain())
+
+    def _estimated_drain(self) -> float:
+        if self.requests.unlimited:
+            return 1.0
+        return max(1.0, len(self) * 60 / self.requests.capacity)
+
+    async def acquire(self, priority: Priority, request: dict) -> Reservation:
+        self.check_admission(priority)
+        reservation = Reservation(estimate_input_tokens(request), request.get("max_tokens", 1024))
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), future, reservation.input_tokens, reservation.output_tokens))
+        label = priority.name.lower()
+        SCHEDULER_QUEUED.inc(label)
+        start = time.monotonic()
+        self._pump()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait.get(priority))
+        except asyncio.TimeoutError:
+            future.cancel()
+            SCHEDULER_SHED.inc(label, "wait_timeout")
+            raise QueueFull("Timed out waiting for model capacity", retry_after=self._estimated_drain())
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        finally:
+            SCHEDULER_QUEUED.dec(label)
+            SCHEDULER_WAIT.observe(label, value=time.monotonic() - start)
+            # a cancelled head-of-line waiter must not stall the ones behind it
+            self._pump()
+        return reservation
+
+    def settle(self, reservation: Reservation, usage: Any) -> None:
+        """Replaces the estimated token charge with what response.usage reports."""
+        if usage is None:
+            return
+        actual_input = (usage.input_tokens or 0) + (getattr(usage, "cache_creation_input_tokens", 0) or 0)
+        self.input_tokens.give_back(reservation.input_tokens - actual_input)
+        self.output_tokens.give_back(reservation.output_tokens - (usage.output_tokens or 0))
+        self._pump()
+
+    def release(self, reservation: Reservation) -> None:
+        """The attempt produced nothing billable (it failed): refund the token estimates."""
+        self.input_tokens.give_back(reservation.input_tokens)
+        self.output_tokens.give_back(reservation.output_tokens)
+        self._pump()
+
+    def _pump(self) -> None:
+        """Grants waiters in priority order while every bucket can afford the head of the queue."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            _, _, future, input_tokens, output_tokens = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            now = time.monotonic()
+            delay = max(
+                self._paused_until - now,
+                self.requests.wait_time(1, now),
+                self.input_tokens.wait_time(input_tokens, now),
+                self.output_tokens.wait_time(output_tokens, now),
+            )
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+                return
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.input_tokens.take(input_tokens)
+            self.output_tokens.take(output_tokens)
+            future.set_result(None)
+
+    # --- retries ---
+
+    def _backoff(self, attempt: int, error: Exception, reason: str) -> float:
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after + random.uniform(0, self.backoff_base))
+        if reason == "rate_limited":
+            # the limit is shared by every caller: pause all dispatch, not just this request
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    def _give_up(self, error: Exception, reason: str) -> Exception:
+        retry_after = retry_after_seconds(error) or self.backoff_cap
+        if reason == "rate_limited":
+            return UpstreamRateLimited("Upstream model rate limit reached, try again later", retry_after)
+        return UpstreamOverloaded(f"Upstream model unavailable ({reason})", retry_after)
+
+    async def submit(self, task: str, priority: Priority, request: dict, call: Callable[[], Awaitable[T]]) -> T:
+        """Runs `call` (one upstream request for `request`) under the limits, retrying transient failures."""
+        for attempt in itertools.count():
+            reservation = await self.acquire(priority, request)
+            try:
+                response = await call()
+            except Exception as e:
+                self.release(reservation)
+                reason = classify(e)
+                if reason is None:
+                    raise
+                if attempt >= self.max_retries:
+                    raise self._give_up(e, reason) from e
+                MODEL_RETRIES.inc(task, reason)
+                await asyncio.sleep(self._backoff(attempt, e, reason))
+                continue
+            self.settle(reservation, getattr(response, "usage", None))
+            return response
+
+    @asynccontextmanager
+    async def stream(self, task: str, priority: Priority, request: dict, open_stream: Callable[[], Any]) -> AsyncIterator[Any]:
+        """
+        Opens a streaming response under the limits. Failures while opening are retried like submit();
+        once text is flowing the stream is handed to the caller and never retried.
+        """
+        for attempt in itertools.count():
+            reservation = await self.acquire(priority, request)
+            manager = open_stream()
+            try:
+                stream = await manager.__aenter__()
+                break
+            except Exception as e:
+                self.release(reservation)
+                reason = classify(e)
+                if reason is None:
+                    raise
+                if attempt >= self.max_retries:
+                    raise self._give_up(e, reason) from e
+                MODEL_RETRIES.inc(task, reason)
+                await asyncio.sleep(self._backoff(attempt, e, reason))
+
+        try:
+            yield stream
+        except BaseException as e:
+            if not await manager.__aexit__(type(e), e, e.__traceback__):
+                raise
+        else:
+            await manager.__aexit__(None, None, None)
+        finally:
+            try:
+                usage = stream.current_message_snapshot.usage
+            except Exception:
+                usage = None  # nothing received yet: keep the estimated charge
+            self.settle(reservation, usage)
+
+
+# Shared by every async helper in the process
+scheduler = ModelScheduler.from_env()
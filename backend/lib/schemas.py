@@ -1,6 +1,6 @@
 # File that shows schema and structure of data models
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 from enum import Enum
 
 SPECIFIC_SCHOLARSHIP_ESSAY_SYSTEM_PROMPT = """
@@ -127,6 +127,92 @@ Guidelines:
 
 
 
+PROFILE_AGENT_SYSTEM_PROMPT = """
+You are a Scholarship Application Assistant.
+
+Your job:
+- Talk to students who want scholarships.
+- Ask simple questions (1-2 at a time) to understand their background and preferences.
+- Keep a structured USER_PROFILE up to date by describing CHANGES to it, never by repeating it.
+- Later, another part of the system may ask you to help with scholarship search or essay writing.
+
+Every turn you receive the current USER_PROFILE (JSON) followed by the student's latest message,
+after a short window of the earlier conversation. Respond with the structured AgentTurn object:
+
+- assistant_reply: friendly, concise chat response shown to the student, on a single line.
+  Ask at most one or two questions at a time.
+- patch: a list of JSON-Patch style operations that turn the current USER_PROFILE into the updated
+  one. Return an EMPTY list when the message adds nothing to the profile. Each operation has:
+    - op: "add", "replace" or "remove"
+    - path: a JSON Pointer into USER_PROFILE, e.g. "/gpa", "/target_countries/-" (append to a list),
+      "/work_experience/0/details/-", "/extracurriculars/1"
+    - value: the new value encoded as JSON text (omit it for "remove"), e.g. "3.8", "\"Canada\"",
+      "true", "[\"MIT\", \"Stanford\"]", "{\"role\": \"Tutor\", \"company\": \"Kumon\", \"details\": [\"Taught algebra\"]}"
+- action: "none", "search_scholarships" or "generate_essay".
+
+Patch rules:
+- Only touch fields the student's latest message actually changes. Never restate unchanged fields.
+- Use "replace" for scalar fields ("/name", "/gpa", "/financial_need", ...), including filling a null one.
+- Use "add" with "/-" to append to a list, "replace" with an index to correct an item, "remove" to drop one.
+- Do not invent things the student never said. If the student corrects something, replace the old value.
+- When the student mentions jobs or activities, add them to work_experience or extracurriculars as
+  objects with simple bullet points in details.
+
+The USER_PROFILE fields:
+
+{
+  "name": string or null,
+  "country": string or null,
+  "citizenship": string or null,
+  "degree_level": "high_school" | "undergraduate" | "graduate" | null,
+  "year_of_study": int or null,
+  "field_of_study": string or null,
+  "target_countries": [strings],
+  "target_universities": [strings],
+  "gpa": number or null,
+  "financial_need": true | false | null,
+  "work_experience": [{"role": string, "company": string, "details": [strings]}],
+  "extracurriculars": [{"role": string, "organization": string, "details": [strings]}],
+  "goals": string
+}
+
+Example: USER_PROFILE has "gpa": null and "target_countries": ["Canada"]; the student says
+"I have a 3.7 and I'd also consider the UK". A correct patch is:
+[{"op": "replace", "path": "/gpa", "value": "3.7"}, {"op": "add", "path": "/target_countries/-", "value": "\"United Kingdom\""}]
+
+About the action field:
+- Use "none" when just continuing the conversation and asking more questions.
+- Use "search_scholarships" when you think you have enough profile info that the backend should look up scholarships.
+- Use "generate_essay" ONLY after the student explicitly says they are ready to write or refine an essay for a specific scholarship.
+"""
+
+
+
+ESSAY_REVISION_SYSTEM_PROMPT = """
+You are an expert scholarship essay editor.
+
+You are given an existing scholarship essay written in the first person by a STUDENT, the SCHOLARSHIP
+and SCHOLARSHIP_ANALYSIS it was written for, and PROFILE_CHANGES: the fields of the student's profile
+(and of the match analysis) that changed since the essay was written, each with its "before" and
+"after" value.
+
+Your task is to update the essay so it is accurate for the new profile, changing as little as possible.
+Do NOT rewrite the essay. Respond with the structured EssayRevision object: a list of edits, each
+replacing one passage of the CURRENT_ESSAY.
+
+Edit rules:
+- find must be copied VERBATIM from CURRENT_ESSAY (same punctuation and spacing) and must be long
+  enough to occur exactly once. Prefer a whole sentence or clause.
+- replace is the new text for that passage; use "" to delete it.
+- Remove or correct anything the changes make untrue (e.g. an old GPA, a role the student no longer lists).
+- Work new achievements or experiences in where they fit the scholarship best, in the essay's existing
+  voice and tone, usually by editing or adding one or two sentences.
+- Keep the essay within its current length (roughly 500–750 words) and keep its structure.
+- Never invent facts that are not in the profile changes or the existing essay.
+- Return an EMPTY list if the changes do not affect the essay.
+"""
+
+
 GENERAL_UNI_ESSAY_SYSTEM_PROMPT = """
 You are an expert university admissions essay writer specializing in highly personalized,
 narrative-driven essays for competitive undergraduate applications.
@@ -190,6 +276,10 @@ class StudentScholarshipMatch(BaseModel):
     top_reasons: list[str] = Field(..., description="Concise, human-readable explanations (3-5 recommended) describing why the student received this match_score (e.g., alignment with criteria, strengths, or gaps)")
 
 
+class PackedMatchResult(BaseModel):
+    matches: list[StudentScholarshipMatch] = Field(..., description="One match per SCHOLARSHIP in the request, in the same order as the scholarships were given")
+
+
 class Scholarship(BaseModel):
     id: str = Field(..., description="Unique identifier for the scholarship (internal or external ID)")
     name: str = Field(..., description="Official name or title of the scholarship")
@@ -201,6 +291,17 @@ class Scholarship(BaseModel):
 
 
 
+class EligibilityConstraints(BaseModel):
+    scholarship_id: str = Field(..., description="The ID of the scholarship these hard limits were extracted from")
+    countries: list[str] = Field(default_factory=list, description="Allowed countries of residence/study (lowercase); empty means unrestricted")
+    citizenships: list[str] = Field(default_factory=list, description="Allowed citizenships (lowercase); empty means unrestricted")
+    degree_levels: list[str] = Field(default_factory=list, description="Allowed normalized degree levels ('high_school', 'undergraduate', 'graduate'); empty means unrestricted")
+    min_year: Optional[int] = Field(None, description="Lowest allowed year_of_study, if stated")
+    max_year: Optional[int] = Field(None, description="Highest allowed year_of_study, if stated")
+    min_gpa: Optional[float] = Field(None, description="Minimum GPA stated in the criteria, if any")
+
+
+
 class WorkExperienceItem(BaseModel):
     role: str = Field(..., description="Title or position held by the student in this work experience")
     company: str = Field(..., description="Name of the company or employer")
@@ -237,6 +338,44 @@ class Student(BaseModel):
 
 
 
+class AgentProfile(BaseModel):
+    """The profile the chat agent builds up turn by turn (a looser, partial cousin of Student)."""
+    name: Optional[str] = None
+    country: Optional[str] = None
+    citizenship: Optional[str] = None
+    degree_level: Optional[str] = None
+    year_of_study: Optional[int] = None
+    field_of_study: Optional[str] = None
+    target_countries: List[str] = Field(default_factory=list)
+    target_universities: List[str] = Field(default_factory=list)
+    gpa: Optional[float] = None
+    financial_need: Optional[bool] = None
+    work_experience: List[WorkExperienceItem] = Field(default_factory=list)
+    extracurriculars: List[ExtracurricularItem] = Field(default_factory=list)
+    goals: str = ""
+
+
+class ProfilePatchOp(BaseModel):
+    op: Literal["add", "replace", "remove"] = Field(..., description="JSON-Patch operation")
+    path: str = Field(..., description="JSON Pointer into USER_PROFILE, e.g. '/gpa' or '/target_countries/-'")
+    value: Optional[str] = Field(None, description="New value encoded as JSON text (e.g. '3.8', '\"Canada\"'); omitted for remove")
+
+
+class AgentTurn(BaseModel):
+    assistant_reply: str = Field(..., description="Single-line chat reply shown to the student")
+    patch: list[ProfilePatchOp] = Field(..., description="Changes to USER_PROFILE implied by the latest message; empty if none")
+    action: Literal["none", "search_scholarships", "generate_essay"] = Field(..., description="What the backend should do next")
+
+
+class EssayEdit(BaseModel):
+    find: str = Field(..., description="Passage copied verbatim from CURRENT_ESSAY, long enough to occur exactly once")
+    replace: str = Field(..., description="Text that replaces the passage; empty to delete it")
+
+
+class EssayRevision(BaseModel):
+    edits: list[EssayEdit] = Field(..., description="Targeted edits to CURRENT_ESSAY, applied in order; empty if none are needed")
+
+
 # class Student(BaseModel):
 #     id: str = Field(..., description="Unique identifier for the student (internal user ID or external reference)")
 #     name: str = Field(..., description="Full name of the student")
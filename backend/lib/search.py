@@ -0,0 +1,197 @@
+# BM25 full-text search over the scholarship catalog (name, description, criteria_text, tags).
+#
+# Inverted index kept in plain dicts so documents can be added/removed incrementally; each term's
+# postings are turned into numpy arrays lazily (and cached until the term changes), so a query is a
+# handful of vectorized ops even when a common term matches most of a 100k-document catalog.
+#
+# Run `python search.py` (from backend/lib) for a build/query timing report on a synthetic 100k catalog.
+
+import math
+import re
+from collections import Counter
+from typing import Iterable, Optional
+
+import numpy as np
+
+from schemas import Scholarship
+
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "who must their they be been any all can may our your".split()
+)
+
+# Field weights (BM25F-style: term frequencies are scaled before saturation)
+FIELD_WEIGHTS = {"name": 3.0, "tags": 2.0, "description": 1.0, "criteria_text": 1.0}
+
+
+def normalize(token: str) -> str:
+    # Very light stemming so "scholarships" finds "scholarship"
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    return [normalize(t) for t in TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def document_terms(scholarship: Scholarship) -> Counter:
+    terms: Counter = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        value = getattr(scholarship, field)
+        text = " ".join(value) if isinstance(value, list) else value
+        for term in tokenize(text):
+            terms[term] += weight
+    return terms
+
+
+class SearchIndex:
+    """BM25 index keyed by scholarship id. add() replaces an existing document with the same id."""
+
+    def __init__(self, scholarships: Iterable[Scholarship] = (), k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._slot: dict[str, int] = {}            # scholarship id -> row
+        self._ids: list[Optional[str]] = []        # row -> scholarship id (None once removed)
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._doc_terms: list[Optional[Counter]] = []
+        self._postings: dict[str, dict[int, float]] = {}
+        self._arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._total_length = 0.0
+        self._free: list[int] = []
+        for scholarship in scholarships:
+            self.add(scholarship)
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    # --- updates ---
+
+    def add(self, scholarship: Scholarship) -> None:
+        self.remove(scholarship.id)
+        terms = document_terms(scholarship)
+        row = self._free.pop() if self._free else len(self._ids)
+        if row == len(self._ids):
+            self._ids.append(None)
+            self._doc_terms.append(None)
+            if row >= len(self._lengths):
+                self._lengths = np.resize(self._lengths, max(16, 2 * len(self._lengths)))
+        self._slot[scholarship.id] = row
+        self._ids[row] = scholarship.id
+        self._doc_terms[row] = terms
+        length = sum(terms.values())
+        self._lengths[row] = length
+        self._total_length += length
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[row] = tf
+            self._arrays.pop(term, None)
+
+    def remove(self, scholarship_id: str) -> bool:
+        row = self._slot.pop(scholarship_id, None)
+        if row is None:
+            return False
+        for term in self._doc_terms[row]:
+            postings = self._postings[term]
+            del postings[row]
+            if not postings:
+                del self._postings[term]
+            self._arrays.pop(term, None)
+        self._total_length -= float(self._lengths[row])
+        self._lengths[row] = 0
+        self._ids[row] = None
+        self._doc_terms[row] = None
+        self._free.append(row)
+        return True
+
+    # --- queries ---
+
+    def _term_arrays(self, term: str) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return None
+            rows = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            tfs = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            arrays = self._arrays[term] = (rows, tfs)
+        return arrays
+
+    def search(self, query: str, limit: int = 20, allowed: Optional[set[str]] = None) -> list[tuple[str, float]]:
+        """Top `limit` (scholarship id, score) pairs, best first. `allowed` restricts results to those ids."""
+        n = len(self._slot)
+        if n == 0:
+            return []
+        avgdl = self._total_length / n
+        scores = np.zeros(len(self._ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            arrays = self._term_arrays(term)
+            if arrays is None:
+                continue
+            rows, tfs = arrays
+            idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[rows] / avgdl)
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        if allowed is not None:
+            mask = np.zeros(len(self._ids), dtype=bool)
+            mask[[self._slot[sid] for sid in allowed if sid in self._slot]] = True
+            scores[~mask] = 0
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > limit:
+            hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self._ids[row], float(scores[row])) for row in hits]
+
+
+# --- REPORT ---
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import time
+    from catalog import Catalog
+
+    parser = argparse.ArgumentParser(description="Time index build and queries on a synthetic catalog.")
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    # Synthetic documents: bundled scholarships with shuffled words and a few random rare terms each
+    base = Catalog().all_scholarships()
+    words = [w for s in base for w in f"{s.name} {s.description} {s.criteria_text}".split()]
+    rng = random.Random(0)
+    docs = []
+    for i in range(args.docs):
+        template = base[i % len(base)]
+        desc = rng.sample(words, 40) + [f"term{rng.randrange(args.docs)}" for _ in range(3)]
+        docs.append(template.model_copy(update={"id": f"syn_{i:06d}", "description": " ".join(desc)}))
+
+    start = time.perf_counter()
+    index = SearchIndex(docs)
+    print(f"build: {len(index)} docs, {len(index._postings)} terms in {time.perf_counter() - start:.2f}s")
+
+    queries = ["stem research", "community service leadership", "first generation financial need", "engineering", "women in computer science"]
+    for q in queries:
+        index.search(q)  # warm the per-term arrays
+    timings = []
+    for i in range(args.queries):
+        q = queries[i % len(queries)]
+        start = time.perf_counter()
+        index.search(q, limit=20)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"query: p50 {timings[len(timings) // 2]:.2f} ms, p99 {timings[int(len(timings) * 0.99) - 1]:.2f} ms (warm)")
+
+    start = time.perf_counter()
+    index.add(docs[0].model_copy(update={"id": "syn_new", "name": "Brand New Robotics Award"}))
+    index.remove("syn_000001")
+    update_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    index.search("robotics research")
+    print(f"add+remove: {update_ms:.2f} ms, first query after update: {(time.perf_counter() - start) * 1000:.2f} ms")
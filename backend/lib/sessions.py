@@ -0,0 +1,184 @@
+# Server-side chat sessions for the profile-building agent.
+#
+# Each session keeps its AgentProfile and message log in SQLite. The model never echoes the profile
+# back: it returns JSON-Patch style operations, which are applied (and validated) here. A turn's cost
+# therefore no longer grows with the profile or the length of the conversation.
+#
+#   AGENT_SESSION_PATH   session database (default backend/data/sessions.sqlite3)
+#   AGENT_HISTORY_TURNS  earlier messages sent with each turn (default 8)
+
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable, Optional
+
+from pydantic import ValidationError
+
+from cache import connect
+from schemas import AgentProfile, ProfilePatchOp
+
+
+DEFAULT_SESSION_PATH = Path(
+    os.getenv("AGENT_SESSION_PATH", Path(__file__).resolve().parent.parent / "data" / "sessions.sqlite3")
+)
+
+HISTORY_TURNS = int(os.getenv("AGENT_HISTORY_TURNS", "8"))
+
+
+# --- PROFILE PATCHES ---
+
+def _pointer(path: str) -> list[str]:
+    if not path.startswith("/"):
+        raise ValueError(f"path must start with '/': {path!r}")
+    return [part.replace("~1", "/").replace("~0", "~") for part in path[1:].split("/")]
+
+
+def _index(container: list, token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit():
+        raise ValueError(f"bad list index {token!r}")
+    index = int(token)
+    if index > len(container) - (0 if allow_end else 1):
+        raise ValueError(f"list index {index} out of range")
+    return index
+
+
+def _apply(document: dict, op: ProfilePatchOp) -> None:
+    parts = _pointer(op.path)
+    if parts[0] not in AgentProfile.model_fields:
+        raise ValueError(f"unknown profile field {parts[0]!r}")
+    if op.op != "remove" and op.value is None:
+        raise ValueError(f"{op.op} needs a value")
+    value = json.loads(op.value) if op.op != "remove" else None
+
+    parent = document
+    for token in parts[:-1]:
+        parent = parent[_index(parent, token, False)] if isinstance(parent, list) else parent[token]
+    last = parts[-1]
+
+    if isinstance(parent, list):
+        index = _index(parent, last, op.op == "add")
+        if op.op == "add":
+            parent.insert(index, value)
+        elif op.op == "replace":
+            parent[index] = value
+        else:
+            del parent[index]
+    elif parent is document and op.op == "remove":
+        # top-level fields always exist; removing one resets it
+        document[last] = AgentProfile.model_fields[last].get_default(call_default_factory=True)
+    else:
+        if op.op == "remove":
+            del parent[last]
+        elif op.op == "replace" and last not in parent:
+            raise ValueError(f"cannot replace missing key {last!r}")
+        else:
+            parent[last] = value
+
+
+def apply_profile_patch(profile: AgentProfile, patch: Iterable[ProfilePatchOp]) -> tuple[AgentProfile, list[dict]]:
+    """
+    Applies the operations in order. An operation that fails to apply, or that would leave the profile
+    invalid, is skipped (and reported) without affecting the others.
+    """
+    document = profile.model_dump()
+    rejected = []
+    for op in patch:
+        candidate = copy.deepcopy(document)
+        try:
+            _apply(candidate, op)
+            AgentProfile.model_validate(candidate)
+        except ValidationError as e:
+            first = e.errors()[0]
+            rejected.append({**op.model_dump(), "error": f"{'.'.join(str(part) for part in first['loc'])}: {first['msg']}"})
+            continue
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            rejected.append({**op.model_dump(), "error": str(e)})
+            continue
+        document = candidate
+    return AgentProfile.model_validate(document), rejected
+
+
+# --- SESSION STORE ---
+
+class SessionStore:
+    """Profiles and message logs per session id, safe to share between threads."""
+
+    def __init__(self, path: Path = DEFAULT_SESSION_PATH):
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS agent_sessions (
+                id TEXT PRIMARY KEY,
+                profile TEXT NOT NULL,
+                turns INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS agent_messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def create(self, profile: Optional[AgentProfile] = None) -> str:
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO agent_sessions (id, profile, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (session_id, (profile or AgentProfile()).model_dump_json(), now, now),
+            )
+        return session_id
+
+    def profile(self, session_id: str) -> Optional[AgentProfile]:
+        with self._lock:
+            row = self._conn.execute("SELECT profile FROM agent_sessions WHERE id = ?", (session_id,)).fetchone()
+        return AgentProfile.model_validate_json(row[0]) if row else None
+
+    def history(self, session_id: str, limit: Optional[int] = HISTORY_TURNS) -> list[dict]:
+        """The last `limit` messages (all of them for None), oldest first, as {"role", "content"} dicts."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content FROM agent_messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (session_id, -1 if limit is None else limit),
+            ).fetchall()
+        messages = [{"role": role, "content": content} for role, content in reversed(rows)]
+        # the window must open with a user message (an odd limit would start on a reply)
+        return messages[1:] if messages and messages[0]["role"] == "assistant" else messages
+
+    def record_turn(self, session_id: str, user_message: str, reply: str, profile: AgentProfile) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM agent_messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT INTO agent_messages (session_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(session_id, seq + 1, "user", user_message, now), (session_id, seq + 2, "assistant", reply, now)],
+            )
+            self._conn.execute(
+                "UPDATE agent_sessions SET profile = ?, turns = turns + 1, updated_at = ? WHERE id = ?",
+                (profile.model_dump_json(), now, session_id),
+            )
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM agent_messages WHERE session_id = ?", (session_id,))
+            return self._conn.execute("DELETE FROM agent_sessions WHERE id = ?", (session_id,)).rowcount > 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
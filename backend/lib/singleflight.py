@@ -0,0 +1,36 @@
+# Single-flight: concurrent callers with the same key share one in-flight upstream call
+
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    The first caller for a key starts the work as its own task; later callers with the same key
+    await that task instead of starting another. The key is released as soon as the task finishes,
+    so results and errors are shared only with callers that were already waiting (nothing is cached).
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._release(key, t))
+        # shield: one caller disconnecting must not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+    def _release(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved; waiters already got it re-raised
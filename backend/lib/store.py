@@ -0,0 +1,584 @@
+# On-disk scholarship / student store: one SQLite row per record, holding the record's JSON bytes.
+#
+# Nothing is parsed at startup. Pydantic models are built on access only (model_validate_json on the
+# stored bytes), by id or one page at a time, with a small LRU in front. Tags and deadlines are
+# indexed columns, and full-text search uses an FTS5 table weighted like search.FIELD_WEIGHTS, so a
+# catalog of a million scholarships costs a file handle rather than gigabytes of objects. The hard
+# eligibility limits (eligibility.extract_constraints) are extracted on write and kept as a column,
+# so the eligibility index is built without parsing any record.
+#
+#   SCHOLARSHIP_STORE_PATH   store file; when it exists, open_catalog() serves from it instead of the JSON files
+#
+#   python store.py migrate               # backend/data/*.json -> the store (upsert, safe to re-run)
+#   python store.py bench --records 1000000   # startup / memory vs json.load at scale
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Callable, Generic, Iterable, Iterator, Optional, TypeVar, Union
+
+from pydantic import BaseModel
+
+from cache import LRU, connect, fingerprint
+from eligibility import extract_constraints
+from schemas import EligibilityConstraints, Scholarship, Student
+from search import FIELD_WEIGHTS, tokenize
+
+
+DEFAULT_STORE_PATH = Path(
+    os.getenv("SCHOLARSHIP_STORE_PATH", Path(__file__).resolve().parent.parent / "data" / "catalog.sqlite3")
+)
+
+PAGE_SIZE = 1000
+
+M = TypeVar("M", bound=BaseModel)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scholarships (
+    id TEXT PRIMARY KEY,
+    deadline TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    constraints TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scholarships_deadline ON scholarships (deadline, id);
+CREATE TABLE IF NOT EXISTS scholarship_tags (
+    tag TEXT NOT NULL,
+    scholarship_id TEXT NOT NULL,
+    PRIMARY KEY (tag, scholarship_id)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS scholarship_fts USING fts5 (
+    name, tags, description, criteria_text, tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS students (
+    id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analysis_queue (
+    scholarship_id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    queued_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class LazyTable(Mapping, Generic[M]):
+    """
+    Read-only dict-like view of one table (id -> model). Lookups parse a single row; iteration
+    walks the primary key in pages, so values() never holds more than one page of raw rows.
+    """
+
+    def __init__(self, store: "ScholarshipStore", table: str, model: type[M], memory_items: int = 4096):
+        self._store = store
+        self._table = table
+        self._model = model
+        self._memory = LRU(memory_items)
+
+    def raw(self, record_id: str) -> Optional[bytes]:
+        row = self._store._query(f"SELECT payload FROM {self._table} WHERE id = ?", (record_id,))
+        return row[0][0] if row else None
+
+    def get(self, record_id: str, default=None) -> Optional[M]:
+        with self._store._lock:
+            hit = self._memory.get(record_id)
+        if hit is not None:
+            return hit
+        payload = self.raw(record_id)
+        if payload is None:
+            return default
+        model = self._model.model_validate_json(payload)
+        with self._store._lock:
+            self._memory.put(record_id, model)
+        return model
+
+    def __getitem__(self, record_id: str) -> M:
+        model = self.get(record_id)
+        if model is None:
+            raise KeyError(record_id)
+        return model
+
+    def __contains__(self, record_id) -> bool:
+        return bool(self._store._query(f"SELECT 1 FROM {self._table} WHERE id = ?", (record_id,)))
+
+    def __len__(self) -> int:
+        return self._store._query(f"SELECT COUNT(*) FROM {self._table}")[0][0]
+
+    def __iter__(self) -> Iterator[str]:
+        for page in self._pages("id"):
+            yield from (row[0] for row in page)
+
+    def values(self) -> Iterator[M]:
+        for page in self._pages("id, payload"):
+            yield from (self._model.model_validate_json(payload) for _, payload in page)
+
+    def items(self) -> Iterator[tuple[str, M]]:
+        for model in self.values():
+            yield model.id, model
+
+    def _pages(self, columns: str, page_size: int = PAGE_SIZE) -> Iterator[list[tuple]]:
+        after = ""
+        while True:
+            page = self._store._query(
+                f"SELECT {columns} FROM {self._table} WHERE id > ? ORDER BY id LIMIT ?", (after, page_size)
+            )
+            if not page:
+                return
+            yield page
+            after = page[-1][0]
+
+    def forget(self, record_id: Optional[str] = None) -> None:
+        with self._store._lock:
+            if record_id is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(record_id)
+
+
+class ScholarshipStore:
+    """Row-per-record SQLite store for scholarships and students, with indexed tags/deadlines and FTS."""
+
+    def __init__(self, path: Path = DEFAULT_STORE_PATH):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._conn = connect(self.path)
+        self._conn.executescript(SCHEMA)
+        # stores created before the constraints column get it here; old rows are filled in by iter_constraints()
+        if "constraints" not in {row[1] for row in self._conn.execute("PRAGMA table_info(scholarships)")}:
+            self._conn.execute("ALTER TABLE scholarships ADD COLUMN constraints TEXT")
+        self._conn.commit()
+        self.scholarships: LazyTable[Scholarship] = LazyTable(self, "scholarships", Scholarship)
+        self.students: LazyTable[Student] = LazyTable(self, "students", Student, memory_items=1024)
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @property
+    def version(self) -> str:
+        row = self._query("SELECT value FROM meta WHERE key = 'version'")
+        return row[0][0] if row else ""
+
+    def _bump_version(self, *parts: str) -> None:
+        version = hashlib.sha256("\x00".join((self.version,) + parts).encode()).hexdigest()[:16]
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+
+    # --- writes ---
+
+    def _put_scholarship(self, scholarship: Scholarship, content_hash: Optional[str] = None) -> str:
+        content_hash = content_hash or fingerprint(scholarship)
+        row = self._conn.execute(
+            "SELECT rowid, content_hash FROM scholarships WHERE id = ?", (scholarship.id,)
+        ).fetchone()
+        if row is not None and row[1] == content_hash:
+            return "unchanged"
+        if row is not None:
+            self._unindex(scholarship.id, row[0])
+
+        rowid = self._conn.execute(
+            """
+            INSERT INTO scholarships (id, deadline, content_hash, payload, constraints) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET deadline = excluded.deadline, content_hash = excluded.content_hash,
+                payload = excluded.payload, constraints = excluded.constraints
+            RETURNING rowid
+            """,
+            (
+                scholarship.id, scholarship.deadline, content_hash, scholarship.model_dump_json().encode(),
+                extract_constraints(scholarship).model_dump_json(),
+            ),
+        ).fetchone()[0]
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO scholarship_tags (tag, scholarship_id) VALUES (?, ?)",
+            [(tag.lower(), scholarship.id) for tag in scholarship.tags],
+        )
+        self._conn.execute(
+            "INSERT INTO scholarship_fts (rowid, name, tags, description, criteria_text) VALUES (?, ?, ?, ?, ?)",
+            (rowid, scholarship.name, " ".join(scholarship.tags), scholarship.description, scholarship.criteria_text),
+        )
+        self._bump_version("put", scholarship.id, content_hash)
+        self.scholarships.forget(scholarship.id)
+        return "updated" if row is not None else "inserted"
+
+    def _unindex(self, scholarship_id: str, rowid: int) -> None:
+        self._conn.execute("DELETE FROM scholarship_tags WHERE scholarship_id = ?", (scholarship_id,))
+        self._conn.execute("DELETE FROM scholarship_fts WHERE rowid = ?", (rowid,))
+
+    def _put_student(self, student: Student) -> str:
+        content_hash = fingerprint(student)
+        row = self._conn.execute("SELECT content_hash FROM students WHERE id = ?", (student.id,)).fetchone()
+        if row is not None and row[0] == content_hash:
+            return "unchanged"
+        self._conn.execute(
+            "INSERT OR REPLACE INTO students (id, content_hash, payload) VALUES (?, ?, ?)",
+            (student.id, content_hash, student.model_dump_json().encode()),
+        )
+        self._bump_version("student", student.id, content_hash)
+        self.students.forget(student.id)
+        return "updated" if row is not None else "inserted"
+
+    def upsert_scholarships(
+        self,
+        scholarships: Iterable[Scholarship],
+        content_hashes: Optional[Iterable[str]] = None,
+        queue_analysis: bool = False,
+    ) -> list[str]:
+        """
+        Writes the records in one transaction and returns "inserted" / "updated" / "unchanged" for each,
+        in order. `content_hashes` (fingerprint of each record) skips re-hashing records hashed elsewhere;
+        with `queue_analysis`, inserted and updated records are added to the analysis queue.
+        """
+        scholarships = list(scholarships)
+        hashes = list(content_hashes) if content_hashes is not None else [None] * len(scholarships)
+        with self._lock, self._conn:
+            outcomes = [self._put_scholarship(s, h) for s, h in zip(scholarships, hashes)]
+            if queue_analysis:
+                now = time.time()
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO analysis_queue (scholarship_id, content_hash, queued_at) "
+                    "SELECT id, content_hash, ? FROM scholarships WHERE id = ?",
+                    [(now, s.id) for s, outcome in zip(scholarships, outcomes) if outcome != "unchanged"],
+                )
+        return outcomes
+
+    def upsert_students(self, students: Iterable[Student]) -> list[str]:
+        with self._lock, self._conn:
+            return [self._put_student(s) for s in students]
+
+    def delete_scholarship(self, scholarship_id: str) -> bool:
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT rowid FROM scholarships WHERE id = ?", (scholarship_id,)).fetchone()
+            if row is None:
+                return False
+            self._unindex(scholarship_id, row[0])
+            self._conn.execute("DELETE FROM scholarships WHERE id = ?", (scholarship_id,))
+            self._conn.execute("DELETE FROM analysis_queue WHERE scholarship_id = ?", (scholarship_id,))
+            self._bump_version("delete", scholarship_id)
+        self.scholarships.forget(scholarship_id)
+        return True
+
+    # --- analysis queue ---
+
+    def pending_analysis(self, limit: int = 16) -> list[tuple[str, str]]:
+        """Oldest queued (scholarship id, content hash) pairs, fewest failed attempts first."""
+        return self._query(
+            "SELECT scholarship_id, content_hash FROM analysis_queue ORDER BY attempts, queued_at LIMIT ?", (limit,)
+        )
+
+    def finish_analysis(self, scholarship_id: str, content_hash: str) -> None:
+        # a record changed again since it was queued keeps its (newer) queue entry
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM analysis_queue WHERE scholarship_id = ? AND content_hash = ?", (scholarship_id, content_hash)
+            )
+
+    def fail_analysis(self, scholarship_id: str, max_attempts: int = 3) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE analysis_queue SET attempts = attempts + 1 WHERE scholarship_id = ?", (scholarship_id,))
+            self._conn.execute(
+                "DELETE FROM analysis_queue WHERE scholarship_id = ? AND attempts >= ?", (scholarship_id, max_attempts)
+            )
+
+    def analysis_backlog(self) -> int:
+        return self._query("SELECT COUNT(*) FROM analysis_queue")[0][0]
+
+    # --- reads ---
+
+    def iter_constraints(self, page_size: int = PAGE_SIZE) -> Iterator[EligibilityConstraints]:
+        """Stored hard limits of every scholarship, a page at a time; rows written before the column existed are backfilled."""
+        after = ""
+        while True:
+            page = self._query(
+                "SELECT id, constraints FROM scholarships WHERE id > ? ORDER BY id LIMIT ?", (after, page_size)
+            )
+            if not page:
+                return
+            missing = [sid for sid, stored in page if stored is None]
+            filled = {}
+            if missing:
+                for sid in missing:
+                    payload = self.scholarships.raw(sid)
+                    if payload is not None:
+                        filled[sid] = extract_constraints(Scholarship.model_validate_json(payload)).model_dump_json()
+                with self._lock, self._conn:
+                    self._conn.executemany(
+                        "UPDATE scholarships SET constraints = ? WHERE id = ? AND constraints IS NULL",
+                        [(stored, sid) for sid, stored in filled.items()],
+                    )
+            for sid, stored in page:
+                stored = stored or filled.get(sid)
+                if stored is not None:
+                    yield EligibilityConstraints.model_validate_json(stored)
+            after = page[-1][0]
+
+    def query_scholarships(
+        self,
+        tags: Optional[Iterable[str]] = None,
+        deadline_after: Optional[str] = None,
+        deadline_before: Optional[str] = None,
+        after_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[list[Scholarship], Optional[str]]:
+        """Same contract as Catalog.query_scholarships; only the returned page is parsed."""
+        tags = [tag.lower() for tag in tags or []]
+        where, params = [], []
+        if tags:
+            # the (tag, scholarship_id) primary key is already in id order, so the first tag drives the scan
+            sql = "SELECT s.payload FROM scholarship_tags t JOIN scholarships s ON s.id = t.scholarship_id"
+            where.append("t.tag = ?")
+            params.append(tags[0])
+            order = "t.scholarship_id"
+        else:
+            sql = "SELECT s.payload FROM scholarships s"
+            order = "s.id"
+        for tag in tags[1:]:
+            where.append("EXISTS (SELECT 1 FROM scholarship_tags WHERE tag = ? AND scholarship_id = s.id)")
+            params.append(tag)
+        if deadline_after is not None:
+            where.append("s.deadline >= ?")
+            params.append(deadline_after)
+        if deadline_before is not None:
+            where.append("s.deadline <= ?")
+            params.append(deadline_before)
+        if after_id is not None:
+            where.append(f"{order} > ?")
+            params.append(after_id)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)  # one extra row tells us whether there is a next page
+
+        rows = self._query(sql, tuple(params))
+        more = limit is not None and len(rows) > limit
+        page = [Scholarship.model_validate_json(payload) for (payload,) in rows[:limit]]
+        return page, (page[-1].id if more and page else None)
+
+    def search_scholarships(self, query: str, tags: Optional[Iterable[str]] = None, limit: int = 20) -> list[tuple[Scholarship, float]]:
+        """BM25 over name/tags/description/criteria_text (FTS5), optionally restricted to tags (all must match)."""
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        weights = ", ".join(str(FIELD_WEIGHTS[field]) for field in ("name", "tags", "description", "criteria_text"))
+        sql = f"""
+            SELECT s.payload, -bm25(scholarship_fts, {weights}) AS score
+            FROM scholarship_fts JOIN scholarships s ON s.rowid = scholarship_fts.rowid
+            WHERE scholarship_fts MATCH ?
+        """
+        params: list = [" OR ".join(f'"{term}"' for term in terms)]
+        for tag in tags or []:
+            sql += " AND EXISTS (SELECT 1 FROM scholarship_tags WHERE tag = ? AND scholarship_id = s.id)"
+            params.append(tag.lower())
+        sql += " ORDER BY score DESC LIMIT ?"
+        params.append(limit)
+        return [(Scholarship.model_validate_json(payload), score) for payload, score in self._query(sql, tuple(params))]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class StoreCatalog:
+    """
+    Catalog backed by a ScholarshipStore: same lookups and filters as catalog.Catalog, but nothing is
+    loaded up front. refresh() notices writes from other processes through the stored version.
+    """
+
+    def __init__(self, store: Union[ScholarshipStore, Path, str] = DEFAULT_STORE_PATH):
+        self.store = store if isinstance(store, ScholarshipStore) else ScholarshipStore(Path(store))
+        self.scholarships = self.store.scholarships
+        self.students = self.store.students
+        self.version = self.store.version
+        self._listeners: list[Callable[["StoreCatalog"], None]] = []
+
+    def subscribe(self, callback: Callable[["StoreCatalog"], None]) -> None:
+        self._listeners.append(callback)
+
+    def refresh(self) -> bool:
+        version = self.store.version
+        if version == self.version:
+            return False
+        self.version = version
+        self.scholarships.forget()
+        self.students.forget()
+        for callback in self._listeners:
+            callback(self)
+        return True
+
+    def _wrote(self, version_before: str) -> None:
+        # Our own writes don't need a reload, but if someone else wrote first, leave the version stale
+        # so the next refresh() still notifies listeners
+        if version_before == self.version:
+            self.version = self.store.version
+
+    def add_scholarship(self, scholarship: Scholarship) -> None:
+        self.upsert_scholarships([scholarship])
+
+    def upsert_scholarships(self, scholarships: list[Scholarship], **options) -> list[str]:
+        """store.upsert_scholarships without triggering a reload; callers update derived indexes themselves."""
+        before = self.store.version
+        outcomes = self.store.upsert_scholarships(scholarships, **options)
+        self._wrote(before)
+        return outcomes
+
+    def remove_scholarship(self, scholarship_id: str) -> bool:
+        before = self.store.version
+        removed = self.store.delete_scholarship(scholarship_id)
+        self._wrote(before)
+        return removed
+
+    def get_scholarship(self, scholarship_id: str) -> Optional[Scholarship]:
+        return self.scholarships.get(scholarship_id)
+
+    def get_student(self, student_id: str) -> Optional[Student]:
+        return self.students.get(student_id)
+
+    def iter_scholarships(self) -> Iterator[Scholarship]:
+        return self.scholarships.values()
+
+    def iter_constraints(self) -> Iterator[EligibilityConstraints]:
+        return self.store.iter_constraints()
+
+    def all_scholarships(self) -> list[Scholarship]:
+        return list(self.scholarships.values())
+
+    def search_scholarships(self, query: str, tags: Optional[Iterable[str]] = None, limit: int = 20) -> list[tuple[Scholarship, float]]:
+        return self.store.search_scholarships(query, tags=tags, limit=limit)
+
+    def query_scholarships(self, **filters) -> tuple[list[Scholarship], Optional[str]]:
+        return self.store.query_scholarships(**filters)
+
+
+# --- MIGRATION ---
+
+def migrate(data_dir: Path, store: ScholarshipStore, batch_size: int = 10_000) -> dict[str, int]:
+    """Upserts backend/data/*.json into the store. Records are validated once, on the way in."""
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    def write(upsert, model, records: list) -> None:
+        for start in range(0, len(records), batch_size):
+            batch = [model.model_validate(d) for d in records[start:start + batch_size]]
+            for outcome in upsert(batch):
+                counts[outcome] += 1
+
+    write(store.upsert_scholarships, Scholarship, json.loads((Path(data_dir) / "scholarships.json").read_bytes()))
+    write(store.upsert_students, Student, json.loads((Path(data_dir) / "students.json").read_bytes()))
+    return counts
+
+
+# --- BENCHMARK ---
+
+def _probe(kind: str, path: str) -> dict:
+    """Runs in a fresh interpreter: cold start to first answer, then peak RSS."""
+    import resource
+    import time
+
+    start = time.perf_counter()
+    if kind == "json":
+        scholarships = {d["id"]: Scholarship(**d) for d in json.loads(Path(path).read_bytes())}
+        first = scholarships["syn_0000042"]
+        page = [scholarships[sid] for sid in sorted(scholarships)[:50]]
+    else:
+        catalog = StoreCatalog(path)
+        first = catalog.get_scholarship("syn_0000042")
+        page, _ = catalog.query_scholarships(limit=50)
+    ready = time.perf_counter() - start
+    assert first is not None and len(page) == 50
+
+    timings = {}
+    if kind == "store":
+        for label, call in (
+            ("get_ms", lambda i: catalog.get_scholarship(f"syn_{(i * 7919) % 1000:07d}")),
+            ("page_ms", lambda i: catalog.query_scholarships(after_id=f"syn_{i * 1000:07d}", limit=50)),
+            ("tag_page_ms", lambda i: catalog.query_scholarships(tags=["stem"], limit=50)),
+            ("search_ms", lambda i: catalog.search_scholarships("community service leadership", limit=20)),
+        ):
+            start = time.perf_counter()
+            for i in range(100):
+                call(i)
+            timings[label] = round((time.perf_counter() - start) * 10, 3)
+    return {"startup_s": round(ready, 3), "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024), **timings}
+
+
+def bench(records: int, workdir: Path, compare_json: bool) -> None:
+    import random
+    import subprocess
+    import sys
+    import time
+    from catalog import DATA_DIR
+
+    base = json.loads((DATA_DIR / "scholarships.json").read_bytes())
+    rng = random.Random(0)
+
+    def synthetic(i: int) -> dict:
+        d = dict(base[i % len(base)])
+        d["id"] = f"syn_{i:07d}"
+        d["name"] = f"{d['name']} #{i}"
+        d["amount"] = rng.randrange(500, 20_000)
+        return d
+
+    store_path = workdir / "bench_catalog.sqlite3"
+    store_path.unlink(missing_ok=True)
+    store = ScholarshipStore(store_path)
+    start = time.perf_counter()
+    for first in range(0, records, 10_000):
+        store.upsert_scholarships(Scholarship.model_validate(synthetic(i)) for i in range(first, min(first + 10_000, records)))
+    store._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    store.close()
+    print(f"store: wrote {records} records in {time.perf_counter() - start:.1f}s, {store_path.stat().st_size / 2**20:.0f} MB on disk")
+
+    def run(kind: str, path: Path) -> dict:
+        out = subprocess.run([sys.executable, __file__, "_probe", kind, str(path)], capture_output=True, text=True, check=True)
+        return json.loads(out.stdout)
+
+    print(f"store: {json.dumps(run('store', store_path))}")
+
+    if compare_json:
+        json_path = workdir / "bench_scholarships.json"
+        with open(json_path, "w") as f:
+            f.write("[")
+            for i in range(records):
+                f.write(("," if i else "") + json.dumps(synthetic(i)))
+            f.write("]")
+        print(f"json:  {json.dumps(run('json', json_path))} ({json_path.stat().st_size / 2**20:.0f} MB file)")
+        json_path.unlink()
+    store_path.unlink()
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import tempfile
+    from catalog import DATA_DIR
+
+    if len(sys.argv) == 4 and sys.argv[1] == "_probe":
+        print(json.dumps(_probe(sys.argv[2], sys.argv[3])))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Scholarship store tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    m = commands.add_parser("migrate", help="Copy backend/data/*.json into the store")
+    m.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    m.add_argument("--store", type=Path, default=DEFAULT_STORE_PATH)
+    b = commands.add_parser("bench", help="Startup time and peak memory at scale, store vs json.load")
+    b.add_argument("--records", type=int, default=1_000_000)
+    b.add_argument("--workdir", type=Path, default=Path(tempfile.gettempdir()))
+    b.add_argument("--no-json", action="store_true", help="Skip the json.load baseline (it needs several GB of RAM at 1M)")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        store = ScholarshipStore(args.store)
+        print(f"{args.store}: {migrate(args.data_dir, store)}")
+        print(f"{len(store.scholarships)} scholarships, {len(store.students)} students, version {store.version}")
+    else:
+        bench(args.records, args.workdir, not args.no_json)
@@ -0,0 +1,44 @@
+# Token usage accounting for every model call made through helpers.py, including prompt-cache reads/writes
+
+import logging
+import threading
+from collections import defaultdict
+
+
+logger = logging.getLogger("scholarship.usage")
+
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+
+class UsageTracker:
+    """Running per-task totals of response.usage, so prompt-cache savings can be checked under load."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: dict[str, dict[str, int]] = defaultdict(lambda: dict.fromkeys(("calls",) + USAGE_FIELDS, 0))
+
+    def record(self, task: str, usage) -> None:
+        if usage is None:
+            return
+        counts = {field: getattr(usage, field, None) or 0 for field in USAGE_FIELDS}
+        with self._lock:
+            totals = self._totals[task]
+            totals["calls"] += 1
+            for field, value in counts.items():
+                totals[field] += value
+        logger.info(
+            "%s usage: input=%d output=%d cache_write=%d cache_read=%d",
+            task, counts["input_tokens"], counts["output_tokens"],
+            counts["cache_creation_input_tokens"], counts["cache_read_input_tokens"],
+        )
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            report = {task: dict(totals) for task, totals in self._totals.items()}
+        for totals in report.values():
+            prompt = totals["input_tokens"] + totals["cache_creation_input_tokens"] + totals["cache_read_input_tokens"]
+            totals["cache_read_ratio"] = round(totals["cache_read_input_tokens"] / prompt, 4) if prompt else 0.0
+        return report
+
+
+usage_tracker = UsageTracker()
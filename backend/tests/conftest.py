@@ -0,0 +1,7 @@
+# backend/lib modules import each other flat (from schemas import ...), so put it on the path
+# the same way run_bench and the server do.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib"))
@@ -0,0 +1,131 @@
+import pytest
+
+from eligibility import EligibilityIndex, explain_ineligibility, extract_constraints, ineligible_match
+from schemas import EligibilityConstraints, Scholarship, Student
+
+
+def scholarship(criteria_text, id="s1"):
+    return Scholarship(
+        id=id, name="Test", amount=1000, deadline="2026-03-15",
+        description="", criteria_text=criteria_text, tags=[],
+    )
+
+
+def student(**overrides):
+    fields = dict(
+        id="st1", name="Test Student", country="Canada", citizenship="Canada",
+        degree_level="undergraduate", year_of_study=2, field_of_study="Engineering", gpa=3.5,
+        financial_need=False, major="Engineering", year="2", activities=[], achievements=[],
+        background="", stories=[], goals="",
+    )
+    fields.update(overrides)
+    return Student(**fields)
+
+
+def limits(criteria_text):
+    return extract_constraints(scholarship(criteria_text)).model_dump(exclude={"scholarship_id"}, exclude_defaults=True)
+
+
+# --- EXTRACTION ---
+
+@pytest.mark.parametrize("text,expected", [
+    ("Open to graduate students in engineering.", {"degree_levels": ["graduate"]}),
+    ("Must be enrolled in a master's or PhD program.", {"degree_levels": ["graduate"]}),
+    ("Students enrolled in Canada or the United States.", {"countries": ["canada", "united states"]}),
+    ("Must be a resident of Canada, Mexico or the United States.", {"countries": ["canada", "mexico", "united states"]}),
+    ("Canadian or American citizens only.", {"citizenships": ["canada", "united states"]}),
+    ("Must be citizens of Canada.", {"citizenships": ["canada"]}),
+    ("Open to undergraduate juniors and seniors.", {"degree_levels": ["undergraduate"], "min_year": 3, "max_year": 4}),
+    ("Undergraduates in their third year or above.", {"degree_levels": ["undergraduate"], "min_year": 3}),
+    ("Minimum GPA of 3.5 required.", {"min_gpa": 3.5}),
+])
+def test_extracts_stated_limits(text, expected):
+    assert limits(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    # "graduate" as a verb isn't a degree level
+    "Applicants must graduate by May 2026.",
+    "Students graduating in spring are eligible.",
+    "Open to students who graduated from a Texas high school.",
+    # lists that carry on past the places we know
+    "Open to residents of Canada or elsewhere.",
+    "Must be a resident of the U.S. and its territories.",
+    "Must be a resident of California.",
+    "Must be U.S. citizens or permanent residents.",
+    # year words that aren't year_of_study
+    "Open to high school juniors and seniors.",
+    "Open to senior citizens returning to school.",
+    "Transfer students from a junior college are welcome.",
+    # preferences aren't requirements
+    "Students with a 3.0 GPA or higher are preferred.",
+])
+def test_ambiguous_wording_leaves_limits_open(text):
+    assert limits(text) == {}
+
+
+def test_year_words_are_not_applied_across_degree_levels():
+    c = extract_constraints(scholarship("Open to undergraduate seniors, and graduate students pursuing a PhD."))
+    assert sorted(c.degree_levels) == ["graduate", "undergraduate"]
+    assert c.min_year is None and c.max_year is None
+    assert explain_ineligibility(student(degree_level="graduate", year_of_study=1), c) == []
+
+
+# --- SCREENING ---
+
+def test_explain_ineligibility_lists_every_failed_limit():
+    c = extract_constraints(scholarship("Must be citizens of Canada. Open to graduate students. Minimum GPA of 3.8."))
+    reasons = explain_ineligibility(student(citizenship="Mexico", gpa=3.0), c)
+    assert len(reasons) == 3
+    assert explain_ineligibility(student(degree_level="graduate", gpa=3.9), c) == []
+
+
+def test_ineligible_match_scores_zero_with_reasons():
+    match = ineligible_match(student(), "s1", ["GPA 3.5 is below the stated minimum of 3.8."])
+    assert match.match_score == 0
+    assert match.student_id == "st1" and match.scholarship_id == "s1"
+    assert match.top_reasons[1:] == ["GPA 3.5 is below the stated minimum of 3.8."]
+
+
+# --- INDEX ---
+
+INDEXED = [
+    EligibilityConstraints(scholarship_id="open"),
+    EligibilityConstraints(scholarship_id="min3", min_year=3),
+    EligibilityConstraints(scholarship_id="max2", max_year=2),
+    EligibilityConstraints(scholarship_id="y2to4", min_year=2, max_year=4),
+    EligibilityConstraints(scholarship_id="grad", degree_levels=["graduate"]),
+    EligibilityConstraints(scholarship_id="canada", countries=["canada"], citizenships=["canada"]),
+    EligibilityConstraints(scholarship_id="us", countries=["united states"]),
+    EligibilityConstraints(scholarship_id="gpa38", min_gpa=3.8),
+]
+
+
+@pytest.mark.parametrize("profile", [
+    student(),
+    student(year_of_study=0),
+    student(year_of_study=9),
+    student(year_of_study=12, degree_level="PhD"),
+    student(country="USA", citizenship="American", gpa=3.8),
+    student(degree_level="something else", country="Atlantis", citizenship="Atlantis"),
+])
+def test_index_candidates_agree_with_explain_ineligibility(profile):
+    index = EligibilityIndex(INDEXED)
+    expected = {c.scholarship_id for c in INDEXED if not explain_ineligibility(profile, c)}
+    assert index.candidates(profile) == expected
+
+
+def test_index_year_bounds_are_open_ended():
+    index = EligibilityIndex(INDEXED)
+    assert "min3" in index.candidates(student(year_of_study=9))
+    assert "max2" in index.candidates(student(year_of_study=0))
+    assert "y2to4" not in index.candidates(student(year_of_study=5))
+
+
+def test_index_add_replaces_and_remove_drops():
+    index = EligibilityIndex(INDEXED)
+    index.add(EligibilityConstraints(scholarship_id="gpa38", min_gpa=3.0))
+    assert "gpa38" in index.candidates(student())
+    index.remove("gpa38")
+    assert "gpa38" not in index.candidates(student(gpa=4.0))
+    assert index.reasons(student(), "gpa38") == []
@@ -0,0 +1,34 @@
+from essays import apply_essay_edits, profile_changes
+from schemas import EssayEdit
+
+
+ESSAY = "I grew up in Lagos. I love robotics. I want to build medical robots."
+
+
+def test_applies_edits_in_order():
+    essay, rejected = apply_essay_edits(ESSAY, [
+        EssayEdit(find="I love robotics.", replace="Robotics became my obsession."),
+        EssayEdit(find="my obsession", replace="my calling"),
+        EssayEdit(find=" I want to build medical robots.", replace=""),
+    ])
+    assert rejected == []
+    assert essay == "I grew up in Lagos. Robotics became my calling."
+
+
+def test_missing_ambiguous_and_empty_passages_are_skipped():
+    essay, rejected = apply_essay_edits(ESSAY, [
+        EssayEdit(find="I hate robotics.", replace="x"),
+        EssayEdit(find="I ", replace="x"),
+        EssayEdit(find="", replace="x"),
+        EssayEdit(find="Lagos", replace="Abuja"),
+    ])
+    assert [r["error"] for r in rejected] == ["passage not found", "passage occurs 3 times", "passage not found"]
+    assert essay == ESSAY.replace("Lagos", "Abuja")
+
+
+def test_profile_changes_ignores_ids():
+    changes = profile_changes(
+        {"id": "a", "gpa": 3.5, "major": "CS"}, {"id": "b", "gpa": 3.8, "major": "CS"},
+        {"scholarship_id": "s1", "match_score": 70}, {"scholarship_id": "s2", "match_score": 70},
+    )
+    assert changes == {"gpa": {"before": 3.5, "after": 3.8}}
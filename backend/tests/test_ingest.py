@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+import pytest
+
+import ingest
+from ingest import read_lines, validate_batch
+
+
+def lines_of(*chunks):
+    async def feed():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [line async for line in read_lines(feed())]
+
+    return asyncio.run(collect())
+
+
+def test_splits_lines_across_chunks_and_skips_blanks():
+    assert lines_of(b'{"a": 1}\n\n{"b"', b': 2}\r\n  \n{"c": 3}') == [
+        (1, b'{"a": 1}'), (3, b'{"b": 2}'), (5, b'{"c": 3}'),
+    ]
+
+
+@pytest.fixture
+def small_lines(monkeypatch):
+    monkeypatch.setattr(ingest, "MAX_LINE_BYTES", 10)
+
+
+def test_overlong_line_in_one_chunk_is_rejected(small_lines):
+    assert lines_of(b"short\n" + b"x" * 20 + b"\nok\n") == [(1, b"short"), (2, None), (3, b"ok")]
+
+
+def test_overlong_line_across_chunks_is_rejected(small_lines):
+    assert lines_of(b"x" * 8, b"x" * 8, b"xx\nok\n") == [(1, None), (2, b"ok")]
+
+
+def test_overlong_last_line_without_newline_is_rejected(small_lines):
+    assert lines_of(b"ok\n", b"x" * 20) == [(1, b"ok"), (2, None)]
+
+
+def test_validate_batch_hashes_accepted_and_reports_rejected():
+    record = {
+        "id": "s1", "name": "Test", "amount": 1000, "deadline": "2026-03-15",
+        "description": "d", "criteria_text": "c", "tags": [],
+    }
+    accepted, rejected = validate_batch([(1, json.dumps(record).encode()), (2, b'{"id": "s2"}'), (3, b"not json")])
+    assert [r["id"] for r, _ in accepted] == ["s1"]
+    assert len(accepted[0][1]) == 64
+    assert [r["line"] for r in rejected] == [2, 3]
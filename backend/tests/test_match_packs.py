@@ -0,0 +1,50 @@
+from helpers import PACK_OUTPUT_PER_MATCH, pair_block, plan_match_packs
+from prompting import estimate_tokens, student_payload
+from schemas import MATCHING_SYSTEM_PROMPT, Scholarship, ScholarshipAnalysis, Student
+
+
+STUDENT = Student(
+    id="st1", name="Test Student", country="Canada", citizenship="Canada", degree_level="undergraduate",
+    year_of_study=2, field_of_study="Engineering", gpa=3.5, financial_need=False, major="Engineering",
+    year="2", activities=[], achievements=[], background="", stories=[], goals="",
+)
+
+
+def pair(i, description="A scholarship."):
+    scholarship = Scholarship(
+        id=f"s{i}", name=f"Scholarship {i}", amount=1000, deadline="2026-03-15",
+        description=description, criteria_text="Open to all.", tags=[],
+    )
+    analysis = ScholarshipAnalysis.model_validate({
+        "scholarship_id": f"s{i}",
+        "weights": {"academics": 0.5, "leadership": 0.2, "community_service": 0.1, "financial_need": 0.1, "innovation": 0.1},
+        "tone": ["concise"],
+        "priority_summary": "Academic results.",
+        "evidence_snippets": ["strong grades"],
+    })
+    return scholarship, analysis
+
+
+def test_no_pairs_no_packs():
+    assert plan_match_packs(STUDENT, []) == []
+
+
+def test_packs_keep_order_and_respect_the_output_limit():
+    pairs = [pair(i) for i in range(25)]
+    packs = plan_match_packs(STUDENT, pairs, input_budget=1_000_000, max_output=256 + 4 * PACK_OUTPUT_PER_MATCH)
+    assert [len(p) for p in packs] == [4] * 6 + [1]
+    assert [p for pack in packs for p in pack] == pairs
+
+
+def test_packs_respect_the_input_budget():
+    pairs = [pair(i) for i in range(10)]
+    base = estimate_tokens(MATCHING_SYSTEM_PROMPT) + estimate_tokens(student_payload(STUDENT, "match")) + 200
+    budget = base + 3 * estimate_tokens(pair_block(*pairs[0]))
+    packs = plan_match_packs(STUDENT, pairs, input_budget=budget, max_output=10 ** 6)
+    assert [len(p) for p in packs] == [3, 3, 3, 1]
+
+
+def test_a_pair_over_budget_still_gets_its_own_pack():
+    pairs = [pair(0), pair(1, "long " * 5000), pair(2)]
+    packs = plan_match_packs(STUDENT, pairs, input_budget=2_000)
+    assert [[s.id for s, _ in pack] for pack in packs] == [["s0"], ["s1"], ["s2"]]
@@ -0,0 +1,48 @@
+from schemas import Scholarship
+from search import SearchIndex, tokenize
+
+
+def scholarship(id, name, description="", tags=()):
+    return Scholarship(
+        id=id, name=name, amount=1000, deadline="2026-03-15",
+        description=description, criteria_text="", tags=list(tags),
+    )
+
+
+CATALOG = [
+    scholarship("robotics", "Robotics Scholarship", "For students building machines."),
+    scholarship("nursing", "Nursing Award", "Supports future nurses.", tags=["healthcare"]),
+    scholarship("art", "Art Grant", "For painters and sculptors who love robotics."),
+]
+
+
+def test_tokenize_drops_stopwords_and_stems():
+    assert tokenize("The Scholarships for Studies") == ["scholarship", "study"]
+
+
+def test_ranks_name_matches_above_description_matches():
+    ids = [sid for sid, _ in SearchIndex(CATALOG).search("robotics")]
+    assert ids == ["robotics", "art"]
+
+
+def test_limit_and_allowed_restrict_results():
+    index = SearchIndex(CATALOG)
+    assert [sid for sid, _ in index.search("robotics", limit=1)] == ["robotics"]
+    assert [sid for sid, _ in index.search("robotics", allowed={"art", "missing"})] == ["art"]
+    assert index.search("robotics", allowed=set()) == []
+
+
+def test_add_replaces_and_remove_frees_the_slot():
+    index = SearchIndex(CATALOG)
+    index.add(scholarship("art", "Art Grant", "For painters."))
+    assert [sid for sid, _ in index.search("robotics")] == ["robotics"]
+    assert index.remove("nursing") and not index.remove("nursing")
+    assert index.search("healthcare") == []
+    index.add(scholarship("nursing2", "Nursing Award", tags=["healthcare"]))
+    assert len(index) == 3
+    assert [sid for sid, _ in index.search("healthcare")] == ["nursing2"]
+
+
+def test_empty_index_and_unknown_terms():
+    assert SearchIndex().search("robotics") == []
+    assert SearchIndex(CATALOG).search("zzz") == []
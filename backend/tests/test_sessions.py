@@ -0,0 +1,47 @@
+from sessions import apply_profile_patch
+from schemas import AgentProfile, ProfilePatchOp
+
+
+def op(op, path, value=None):
+    return ProfilePatchOp(op=op, path=path, value=value)
+
+
+def test_applies_operations_in_order():
+    profile, rejected = apply_profile_patch(AgentProfile(), [
+        op("replace", "/gpa", "3.8"),
+        op("add", "/target_countries/-", '"Canada"'),
+        op("add", "/target_countries/0", '"Japan"'),
+        op("replace", "/target_countries/1", '"Germany"'),
+    ])
+    assert rejected == []
+    assert profile.gpa == 3.8
+    assert profile.target_countries == ["Japan", "Germany"]
+
+
+def test_remove_resets_top_level_fields_and_drops_list_items():
+    start = AgentProfile(name="Ada", target_countries=["Canada", "Japan"])
+    profile, rejected = apply_profile_patch(start, [op("remove", "/name"), op("remove", "/target_countries/0")])
+    assert rejected == []
+    assert profile.name is None
+    assert profile.target_countries == ["Japan"]
+
+
+def test_bad_operations_are_reported_and_skipped():
+    profile, rejected = apply_profile_patch(AgentProfile(gpa=3.0), [
+        op("replace", "/favourite_colour", '"blue"'),
+        op("replace", "/gpa", '"not a number"'),
+        op("replace", "/gpa"),
+        op("add", "/target_countries/5", '"Canada"'),
+        op("replace", "gpa", "3.9"),
+        op("replace", "/year_of_study", "2"),
+    ])
+    assert [r["path"] for r in rejected] == ["/favourite_colour", "/gpa", "/gpa", "/target_countries/5", "gpa"]
+    assert all(r["error"] for r in rejected)
+    assert profile.gpa == 3.0
+    assert profile.year_of_study == 2
+
+
+def test_input_profile_is_not_mutated():
+    start = AgentProfile(target_countries=["Canada"])
+    apply_profile_patch(start, [op("add", "/target_countries/-", '"Japan"')])
+    assert start.target_countries == ["Canada"]
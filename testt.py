@@ -1,206 +1,59 @@
-import os
+import sys
 import json
-from dotenv import load_dotenv
-import anthropic
+from pathlib import Path
 
 # ---------- ENV + CLIENT SETUP ----------
 
-load_dotenv()
+# Shares backend/lib with the API: one lazily created client, and a model picked from the cached
+# model list (backend/data/models.json) instead of probing each candidate with a live request.
+# Nothing below touches the network until the first chat turn.
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend" / "lib"))
+from model_registry import model_registry  # noqa: E402
+from routing import model_for  # noqa: E402
 
-API_KEY = os.getenv("ANTHROPIC_API_KEY")
-if not API_KEY:
-    raise RuntimeError("ANTHROPIC_API_KEY is missing. Put it in a .env file or env var.")
-
-client = anthropic.Anthropic(api_key=API_KEY)
-
-# Try these models in order until one works
+# Preferred models, best first; the first one this API key can use wins
 KNOWN_MODELS = [
-    "claude-3-5-sonnet-20241022",
-    "claude-3-opus-20240229",
-    "claude-3-sonnet-20240229",
-    "claude-3-haiku-20240307",
+    "claude-sonnet-4-5",
+    "claude-opus-4-1",
+    "claude-haiku-4-5",
 ]
 
-def find_working_model():
+def working_model(task=None):
     """
-    Try a list of known Anthropic models and return the first one
-    that doesn't throw a NotFoundError.
+    First model the key can use: the one routed for `task` (MODEL_<TASK>), then KNOWN_MODELS in order.
+    The model list is fetched once, then remembered by the registry.
     """
-    print("Detecting working Claude model...")
-    for model in KNOWN_MODELS:
-        try:
-            _ = client.messages.create(
-                model=model,
-                max_tokens=5,
-                messages=[{"role": "user", "content": "test"}],
-            )
-            print(f"✓ Using model: {model}")
-            return model
-        except anthropic.NotFoundError:
-            print(f"✗ Model not found: {model}")
-        except Exception as e:
-            print(f"✗ Model {model} failed with {type(e).__name__}")
-    raise RuntimeError("No known models are available for this API key.")
-
-MODEL = find_working_model()
-
-# ---------- PROFILE + SYSTEM PROMPT ----------
-
-EMPTY_USER_PROFILE = {
-    "name": None,
-    "country": None,
-    "citizenship": None,
-    "degree_level": None,        # "high_school", "undergraduate", "graduate"
-    "year_of_study": None,
-    "field_of_study": None,
-    "target_countries": [],
-    "target_universities": [],
-    "gpa": None,
-    "financial_need": None,      # True / False / None
-    "work_experience": [],       # list of {role, company, details[]}
-    "extracurriculars": [],      # list of {role, organization, details[]}
-    "goals": ""
-}
-
-SYSTEM_PROMPT = """
-You are a Scholarship Application Assistant.
-
-Your job:
-- Talk to students who want scholarships.
-- Ask simple questions (1–2 at a time) to understand their background and preferences.
-- Maintain and update a structured USER PROFILE in JSON form.
-- Later, another part of the system may ask you to help with scholarship search or essay writing.
-
-You MUST ALWAYS respond with ONE JSON object ONLY, with this exact shape:
-
-{
-  "assistant_reply": "string",
-  "user_profile": { ... },
-  "action": "none" | "search_scholarships" | "generate_essay"
-}
-
-Rules:
-- Do NOT add any keys other than assistant_reply, user_profile, and action.
-- Do NOT wrap the JSON in backticks or natural language.
-- The "assistant_reply" value MUST be a single-line string with no raw line breaks.
-  - Do NOT include literal newline characters inside the string.
-  - If you want to separate ideas, just use sentences with spaces.
-- assistant_reply:
-  - Friendly, concise chat response shown to the user.
-  - Ask at most one or two questions at a time.
-- user_profile:
-  - Always return the FULL profile as a JSON object.
-  - Start from the JSON provided under USER_PROFILE and update/merge fields based on USER_MESSAGE.
-  - Do not invent things the user never said.
-  - If the user corrects something, overwrite the old value.
-
-The user_profile fields:
-
-{
-  "name": string or null,
-  "country": string or null,
-  "citizenship": string or null,
-  "degree_level": string or null,
-  "year_of_study": int or null,
-  "field_of_study": string or null,
-  "target_countries": [strings],
-  "target_universities": [strings],
-  "gpa": number or null,
-  "financial_need": true | false | null,
-  "work_experience": [
-    {
-      "role": string,
-      "company": string,
-      "details": [string, ...]
-    }
-  ],
-  "extracurriculars": [
-    {
-      "role": string,
-      "organization": string,
-      "details": [string, ...]
-    }
-  ],
-  "goals": string
-}
-
-When the user mentions jobs or activities, store them in work_experience or extracurriculars as simple bullet points in details.
-
-About the action field:
-- Use "none" when just continuing the conversation and asking more questions.
-- Use "search_scholarships" when you think you have enough profile info that the backend should look up scholarships.
-- Use "generate_essay" ONLY after the user explicitly says they are ready to write or refine an essay for a specific scholarship.
-
-You will receive context like this in the user message:
-
-USER_PROFILE:
-<JSON here>
-
-USER_MESSAGE:
-<student's latest message here>
-
-Use USER_PROFILE as your starting point, then update it based on USER_MESSAGE, and respond with the strict JSON object described above.
-"""
-
-# ---------- HELPER: BUILD PAYLOAD FOR CLAUDE ----------
+    preferred = ([model_for(task)] if task else []) + KNOWN_MODELS
+    return model_registry.resolve(dict.fromkeys(preferred))
 
-def build_payload(user_message: str, user_profile: dict) -> str:
-    """
-    Build the text we send to Claude as the 'user' message.
-    It includes the existing profile plus the latest user message.
-    """
-    return f"""USER_PROFILE:
-{json.dumps(user_profile, indent=2)}
+# ---------- PROFILE BUILDING (SESSIONS) ----------
 
-USER_MESSAGE:
-{user_message}
-"""
+# Profile-building turns share the API's session code (backend/lib): the profile and chat history
+# live in the session store, and the model returns a patch instead of echoing the whole profile.
+from helpers import agent_session_turn  # noqa: E402
+from sessions import SessionStore  # noqa: E402
 
-# ---------- MAIN FUNCTION: CALL THE AGENT (PROFILE BUILDING) ----------
+session_store = SessionStore()
 
-def call_scholarship_agent(user_message: str, user_profile: dict | None = None):
+def call_scholarship_agent(user_message: str, session_id: str):
     """
-    Call Claude with the current user message and profile.
+    Run one chat turn for a stored session.
 
     Inputs:
         user_message: latest message from the student (string)
-        user_profile: stored profile dict from previous turns, or None
+        session_id: id from session_store.create()
 
     Returns:
         assistant_reply (str),
         updated_user_profile (dict),
         action (str)
     """
-    if user_profile is None:
-        user_profile = EMPTY_USER_PROFILE.copy()
-
-    payload = build_payload(user_message, user_profile)
-
-    response = client.messages.create(
-        model=MODEL,
-        max_tokens=800,
-        system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": payload}],
+    turn, profile, rejected = agent_session_turn(
+        model_registry.client(), session_store, session_id, user_message, model=working_model("agent"),
     )
-
-    # Anthropic SDK: response.content is a list of TextBlocks
-    text_chunks = []
-    for block in response.content:
-        if getattr(block, "type", None) == "text":
-            text_chunks.append(block.text)
-    raw_text = "".join(text_chunks).strip()
-
-    # Parse JSON
-    try:
-        parsed = json.loads(raw_text)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Claude did NOT return valid JSON:\n{raw_text}") from e
-
-    assistant_reply = parsed.get("assistant_reply", "")
-    updated_profile = parsed.get("user_profile", user_profile)
-    action = parsed.get("action", "none")
-
-    return assistant_reply, updated_profile, action
+    for op in rejected:
+        print(f"(skipped patch op {op['op']} {op['path']}: {op['error']})")
+    return turn.assistant_reply, profile.model_dump(), turn.action
 
 # ---------- ESSAY GENERATION ----------
 
@@ -244,8 +97,8 @@ SCHOLARSHIP_TEXT:
 {scholarship_text}
 """
 
-    response = client.messages.create(
-        model=MODEL,
+    response = model_registry.client().messages.create(
+        model=working_model(),
         max_tokens=800,
         system=ESSAY_SYSTEM_PROMPT,
         messages=[{"role": "user", "content": payload}],
@@ -267,6 +120,7 @@ if __name__ == "__main__":
     print("Type '/essay' to generate an essay for a scholarship.")
     print("Type 'exit' to quit.\n")
 
+    session_id = session_store.create()
     user_profile = None
 
     while True:
@@ -310,7 +164,7 @@ if __name__ == "__main__":
 
         # ----- NORMAL CHAT / PROFILE BUILDING -----
         try:
-            reply, user_profile, action = call_scholarship_agent(msg, user_profile)
+            reply, user_profile, action = call_scholarship_agent(msg, session_id)
         except Exception as e:
             print("Error calling agent:", e)
             # don't kill the session on one bad JSON turn